@@ -0,0 +1,225 @@
+"""
+Satark.ai - Alert Digest
+Groups scam alerts so a viral campaign produces a handful of e-mails
+instead of one per scan (and stays under Gmail's sending limits).
+- Alerts are grouped by scam type and the scam's phones / UPI IDs / domains
+- The first sighting of a high-risk group is mailed immediately
+- Everything else in a group is counted and mailed as one digest per
+  window, with the report count and first/last seen times
+- ALERT_DIGEST=0 sends every alert individually, as before
+"""
+
+import atexit
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+from email_alerts import send_alert_digest, send_scam_alert_email
+from entity_extractor import extract_entities
+from metrics import ALERT_DIGEST_SIZE, ALERTS
+
+
+ALERT_DIGEST = os.getenv("ALERT_DIGEST", "1") == "1"
+ALERT_DIGEST_WINDOW = float(os.getenv("ALERT_DIGEST_WINDOW", "900"))
+# First sightings at or above this risk score are mailed right away
+ALERT_URGENT_SCORE = int(os.getenv("ALERT_URGENT_SCORE", "80"))
+# A group not seen for this long counts as a first sighting again
+ALERT_SIGHTING_TTL = float(os.getenv("ALERT_SIGHTING_TTL", "86400"))
+MAX_TRACKED_GROUPS = 10000
+
+
+def group_key(scam_details: Dict) -> Tuple:
+    """Scam type plus canonical phones, UPI IDs and domains - the same campaign maps to the same key"""
+    entities = scam_details.get("entity_check")
+    if not entities:
+        values = [str(v) for v in (scam_details.get("extracted_entities") or {}).values()
+                  if v and str(v).lower() not in ("null", "none")]
+        entities = extract_entities(" ".join(values))
+    return (
+        str(scam_details.get("scam_type") or "Unknown").strip().lower(),
+        tuple(sorted(entities.get("phones", []))),
+        tuple(sorted(entities.get("upi_ids", []))),
+        tuple(sorted(entities.get("domains", [])))
+    )
+
+
+class AlertGroup:
+    """Alerts of one campaign within the current window"""
+
+    def __init__(self, key: Tuple, scam_type: str, now: float):
+        self.key = key
+        self.scam_type = scam_type
+        self.window_start = now
+        self.first_seen = now
+        self.last_seen = now
+        self.count = 0  # Reports waiting for the digest
+        self.immediate = 0  # Reports already mailed on their own
+        self.max_risk = 0
+        self.red_flags: List[str] = []
+        self.reasoning = ""
+
+    def add(self, scam_details: Dict, now: float):
+        self.count += 1
+        self.last_seen = now
+        self.max_risk = max(self.max_risk, int(scam_details.get("risk_score") or 0))
+        self.reasoning = scam_details.get("reasoning") or self.reasoning
+        for flag in scam_details.get("red_flags") or []:
+            if flag not in self.red_flags and len(self.red_flags) < 10:
+                self.red_flags.append(flag)
+
+    @property
+    def phones(self) -> Tuple[str, ...]:
+        return self.key[1]
+
+    @property
+    def upi_ids(self) -> Tuple[str, ...]:
+        return self.key[2]
+
+    @property
+    def domains(self) -> Tuple[str, ...]:
+        return self.key[3]
+
+    def to_dict(self) -> Dict:
+        return {
+            'scam_type': self.scam_type,
+            'phones': list(self.phones),
+            'upi_ids': list(self.upi_ids),
+            'domains': list(self.domains),
+            'reports': self.count + self.immediate,
+            'mailed_immediately': self.immediate,
+            'first_seen': datetime.fromtimestamp(self.first_seen).isoformat(),
+            'last_seen': datetime.fromtimestamp(self.last_seen).isoformat(),
+            'max_risk': self.max_risk,
+            'red_flags': list(self.red_flags),
+            'reasoning': self.reasoning,
+            'window_start': self.window_start
+        }
+
+
+class AlertDigest:
+    """Routes each SCAM alert to an immediate e-mail or the current digest window"""
+
+    def __init__(self, window: float = ALERT_DIGEST_WINDOW, urgent_score: int = ALERT_URGENT_SCORE,
+                 sighting_ttl: float = ALERT_SIGHTING_TTL, enabled: bool = ALERT_DIGEST,
+                 send_alert: Callable = send_scam_alert_email, send_digest: Callable = send_alert_digest):
+        self.window = window
+        self.urgent_score = urgent_score
+        self.sighting_ttl = sighting_ttl
+        self.enabled = enabled
+        self._send_alert = send_alert
+        self._send_digest = send_digest
+        self._lock = threading.Lock()
+        self._groups: Dict[Tuple, AlertGroup] = {}  # (recipient, key) -> open window
+        self._seen: "OrderedDict[Tuple, float]" = OrderedDict()  # (recipient, key) -> last sighting
+        self._timer = None
+
+    def add(self, scam_details: Dict, recipient_email: str) -> Dict:
+        """
+        Record a SCAM alert.
+
+        Returns:
+            dict with action ('immediate' or 'digested') and reports (in this group's current window)
+        """
+        if not self.enabled:
+            self._send_alert(scam_details, recipient_email)
+            ALERTS.inc(action='immediate')
+            return {'action': 'immediate', 'reports': 1}
+
+        now = time.time()
+        key = (recipient_email, group_key(scam_details))
+        with self._lock:
+            last = self._seen.pop(key, None)
+            self._seen[key] = now
+            if len(self._seen) > MAX_TRACKED_GROUPS:
+                self._seen.popitem(last=False)
+            first_sighting = last is None or now - last > self.sighting_ttl
+
+            group = self._groups.get(key)
+            if group is None:
+                group = self._groups[key] = AlertGroup(key[1], scam_details.get("scam_type") or "Unknown", now)
+            urgent = first_sighting and int(scam_details.get("risk_score") or 0) >= self.urgent_score
+            if urgent:
+                group.immediate += 1
+                group.last_seen = now
+            else:
+                group.add(scam_details, now)
+            reports = group.count + group.immediate
+
+        self._ensure_timer()
+        if urgent:
+            self._send_alert(scam_details, recipient_email)
+        ALERTS.inc(action='immediate' if urgent else 'digested')
+        return {'action': 'immediate' if urgent else 'digested', 'reports': reports}
+
+    def flush(self, force: bool = False) -> int:
+        """Mail a digest for every group whose window has ended (all groups if force). Returns digests sent."""
+        now = time.time()
+        with self._lock:
+            due = [key for key, group in self._groups.items() if force or now - group.window_start >= self.window]
+            groups = [(key[0], self._groups.pop(key)) for key in due]
+        sent = 0
+        for recipient_email, group in groups:
+            if not group.count:
+                continue  # Only the immediate alert - nothing new to report
+            self._send_digest(group.to_dict(), recipient_email)
+            ALERT_DIGEST_SIZE.observe(group.count)
+            ALERTS.inc(action='digest_sent')
+            sent += 1
+        return sent
+
+    def _ensure_timer(self):
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Thread(target=self._run, name="alert-digest", daemon=True)
+            self._timer.start()
+        # Pending digests go to the outbox on exit (registered after the mail dispatcher's
+        # flush, so it runs first)
+        atexit.register(self.flush, True)
+
+    def _run(self):
+        while True:
+            time.sleep(min(60.0, self.window / 4))
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ Alert digest flush failed: {e}")
+
+    def get_stats(self) -> Dict:
+        """Open groups and reports waiting for their digest"""
+        with self._lock:
+            return {
+                'open_groups': len(self._groups),
+                'pending_reports': sum(group.count for group in self._groups.values()),
+                'tracked_groups': len(self._seen)
+            }
+
+
+# Process-wide digest shared by every session
+digest = AlertDigest()
+
+
+if __name__ == "__main__":
+    # Simulation: a viral campaign of 2,000 SCAM verdicts across 3 scams, e-mail sending stubbed out
+    import random
+
+    mails = {'immediate': 0, 'digest': 0}
+
+    campaigns = [
+        {"scam_type": "Digital Arrest", "extracted_entities": {"phone_number": "+91 98765 43210"}},
+        {"scam_type": "Lottery Scam", "extracted_entities": {"upi_id": "winner@paytm"}},
+        {"scam_type": "Loan Fraud", "extracted_entities": {"url": "http://instant-loan.xyz/apply"}},
+    ]
+    sim = AlertDigest(window=900, enabled=True,
+                      send_alert=lambda details, recipient: mails.__setitem__('immediate', mails['immediate'] + 1),
+                      send_digest=lambda group, recipient: mails.__setitem__('digest', mails['digest'] + 1))
+    start = time.perf_counter()
+    for i in range(2000):
+        sim.add(dict(random.choice(campaigns), risk_score=random.randint(70, 99), reasoning="r"), "alerts@satark.local")
+    elapsed = time.perf_counter() - start
+    sim.flush(force=True)
+    print(f"📨 2000 alerts -> {mails['immediate']} immediate + {mails['digest']} digest e-mails "
+          f"({elapsed / 2000 * 1e6:.1f} µs per alert)")
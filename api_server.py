@@ -0,0 +1,372 @@
+"""
+Satark.ai - Headless HTTP API
+The scan and lookup functions of the Streamlit app as a plain JSON API, for
+bots and partner apps. Stateless per request, so any number of processes
+can sit behind a load balancer (they share the live DB snapshot).
+- Fixed worker pool; HTTP/1.1 keep-alive with an idle timeout
+- Request body size limit; separate concurrency cap for slow scans
+- Same metrics registry, served at /metrics
+
+Endpoints:
+    POST /analyze?language=Hinglish&search=1   body: raw image bytes, or JSON {"image": "<base64>", ...}
+    GET  /check_phone?phone=9876543210
+    GET  /check_upi?upi_id=name@ybl
+    GET  /check_database?name=Cash+Loan+App
+    GET  /stats
+    POST /jobs?language=Hinglish&search=1&callback_url=...   body as /analyze; returns {"job_id"} at once
+    GET  /jobs?id=<job_id>   (no id: queue stats)
+    GET  /health
+    GET  /metrics
+
+Usage:
+    python api_server.py [--host 0.0.0.0] [--port 8000] [--workers 16]
+    python api_server.py --bench [--seconds 5] [--clients 8]
+"""
+
+import argparse
+import base64
+import binascii
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from PIL import Image, UnidentifiedImageError
+
+from job_queue import JobQueue
+from live_scraper import check_phone, check_upi, get_db_stats
+from metrics import API_REQUESTS, API_SECONDS, CONTENT_TYPE as METRICS_CONTENT_TYPE, registry
+from utils import LANGUAGE_INSTRUCTIONS, analyze_with_internet_search, check_database
+
+
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+API_WORKERS = int(os.getenv("API_WORKERS", "16"))
+# Scans hold a worker for seconds (Gemini + search); cap them so lookups keep flowing
+API_MAX_SCANS = int(os.getenv("API_MAX_SCANS", "4"))
+API_SCAN_WAIT_SECONDS = float(os.getenv("API_SCAN_WAIT_SECONDS", "30"))
+API_MAX_BODY_BYTES = int(os.getenv("API_MAX_BODY_BYTES", str(10 * 1024 * 1024)))
+# Idle keep-alive connections are closed after this long, freeing their worker
+API_KEEPALIVE_SECONDS = float(os.getenv("API_KEEPALIVE_SECONDS", "5"))
+
+_scan_slots = threading.BoundedSemaphore(API_MAX_SCANS)
+
+
+class APIError(Exception):
+    """Error answered to the client as {"error": message} with an HTTP status"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _param(query: Dict, name: str, required: bool = True) -> Optional[str]:
+    value = (query.get(name) or [''])[0].strip()
+    if required and not value:
+        raise APIError(400, f"Missing query parameter '{name}'")
+    return value or None
+
+
+def _decode_image(body: bytes, content_type: str) -> Tuple[Image.Image, Dict]:
+    """Image from a raw image body or a JSON body with base64 'image'. Returns (image, JSON options)."""
+    options = {}
+    if content_type.startswith('application/json'):
+        try:
+            options = json.loads(body)
+            image = options.get('image') or ''
+            if not isinstance(image, str):
+                raise ValueError("'image' is not a string")
+            body = base64.b64decode(image, validate=True)
+        except (ValueError, binascii.Error, AttributeError):
+            raise APIError(400, "JSON body must be an object with base64 'image'")
+    if not body:
+        raise APIError(400, "Empty image")
+    try:
+        image = Image.open(io.BytesIO(body))
+        image.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise APIError(415, "Body is not a supported image")
+    return image, options
+
+
+def _scan_options(query: Dict, options: Dict) -> Tuple[str, bool]:
+    """(language, search) from the JSON body or the query string"""
+    language = options.get('language') or _param(query, 'language', required=False) or "Hinglish"
+    if not isinstance(language, str) or language not in LANGUAGE_INSTRUCTIONS:
+        raise APIError(400, f"language must be one of {', '.join(LANGUAGE_INSTRUCTIONS)}")
+    search = options.get('search', _param(query, 'search', required=False) or '1')
+    return language, str(search).lower() not in ('0', 'false', 'no')
+
+
+def handle_analyze(query: Dict, body: bytes, content_type: str) -> Dict:
+    image, options = _decode_image(body, content_type)
+    language, search = _scan_options(query, options)
+
+    if not _scan_slots.acquire(timeout=API_SCAN_WAIT_SECONDS):
+        raise APIError(503, "Scanner busy, retry later")
+    try:
+        result = analyze_with_internet_search(image, language=language, search=search)
+    finally:
+        _scan_slots.release()
+    # Debug output of the model is for the dev tab, not for API clients
+    result.pop('raw_response', None)
+    return result
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def job_queue() -> JobQueue:
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue()
+        return _job_queue
+
+
+def handle_submit_job(query: Dict, body: bytes, content_type: str) -> Dict:
+    """Queue a scan for the worker pool (python job_queue.py worker)"""
+    _, options = _decode_image(body, content_type)  # Reject non-images now, not in a worker
+    language, search = _scan_options(query, options)
+    callback_url = options.get('callback_url') or _param(query, 'callback_url', required=False)
+    if callback_url and not callback_url.startswith(('http://', 'https://')):
+        raise APIError(400, "callback_url must be http(s)")
+    if options:
+        body = base64.b64decode(options['image'])
+    return {'job_id': job_queue().submit(body, language, search, callback_url), 'status': 'queued'}
+
+
+def handle_get_job(query: Dict, body: bytes, content_type: str) -> Dict:
+    job_id = _param(query, 'id', required=False)
+    if not job_id:
+        return job_queue().stats()
+    job = job_queue().get(job_id)
+    if job is None:
+        raise APIError(404, f"Unknown job {job_id}")
+    return job
+
+
+def handle_check_phone(query: Dict, body: bytes, content_type: str) -> Dict:
+    return check_phone(_param(query, 'phone'))
+
+
+def handle_check_upi(query: Dict, body: bytes, content_type: str) -> Dict:
+    return check_upi(_param(query, 'upi_id'))
+
+
+def handle_check_database(query: Dict, body: bytes, content_type: str) -> Dict:
+    return check_database(_param(query, 'name'))
+
+
+def handle_stats(query: Dict, body: bytes, content_type: str) -> Dict:
+    return get_db_stats()
+
+
+def handle_health(query: Dict, body: bytes, content_type: str) -> Dict:
+    return {'status': 'ok'}
+
+
+# (method, path) -> handler
+ROUTES = {
+    ('POST', '/analyze'): handle_analyze,
+    ('POST', '/jobs'): handle_submit_job,
+    ('GET', '/jobs'): handle_get_job,
+    ('GET', '/check_phone'): handle_check_phone,
+    ('GET', '/check_upi'): handle_check_upi,
+    ('GET', '/check_database'): handle_check_database,
+    ('GET', '/stats'): handle_stats,
+    ('GET', '/health'): handle_health,
+}
+PATHS = {path for _, path in ROUTES} | {'/metrics'}
+
+
+class APIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive (every response carries Content-Length)
+    timeout = API_KEEPALIVE_SECONDS
+    disable_nagle_algorithm = True  # Headers and body are separate writes; don't wait for delayed ACKs
+    server_version = 'SatarkAPI/1.0'
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def _dispatch(self, method: str):
+        parsed = urlparse(self.path)
+        path = parsed.path.rstrip('/') or '/'
+        start = time.perf_counter()
+        status = 200
+        body_read = False
+
+        try:
+            if path == '/metrics' and method == 'GET':
+                self._send(200, registry.render().encode('utf-8'), METRICS_CONTENT_TYPE)
+                return
+
+            handler = ROUTES.get((method, path))
+            if handler is None:
+                if path in PATHS:
+                    raise APIError(405, f"{method} not allowed on {path}")
+                raise APIError(404, f"Unknown endpoint {path}")
+
+            body = self._read_body()
+            body_read = True
+            result = handler(parse_qs(parsed.query), body, self.headers.get('Content-Type', ''))
+            self._send_json(200, result)
+        except APIError as e:
+            status = e.status
+            if not body_read and self.headers.get('Content-Length', '0') != '0':
+                # An unread body would be parsed as the next request on this connection
+                self.close_connection = True
+            self._send_json(e.status, {'error': e.message})
+        except Exception as e:
+            status = 500
+            print(f"API error on {path}: {e}")
+            self._send_json(500, {'error': 'Internal error'})
+        finally:
+            endpoint = path if path in PATHS else 'other'
+            API_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+            API_REQUESTS.inc(endpoint=endpoint, status=status)
+
+    def _read_body(self) -> bytes:
+        length = self.headers.get('Content-Length')
+        if not length:
+            if self.headers.get('Transfer-Encoding'):
+                raise APIError(411, "Content-Length required")
+            return b''
+        if not length.isdigit():
+            raise APIError(400, "Bad Content-Length")
+        if int(length) > API_MAX_BODY_BYTES:
+            raise APIError(413, f"Body larger than {API_MAX_BODY_BYTES} bytes")
+        return self.rfile.read(int(length))
+
+    def _send_json(self, status: int, payload: Dict):
+        self._send(status, json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8'),
+                   'application/json; charset=utf-8')
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if status == 503:
+            self.send_header('Retry-After', '5')
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Per-request logging is in the metrics
+
+
+class PooledHTTPServer(HTTPServer):
+    """
+    HTTPServer handing each connection to a fixed pool of worker threads.
+    A keep-alive connection holds its worker until it goes idle for
+    API_KEEPALIVE_SECONDS, so size the pool above the expected number of
+    concurrent client connections.
+    """
+
+    request_queue_size = 128
+
+    def __init__(self, address: Tuple[str, int], handler=APIHandler, workers: int = API_WORKERS):
+        super().__init__(address, handler)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api-worker')
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False)
+
+
+def serve(host: str = API_HOST, port: int = API_PORT, workers: int = API_WORKERS,
+          refresh: bool = True) -> PooledHTTPServer:
+    """Start the API in a background thread and return the server (call .shutdown() to stop)"""
+    if refresh:
+        # Joins the refresher leader election, like every Streamlit process
+        from refresher import get_refresher
+        get_refresher()
+    server = PooledHTTPServer((host, port), workers=workers)
+    threading.Thread(target=server.serve_forever, name="api-server", daemon=True).start()
+    return server
+
+
+def benchmark(seconds: float = 5, clients: int = 8, workers: int = API_WORKERS):
+    """Requests per second on the lookup endpoints, keep-alive clients against a local server"""
+    import http.client
+
+    server = serve('127.0.0.1', 0, workers=workers, refresh=False)
+    port = server.server_address[1]
+    paths = {
+        'check_phone': '/check_phone?phone=9876543210',
+        'check_upi': '/check_upi?upi_id=fraud.refund%40ybl',
+        'check_database': '/check_database?name=Cash+Loan+App',
+        'stats': '/stats',
+    }
+
+    for name, path in paths.items():
+        counts = [0] * clients
+        deadline = time.perf_counter() + seconds
+
+        def client(i):
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+            while time.perf_counter() < deadline:
+                conn.request('GET', path)
+                response = conn.getresponse()
+                response.read()
+                counts[i] += 1
+            conn.close()
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        print(f"⚡ {name:<15} {sum(counts) / elapsed:8,.0f} req/s  "
+              f"(p99 {API_SECONDS.percentile(99, endpoint=path.split('?')[0]) * 1000:.2f} ms server-side)")
+
+    server.shutdown()
+    server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Satark.ai headless HTTP API")
+    parser.add_argument('--host', default=API_HOST)
+    parser.add_argument('--port', type=int, default=API_PORT)
+    parser.add_argument('--workers', type=int, default=API_WORKERS, help="Worker threads")
+    parser.add_argument('--bench', action='store_true', help="Benchmark the lookup endpoints and exit")
+    parser.add_argument('--seconds', type=float, default=5, help="Benchmark seconds per endpoint")
+    parser.add_argument('--clients', type=int, default=8, help="Concurrent keep-alive benchmark clients")
+    args = parser.parse_args()
+
+    if args.bench:
+        print(f"🏁 {args.clients} keep-alive clients, {args.workers} workers, {args.seconds:g}s per endpoint")
+        benchmark(args.seconds, args.clients, args.workers)
+    else:
+        api = serve(args.host, args.port, args.workers)
+        print(f"🛡️ Satark.ai API on http://{args.host}:{args.port} ({args.workers} workers)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            api.shutdown()
@@ -0,0 +1,258 @@
+"""
+Satark.ai - Offline Batch Scanner
+Runs the scam detector over folders of screenshots (a seized device dump,
+a complaint backlog) without a browser, writing one JSONL record per image.
+- N concurrent workers with a shared scans-per-minute rate limit
+- Resumable: images whose content hash already has a result in the output
+  are skipped (scan errors are retried, files that aren't images are not)
+- Identical images are scanned once per run
+- Live throughput and ETA
+
+Usage:
+    python batch_scan.py DIR_OR_IMAGE [...] -o results.jsonl [--workers 4] [--rate 60] [--no-search]
+    python batch_scan.py --manifest paths.txt -o results.jsonl
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Set
+
+from PIL import Image, UnidentifiedImageError
+
+from utils import analyze_with_internet_search
+
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.bmp', '.gif')
+DEFAULT_WORKERS = int(os.getenv("BATCH_SCAN_WORKERS", "4"))
+# Scans per minute across all workers (0 = unlimited); keep under the Gemini quota
+DEFAULT_RATE = float(os.getenv("BATCH_SCAN_RATE", "60"))
+
+
+def iter_images(paths: Iterable[str]) -> Iterator[str]:
+    """Image files under the given files/directories, in a stable (sorted) order"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(IMAGE_EXTENSIONS):
+                        yield os.path.join(root, name)
+        elif os.path.isfile(path):
+            yield path
+        else:
+            print(f"⚠️ Not found: {path}", file=sys.stderr)
+
+
+def read_manifest(path: str) -> List[str]:
+    """One image path per line (plain text), or JSONL objects with a 'path' key"""
+    paths = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('{'):
+                line = json.loads(line).get('path', '')
+            if line:
+                paths.append(line)
+    return paths
+
+
+def load_done(output_path: str) -> Set[str]:
+    """Content hashes that already have a final record (a result, or a non-retryable error) in the output"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Torn last line of an interrupted run
+            if record.get('sha256') and (not record.get('error') or record.get('retryable') is False):
+                done.add(record['sha256'])
+    return done
+
+
+class RateLimiter:
+    """Token bucket shared by all workers: `rate` acquisitions per minute, bursts up to `burst`"""
+
+    def __init__(self, rate_per_minute: float, burst: int = 1):
+        self.interval = 60.0 / rate_per_minute if rate_per_minute > 0 else 0.0
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) / self.interval)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) * self.interval
+            time.sleep(wait)
+
+
+class BatchScanner:
+    """Scans images concurrently and appends one JSONL record per image"""
+
+    def __init__(self, output_path: str, workers: int = DEFAULT_WORKERS, rate: float = DEFAULT_RATE,
+                 search: bool = True, language: str = "English", api_key: str = None):
+        self.output_path = output_path
+        self.workers = workers
+        self.search = search
+        self.language = language
+        self.api_key = api_key
+        self.limiter = RateLimiter(rate, burst=max(1, workers))
+
+        self._lock = threading.Lock()
+        self.done = load_done(output_path)
+        self._in_flight: Set[str] = set()
+        self.stats = {'total': 0, 'scanned': 0, 'skipped': 0, 'errors': 0}
+
+    def _claim(self, digest: str) -> bool:
+        """True if this worker should scan the content (not done, not being scanned by another worker)"""
+        with self._lock:
+            if digest in self.done or digest in self._in_flight:
+                self.stats['skipped'] += 1
+                return False
+            self._in_flight.add(digest)
+            return True
+
+    def scan_one(self, path: str, out) -> None:
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            self._write(out, {'path': path, 'sha256': None, 'error': f"{type(e).__name__}: {e}"})
+            return
+
+        digest = hashlib.sha256(data).hexdigest()
+        if not self._claim(digest):
+            return
+
+        record = {'path': path, 'sha256': digest}
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                image.load()
+                self.limiter.acquire()
+                start = time.perf_counter()
+                result = analyze_with_internet_search(image, self.api_key, self.language, search=self.search)
+            record['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 2)
+            result.pop('raw_response', None)
+            if result.get('verdict') == 'ERROR':
+                record['error'] = result.get('reasoning', 'Scan failed')
+            record['result'] = result
+        except (UnidentifiedImageError, Image.DecompressionBombError) as e:
+            # Same bytes will fail the same way - don't retry on resume
+            record['error'] = f"{type(e).__name__}: {e}"
+            record['retryable'] = False
+        except Exception as e:
+            record['error'] = f"{type(e).__name__}: {e}"
+
+        record['scanned_at'] = datetime.now().isoformat()
+        self._write(out, record)
+
+    def _write(self, out, record: Dict):
+        line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+        with self._lock:
+            out.write(line)
+            out.flush()  # An interrupted run loses at most the in-flight scans
+            self.stats['scanned'] += 1
+            if record.get('error'):
+                self.stats['errors'] += 1
+            if record.get('sha256') and (not record.get('error') or record.get('retryable') is False):
+                self.done.add(record['sha256'])
+            self._in_flight.discard(record.get('sha256'))
+
+    def run(self, paths: List[str], progress_interval: float = 2.0) -> Dict:
+        """Scan all paths. Returns counts (total, scanned, skipped, errors) and elapsed_s / images_per_s."""
+        self.stats['total'] = len(paths)
+        start = time.perf_counter()
+        finished = threading.Event()
+
+        def report():
+            while not finished.wait(progress_interval):
+                self._print_progress(time.perf_counter() - start)
+
+        reporter = threading.Thread(target=report, name="batch-progress", daemon=True)
+        reporter.start()
+
+        # Bounded submission keeps memory flat for very large sweeps
+        slots = threading.BoundedSemaphore(self.workers * 4)
+
+        def task(path):
+            try:
+                self.scan_one(path, out)
+            finally:
+                slots.release()
+
+        # Terminate a torn last line from an interrupted run so the next record parses.
+        # Checked in bytes: the last character may be multibyte (₹, emoji).
+        with open(self.output_path, 'ab+') as raw:
+            if raw.tell():
+                raw.seek(-1, os.SEEK_END)
+                if raw.read(1) != b'\n':
+                    raw.write(b'\n')
+
+        with open(self.output_path, 'a', encoding='utf-8') as out, ThreadPoolExecutor(self.workers) as pool:
+            for path in paths:
+                slots.acquire()
+                pool.submit(task, path)
+
+        finished.set()
+        elapsed = time.perf_counter() - start
+        self._print_progress(elapsed)
+        print(file=sys.stderr)
+        return dict(self.stats, elapsed_s=round(elapsed, 2),
+                    images_per_s=round(self.stats['scanned'] / elapsed, 2) if elapsed else 0.0)
+
+    def _print_progress(self, elapsed: float):
+        with self._lock:
+            stats = dict(self.stats)
+        handled = stats['scanned'] + stats['skipped']
+        rate = stats['scanned'] / elapsed if elapsed else 0.0
+        remaining = stats['total'] - handled
+        eta = f"{remaining / rate / 60:.1f}m" if rate else "-"
+        percent = 100 * handled / stats['total'] if stats['total'] else 100.0
+        print(f"\r🔎 {handled:,}/{stats['total']:,} ({percent:.1f}%) - {rate:.2f} img/s, "
+              f"{stats['skipped']:,} skipped, {stats['errors']:,} errors, ETA {eta}   ",
+              end='', file=sys.stderr, flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scan folders of screenshots for scams, one JSONL record per image")
+    parser.add_argument('paths', nargs='*', help="Image files or directories (walked recursively)")
+    parser.add_argument('--manifest', help="File listing image paths (one per line, or JSONL with 'path')")
+    parser.add_argument('-o', '--output', required=True, help="JSONL output (appended to; used for resume)")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Concurrent scans")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help="Max scans per minute (0 = unlimited)")
+    parser.add_argument('--no-search', action='store_true', help="Skip the internet search step (live DB check still runs)")
+    parser.add_argument('--language', default="English", help="Language of reasoning/advice")
+    args = parser.parse_args()
+
+    inputs = list(args.paths) + (read_manifest(args.manifest) if args.manifest else [])
+    if not inputs:
+        parser.error("give image paths/directories or --manifest")
+
+    images = list(iter_images(inputs))
+    scanner = BatchScanner(args.output, workers=args.workers, rate=args.rate,
+                           search=not args.no_search, language=args.language)
+    print(f"📂 {len(images):,} images, {len(scanner.done):,} already in {args.output}", file=sys.stderr)
+    summary = scanner.run(images)
+    print(f"✅ Scanned {summary['scanned']:,} ({summary['errors']:,} errors), skipped {summary['skipped']:,} "
+          f"in {summary['elapsed_s']}s - {summary['images_per_s']} img/s", file=sys.stderr)
@@ -0,0 +1,242 @@
+"""
+Satark.ai - Bulk Import of Scam Report Datasets
+Streams partner dumps (CSV or JSONL, optionally gzipped) of reported phone
+numbers and UPI IDs into the live scam database.
+- Bounded memory: rows are read, validated and applied one batch at a time
+- One snapshot publish per batch instead of one file rewrite per report
+- Progress and throughput reporting
+- Resumable: a checkpoint records the input offset of the last applied batch
+
+Usage:
+    python bulk_import.py dump.csv [--scam-type "Partner Report"] [--batch-size 250000] [--restart]
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import os
+import time
+from datetime import datetime
+from itertools import chain, islice
+from operator import methodcaller
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from entity_extractor import validate_phone, validate_upi
+from live_scraper import LiveScammerDB, live_db
+
+
+# Accepted column / key names (case-insensitive)
+PHONE_COLUMNS = ('phone', 'phone_number', 'number', 'mobile', 'msisdn')
+UPI_COLUMNS = ('upi', 'upi_id', 'vpa')
+TYPE_COLUMNS = ('scam_type', 'category', 'type')
+TIME_COLUMNS = ('reported_at', 'timestamp', 'date')
+
+DEFAULT_SCAM_TYPE = "Partner Report"
+DEFAULT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "250000"))
+
+
+def _open(path: str):
+    return gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+
+
+def _is_jsonl(path: str) -> bool:
+    return path.rsplit('.gz', 1)[0].endswith(('.jsonl', '.ndjson'))
+
+
+def _pick(row: Dict, columns: Tuple[str, ...]) -> Optional[str]:
+    for column in columns:
+        value = row.get(column)
+        if value:
+            return str(value)
+    return None
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    """ISO date/time to a naive local datetime (what the database stores), None if unusable"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def parse_row(row: Dict, default_type: str = DEFAULT_SCAM_TYPE) -> Optional[Dict]:
+    """
+    Validate and normalise one input row.
+
+    Returns:
+        A report for LiveScammerDB.add_reports, or None if the row has no valid phone or UPI ID
+    """
+    phone = validate_phone(_pick(row, PHONE_COLUMNS))
+    upi_id = validate_upi(_pick(row, UPI_COLUMNS))
+    if not phone and not upi_id:
+        return None
+    return {
+        'phone': phone,
+        'upi_id': upi_id,
+        'scam_type': _pick(row, TYPE_COLUMNS) or default_type,
+        'reported_at': _parse_time(_pick(row, TIME_COLUMNS))
+    }
+
+
+def _json_record(line: str) -> Dict:
+    """One JSONL record with lowercased keys ({} if it is not a JSON object - counted as invalid)"""
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError:
+        return {}
+    return {str(k).lower(): v for k, v in record.items()} if isinstance(record, dict) else {}
+
+
+def read_batches(path: str, offset: int = 0, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Tuple[List[Dict], int]]:
+    """
+    Stream rows from a CSV (with header) or JSONL file.
+    CSV goes through one csv reader over the whole file, so quoted fields may
+    span lines; offsets are taken at row boundaries.
+
+    Yields:
+        (rows, end_offset) - rows as dicts with lowercased keys, and the input
+        offset just past the batch (where a resumed import continues)
+    """
+    jsonl = _is_jsonl(path)
+    with _open(path) as f:
+        # Decoded lazily, one line at a time, so f.tell() is always at the end
+        # of the last line the reader consumed
+        lines = map(methodcaller('decode', 'utf-8', 'replace'), f)
+        if jsonl:
+            f.seek(offset)
+            records = (_json_record(line) for line in lines if line.strip())
+        else:
+            first = next(lines, '').lstrip('\ufeff')  # Byte order mark, if any
+            header = [name.strip().lower() for name in next(csv.reader(chain([first], lines)), [])]
+            f.seek(max(offset, f.tell()))
+            # What csv.DictReader gives (blank lines skipped), without its per-row Python overhead
+            records = (dict(zip(header, values)) for values in csv.reader(lines) if values)
+
+        while True:
+            rows = list(islice(records, batch_size))
+            if not rows:
+                return
+            yield rows, f.tell()
+
+
+class ImportCheckpoint:
+    """Progress of one import, saved after every applied batch"""
+
+    def __init__(self, input_path: str, path: str = None):
+        self.input_path = os.path.abspath(input_path)
+        self.path = path or f"{input_path}.import.json"
+        st = os.stat(input_path)
+        self.fingerprint = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+        self.state = self._fresh()
+
+    def _fresh(self) -> Dict:
+        return {
+            'input': self.input_path, **self.fingerprint,
+            'offset': 0, 'rows': 0, 'imported': 0, 'invalid': 0,
+            'new_numbers': 0, 'new_upis': 0, 'elapsed_s': 0.0
+        }
+
+    def load(self) -> bool:
+        """Pick up a previous run on the same, unchanged input. Returns True if resuming."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if state.get('input') != self.input_path or any(state.get(k) != v for k, v in self.fingerprint.items()):
+            print(f"⚠️ Ignoring checkpoint {self.path}: input file changed")
+            return False
+        self.state = state
+        return True
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def import_file(path: str, db: LiveScammerDB = live_db, scam_type: str = DEFAULT_SCAM_TYPE,
+                batch_size: int = DEFAULT_BATCH_SIZE, resume: bool = True,
+                checkpoint_path: str = None, progress: Callable[[Dict], None] = None) -> Dict:
+    """
+    Import a CSV/JSONL dump of reported numbers and UPI IDs.
+
+    Each batch is applied with LiveScammerDB.add_reports (one snapshot
+    publish) and then checkpointed, so an interrupted import resumes after
+    the last applied batch. A batch whose publish fails raises before it is
+    checkpointed. Publishes take the snapshot's publish lock and merge with
+    what the app published meanwhile, so an import can run next to it.
+
+    Returns:
+        Import statistics (rows, imported, invalid, new_numbers, new_upis, elapsed_s, rows_per_s)
+    """
+    checkpoint = ImportCheckpoint(path, checkpoint_path)
+    resumed = resume and checkpoint.load()
+    state = checkpoint.state
+    if resumed:
+        print(f"↩️ Resuming {path} at row {state['rows']:,}")
+
+    start = time.perf_counter() - state['elapsed_s']
+    for rows, offset in read_batches(path, state['offset'], batch_size):
+        reports = [report for report in (parse_row(row, scam_type) for row in rows) if report]
+        applied = db.add_reports(reports)
+
+        state['offset'] = offset
+        state['rows'] += len(rows)
+        state['imported'] += applied['reports']
+        state['invalid'] += len(rows) - len(reports)
+        state['new_numbers'] += applied['new_numbers']
+        state['new_upis'] += applied['new_upis']
+        state['elapsed_s'] = time.perf_counter() - start
+        checkpoint.save()
+
+        if progress:
+            progress(dict(state, percent=round(100 * offset / state['size'], 1) if not path.endswith('.gz') else None))
+
+    checkpoint.clear()
+    elapsed = time.perf_counter() - start
+    return {
+        'rows': state['rows'],
+        'imported': state['imported'],
+        'invalid': state['invalid'],
+        'new_numbers': state['new_numbers'],
+        'new_upis': state['new_upis'],
+        'elapsed_s': round(elapsed, 2),
+        'rows_per_s': round(state['rows'] / elapsed) if elapsed else 0,
+        'resumed': resumed
+    }
+
+
+def _print_progress(state: Dict):
+    rate = state['rows'] / state['elapsed_s'] if state['elapsed_s'] else 0
+    percent = f" ({state['percent']}%)" if state.get('percent') is not None else ""
+    print(f"📥 {state['rows']:,} rows{percent} - {rate:,.0f} rows/s, "
+          f"{state['invalid']:,} invalid, {state['new_numbers']:,} new numbers, {state['new_upis']:,} new UPI IDs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import reported phone numbers / UPI IDs from CSV or JSONL")
+    parser.add_argument('path', help="CSV (with header) or JSONL file, optionally .gz")
+    parser.add_argument('--scam-type', default=DEFAULT_SCAM_TYPE, help="Scam type for rows without one")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="Rows per transaction")
+    parser.add_argument('--checkpoint', help="Checkpoint file (default: <path>.import.json)")
+    parser.add_argument('--restart', action='store_true', help="Ignore any checkpoint and start over")
+    args = parser.parse_args()
+
+    result = import_file(args.path, scam_type=args.scam_type, batch_size=args.batch_size,
+                         resume=not args.restart, checkpoint_path=args.checkpoint, progress=_print_progress)
+    print(f"✅ Imported {result['imported']:,} of {result['rows']:,} rows in {result['elapsed_s']}s "
+          f"({result['rows_per_s']:,} rows/s) - {result['invalid']:,} invalid")
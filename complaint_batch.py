@@ -0,0 +1,226 @@
+"""
+Satark.ai - Batch Complaint PDFs
+Drafts complaint PDFs in bulk, for NGOs filing on behalf of many victims.
+- Uses the complaint templates of complaint_pdf.py: each worker process
+  wraps a template's boilerplate once, then only fills in per-scan fields
+- Scans are rendered in chunks across a process pool (PDF_BATCH_WORKERS)
+- Finished PDFs are streamed to a directory or a .zip as chunks complete;
+  only a few chunks are in flight, so a 10k batch never sits in memory
+- A scan that fails to render, or an input line that is not a JSON object,
+  is reported and counted as failed, not fatal
+- Duplicate file names (repeated or colliding scan_ids) get the input line
+  number appended instead of overwriting each other, and are counted
+- Complaints, pages and pages/sec reported at the end
+
+Input is JSON Lines, one scan per line with the fields render_complaint
+takes, plus optional scan_id (file name), template and language.
+
+Usage:
+    python complaint_batch.py render scans.jsonl --out complaints.zip [--template ngo] [--language English]
+    python complaint_batch.py bench [--complaints 10000] [--workers 4]
+"""
+
+import argparse
+import json
+import os
+import re
+import tempfile
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from complaint_pdf import complaint_template
+
+
+PDF_BATCH_WORKERS = int(os.getenv("PDF_BATCH_WORKERS", str(os.cpu_count() or 2)))
+# Scans per task sent to a worker (amortises the inter-process round trip)
+PDF_BATCH_CHUNK = int(os.getenv("PDF_BATCH_CHUNK", "50"))
+
+
+def _render_chunk(chunk: List[Tuple[str, dict]], template: str, language: str) -> List[Tuple[str, bytes, int, str]]:
+    """Worker process: render a chunk of scans. Returns (name, pdf, pages, error) per scan."""
+    rendered = []
+    for name, scam_details in chunk:
+        try:
+            pdf, pages = complaint_template(scam_details.get("template") or template,
+                                            scam_details.get("language") or language).render(scam_details)
+            rendered.append((name, pdf, pages, None))
+        except Exception as e:
+            rendered.append((name, b'', 0, f"{type(e).__name__}: {e}"))
+    return rendered
+
+
+class PDFWriter:
+    """Writes finished PDFs into a directory, or into a zip if the path ends in .zip"""
+
+    def __init__(self, out: str):
+        self.out = out
+        if out.lower().endswith('.zip'):
+            os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+            # PDF streams are already deflated; storing them keeps the writer off the critical path
+            self._zip = zipfile.ZipFile(out, 'w', compression=zipfile.ZIP_STORED)
+        else:
+            os.makedirs(out, exist_ok=True)
+            self._zip = None
+
+    def write(self, name: str, pdf: bytes):
+        if self._zip is not None:
+            self._zip.writestr(name, pdf)
+        else:
+            with open(os.path.join(self.out, name), 'wb') as f:
+                f.write(pdf)
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+
+
+def _chunks(scans: Iterable[dict], size: int, stats: Dict) -> Iterator[List[Tuple[str, dict]]]:
+    """Scans with their output file names, in chunks of size. Renamed duplicates are counted in stats."""
+    chunk = []
+    names = set()
+    for i, scam_details in enumerate(scans, 1):
+        if not isinstance(scam_details, dict):
+            # A malformed input line (None from read_scans, which reported it) fails alone
+            stats['failed'] += 1
+            if scam_details is not None:
+                print(f"❌ scan {i}: expected a dict, got {type(scam_details).__name__}")
+            continue
+        stem = re.sub(r'[^A-Za-z0-9_-]', '_', str(scam_details.get("scan_id") or f"complaint_{i:06d}"))
+        name = stem + '.pdf'
+        if name in names:
+            # Repeated scan_id, or one that sanitises to another's name (a/b, a_b):
+            # suffix the input line number so no complaint overwrites another
+            stats['renamed'] += 1
+            suffix = i
+            while name in names:
+                name = f"{stem}_{suffix}.pdf"
+                suffix += 1
+        names.add(name)
+        chunk.append((name, scam_details))
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def render_batch(scans: Iterable[dict], out: str, template: str = 'citizen', language: str = 'English',
+                 workers: int = PDF_BATCH_WORKERS, chunk_size: int = PDF_BATCH_CHUNK) -> Dict:
+    """
+    Render every scan into `out` (a directory or a .zip).
+
+    Returns:
+        dict with complaints, pages, failed, renamed (duplicate file names
+        given a line-number suffix), seconds and pages_per_sec
+    """
+    stats = {'complaints': 0, 'pages': 0, 'failed': 0, 'renamed': 0}
+    writer = PDFWriter(out)
+    start = time.perf_counter()
+    chunks = _chunks(scans, chunk_size, stats)
+    try:
+        with ProcessPoolExecutor(workers) as executor:
+            in_flight = set()
+            while True:
+                # Keep every worker busy with one chunk queued behind it, no more
+                for chunk in chunks:
+                    in_flight.add(executor.submit(_render_chunk, chunk, template, language))
+                    if len(in_flight) >= 2 * workers:
+                        break
+                if not in_flight:
+                    break
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for name, pdf, pages, error in future.result():
+                        if error:
+                            stats['failed'] += 1
+                            print(f"❌ {name}: {error}")
+                            continue
+                        writer.write(name, pdf)
+                        stats['complaints'] += 1
+                        stats['pages'] += pages
+    finally:
+        writer.close()
+    stats['seconds'] = round(time.perf_counter() - start, 2)
+    stats['pages_per_sec'] = round(stats['pages'] / stats['seconds'], 1) if stats['seconds'] else 0.0
+    return stats
+
+
+def read_scans(path: str) -> Iterator[dict]:
+    """Scans from a JSON Lines file, read lazily. A line that is not a JSON object is reported and yields None."""
+    with open(path, encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                scam_details = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"❌ line {line_no}: {type(e).__name__}: {e}")
+                yield None
+                continue
+            if not isinstance(scam_details, dict):
+                print(f"❌ line {line_no}: expected a JSON object, got {type(scam_details).__name__}")
+                scam_details = None
+            yield scam_details
+
+
+def sample_scans(count: int) -> Iterator[dict]:
+    """Synthetic scans with realistic field lengths, for the benchmark"""
+    scam_types = ["Digital Arrest", "KYC Update Fraud", "Lottery Scam", "Loan App Fraud", "Part-time Job Scam"]
+    message = ("Dear customer, your bank account will be BLOCKED today. Update your KYC immediately at "
+               "http://sbi-kyc-update.xyz or call our officer. Share the OTP sent to your number to continue. ")
+    for i in range(count):
+        yield {
+            'scan_id': f"bench-{i:06d}",
+            'scam_type': scam_types[i % len(scam_types)],
+            'phone_number': f"+91 98{i % 100:02d}0 {i % 100000:05d}",
+            'company_name': "State Bank of India" if i % 2 else None,
+            'amount': f"Rs. {(i % 50 + 1) * 1000}",
+            'extracted_text': message * (1 + i % 8),
+            'risk_score': 80 + i % 20,
+            'red_flags': ["Urgency pressure", "Suspicious link", "Asks for OTP", "Impersonates a bank"][:1 + i % 4],
+            'reasoning': "The message impersonates a bank and pressures the recipient to share an OTP. " * (1 + i % 4),
+            'victim_name': f"Victim {i}",
+            'user_profile': {'name': "Sahayata Foundation", 'contact': "+91 22 5555 0100",
+                             'email': "help@sahayata.example", 'address': "12 MG Road",
+                             'city': "Pune", 'state': "Maharashtra"},
+            'reported_at': "2026-10-01T10:15:00"
+        }
+
+
+def benchmark(complaints: int = 10000, workers: int = PDF_BATCH_WORKERS):
+    """Pages/sec on one worker vs the whole pool, written to a zip"""
+    out_dir = tempfile.mkdtemp()
+    print(f"📄 {complaints} complaints ('ngo' template) -> zip")
+    for n in sorted({1, workers}):
+        stats = render_batch(sample_scans(complaints), os.path.join(out_dir, f"bench_{n}.zip"), template='ngo',
+                             workers=n)
+        size_mb = os.path.getsize(os.path.join(out_dir, f"bench_{n}.zip")) / 1024 / 1024
+        print(f"   {n:>2} worker{'s' if n > 1 else ' '}: {stats['seconds']:.1f}s, {stats['pages']} pages, "
+              f"{stats['pages_per_sec']:.0f} pages/s, {complaints / stats['seconds']:.0f} complaints/s, "
+              f"{size_mb:.0f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Satark.ai batch complaint PDFs")
+    sub = parser.add_subparsers(dest='command', required=True)
+    render = sub.add_parser('render', help="Render complaints for every scan in a JSON Lines file")
+    render.add_argument('scans', help="JSON Lines file, one scan per line")
+    render.add_argument('--out', required=True, help="Output directory, or a .zip file")
+    render.add_argument('--template', default='citizen', help="Default template: citizen or ngo")
+    render.add_argument('--language', default='English', help="Default complaint language")
+    render.add_argument('--workers', type=int, default=PDF_BATCH_WORKERS)
+    render.add_argument('--chunk', type=int, default=PDF_BATCH_CHUNK, help="Scans per worker task")
+    bench = sub.add_parser('bench', help="Benchmark pages/sec on synthetic scans")
+    bench.add_argument('--complaints', type=int, default=10000)
+    bench.add_argument('--workers', type=int, default=PDF_BATCH_WORKERS)
+    args = parser.parse_args()
+
+    if args.command == 'render':
+        stats = render_batch(read_scans(args.scans), args.out, args.template, args.language, args.workers, args.chunk)
+        print(f"✅ {stats['complaints']} complaints ({stats['pages']} pages) written to {args.out} in "
+              f"{stats['seconds']}s - {stats['pages_per_sec']} pages/s, {stats['failed']} failed, "
+              f"{stats['renamed']} renamed (duplicate scan_id)")
+    else:
+        benchmark(args.complaints, args.workers)
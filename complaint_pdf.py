@@ -0,0 +1,433 @@
+"""
+Satark.ai - Complaint PDFs
+Cyber complaint PDFs are drafted on demand, off the Streamlit thread,
+and kept on disk so reruns and repeat downloads don't redo the layout.
+- FPDF layout runs in a small process pool (PDF_WORKERS), so it never
+  holds the GIL of the process serving the UI
+- Disk cache keyed by a hash of everything rendered (scan details, template,
+  language), so an edited scan never gets a stale PDF and no two scans share
+  a file; least recently used files are evicted past PDF_CACHE_MAX_MB
+- Concurrent requests for the same complaint share one render
+- Templates per wording and language: boilerplate is wrapped once, only
+  the scan's own fields are laid out per PDF (complaint_batch.py drafts
+  thousands at a time with the same templates)
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from fpdf import FPDF
+from fpdf.enums import XPos, YPos
+
+from metrics import PDF_CACHE, PDF_SECONDS
+from singleflight import SingleFlight
+
+
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", "pdf_cache")
+PDF_CACHE_MAX_MB = float(os.getenv("PDF_CACHE_MAX_MB", "200"))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2"))
+PDF_RENDER_TIMEOUT = 60
+
+
+# Complaint wording per template and language. The core PDF fonts are Latin-1 only, so
+# Hindi/Marathi would need a bundled Unicode font - those complaints are drafted in English.
+COMPLAINT_TEMPLATES = {
+    # Filed by the person who received the message
+    'citizen': {
+        'English': {
+            'title': "OFFICIAL COMPLAINT - CYBER CRIME REPORT",
+            'addressee': "The Nodal Officer,\nCyber Crime Cell,\n{city}, {state}\nNational Cyber Crime Reporting Portal",
+            'subject': "Subject: Reporting Financial Fraud Attempt via WhatsApp/SMS",
+            'salutation': "Respected Sir/Madam,",
+            'opening': "I am writing to formally report a suspected financial fraud attempt that I received on {date} "
+                       "at approximately {time}. The sender, identified as {phone_number}, attempted to defraud me "
+                       "using the pretext of \"{scam_type}\".",
+            'impersonation': "The fraudulent message impersonated \"{company_name}\" and mentioned an amount of {amount}. "
+                             "This is a clear attempt to deceive unsuspecting citizens.",
+            'no_impersonation': "The message contained suspicious content mentioning {amount}. "
+                                "This is a clear attempt to deceive unsuspecting citizens.",
+            'analysis': "AI ANALYSIS REPORT (Satark.ai):",
+            'exhibit': "EXHIBIT A - EXTRACTED MESSAGE CONTENT:",
+            'requests': "I kindly request you to:\n1. Register an FIR against the perpetrator(s)\n"
+                        "2. Investigate and trace the fraudulent sender\n"
+                        "3. Take necessary action to prevent others from being victimized\n"
+                        "4. Block the reported phone number/UPI ID if applicable",
+            'declaration': "I hereby declare that the information provided above is true to the best of my knowledge. "
+                           "I am willing to cooperate with the investigation as required.",
+            'closing': "Yours faithfully,",
+            'footer': ("This complaint was generated using Satark.ai - AI-Powered Scam Detection",
+                       "National Cyber Crime Helpline: 1930 | cybercrime.gov.in")
+        }
+    },
+    # Filed by an NGO for a victim it is assisting; user_profile is the NGO's contact
+    'ngo': {
+        'English': {
+            'title': "OFFICIAL COMPLAINT - CYBER CRIME REPORT",
+            'addressee': "The Nodal Officer,\nCyber Crime Cell,\n{city}, {state}\nNational Cyber Crime Reporting Portal",
+            'subject': "Subject: Reporting Financial Fraud Attempt via WhatsApp/SMS on Behalf of a Victim",
+            'salutation': "Respected Sir/Madam,",
+            'opening': "We are writing on behalf of {victim_name}, whom our organisation is assisting, to formally "
+                       "report a suspected financial fraud attempt received on {date} at approximately {time}. "
+                       "The sender, identified as {phone_number}, attempted to defraud them using the pretext of "
+                       "\"{scam_type}\".",
+            'impersonation': "The fraudulent message impersonated \"{company_name}\" and mentioned an amount of {amount}. "
+                             "This is a clear attempt to deceive unsuspecting citizens.",
+            'no_impersonation': "The message contained suspicious content mentioning {amount}. "
+                                "This is a clear attempt to deceive unsuspecting citizens.",
+            'analysis': "AI ANALYSIS REPORT (Satark.ai):",
+            'exhibit': "EXHIBIT A - EXTRACTED MESSAGE CONTENT:",
+            'requests': "We kindly request you to:\n1. Register an FIR against the perpetrator(s)\n"
+                        "2. Investigate and trace the fraudulent sender\n"
+                        "3. Take necessary action to prevent others from being victimized\n"
+                        "4. Block the reported phone number/UPI ID if applicable",
+            'declaration': "We hereby declare that the information provided above is true to the best of our knowledge, "
+                           "as reported to us by the victim. We are willing to cooperate with the investigation as required.",
+            'closing': "Yours faithfully, for and on behalf of",
+            'footer': ("This complaint was generated using Satark.ai - AI-Powered Scam Detection",
+                       "National Cyber Crime Helpline: 1930 | cybercrime.gov.in")
+        }
+    }
+}
+
+# (family, style, size, line height)
+TITLE = ("Helvetica", "B", 16, 10)
+HEADING = ("Helvetica", "B", 11, 6)
+BODY = ("Helvetica", "", 11, 6)
+DETAIL = ("Helvetica", "", 10, 5)
+NOTE = ("Helvetica", "I", 10, 5)
+EVIDENCE = ("Courier", "", 9, 4)
+FOOTER = ("Helvetica", "I", 8, 4)
+
+
+def _latin1(value) -> str:
+    """Text the core fonts can draw (anything else becomes '?')"""
+    return str(value).encode('latin-1', 'replace').decode('latin-1')
+
+
+def wrap_lines(pdf: FPDF, text: str) -> List[str]:
+    """
+    Break text into lines that fit between the margins in the current font.
+    One pass with the font's width table - FPDF's multi_cell re-measures the
+    whole line for every character, which was most of a complaint's render time.
+    """
+    widths = pdf.current_font.cw
+    limit = (pdf.epw - 2 * pdf.c_margin) * pdf.k * 1000 / pdf.font_size_pt
+    space = widths[' ']
+    lines = []
+    for paragraph in text.split('\n'):
+        line, line_width = '', 0
+        for word in paragraph.split(' '):
+            word_width = sum(widths.get(c, 0) for c in word)
+            if line and line_width + space + word_width <= limit:
+                line += ' ' + word
+                line_width += space + word_width
+                continue
+            if line:
+                lines.append(line)
+            # A word longer than a line is broken between characters
+            while word_width > limit:
+                cut, cut_width = 0, 0
+                while cut < len(word) and cut_width + widths.get(word[cut], 0) <= limit:
+                    cut_width += widths.get(word[cut], 0)
+                    cut += 1
+                cut = max(cut, 1)
+                lines.append(word[:cut])
+                word = word[cut:]
+                word_width = sum(widths.get(c, 0) for c in word)
+            line, line_width = word, word_width
+        lines.append(line)
+    return lines
+
+
+class ComplaintTemplate:
+    """One complaint template in one language; its static paragraphs are wrapped once and reused"""
+
+    def __init__(self, name: str = 'citizen', language: str = 'English'):
+        languages = COMPLAINT_TEMPLATES[name]
+        self.name = name
+        self.language = language if language in languages else 'English'
+        self.text = languages[self.language]
+        # Boilerplate is laid out on a scratch page, once per template and language
+        scratch = self._new_pdf()
+        self.requests = self._wrap(scratch, BODY, self.text['requests'])
+        self.declaration = self._wrap(scratch, NOTE, self.text['declaration'])
+
+    @staticmethod
+    def _new_pdf() -> FPDF:
+        pdf = FPDF()
+        pdf.add_page()
+        pdf.set_auto_page_break(auto=True, margin=15)
+        return pdf
+
+    @staticmethod
+    def _wrap(pdf: FPDF, font: Tuple, text: str) -> List[str]:
+        pdf.set_font(*font[:3])
+        return wrap_lines(pdf, text)
+
+    @staticmethod
+    def _lines(pdf: FPDF, font: Tuple, lines: List[str], align: str = "L", border: bool = False, fill: bool = False):
+        pdf.set_font(*font[:3])
+        for i, line in enumerate(lines):
+            # A bordered block is one box around all of its lines
+            edges = ("LR" + ("T" if i == 0 else "") + ("B" if i == len(lines) - 1 else "")) if border else 0
+            pdf.cell(0, font[3], line, border=edges, fill=fill, align=align,
+                     new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+    def _paragraph(self, pdf: FPDF, font: Tuple, text: str, **kwargs):
+        self._lines(pdf, font, self._wrap(pdf, font, text), **kwargs)
+
+    def render(self, scam_details: dict) -> Tuple[bytes, int]:
+        """Fill in one scan's details. Returns (PDF bytes, page count)."""
+        text = self.text
+        user_profile = scam_details.get("user_profile", {})
+        # When the message was scanned, not when the PDF happens to be drafted
+        reported_at = scam_details.get("reported_at")
+        received = datetime.fromisoformat(reported_at) if reported_at else datetime.now()
+        company_name = scam_details.get("company_name")
+        fields = {
+            'scam_type': _latin1(scam_details.get("scam_type", "[Unknown Scam Type]")),
+            'phone_number': _latin1(scam_details.get("phone_number") or "[Unknown Number]"),
+            'company_name': _latin1(company_name or "[Unknown Entity]"),
+            'amount': _latin1(scam_details.get("amount") or "[Amount Not Specified]"),
+            'victim_name': _latin1(scam_details.get("victim_name") or "[Victim Name]"),
+            'city': _latin1(user_profile.get("city", "[City Name]")),
+            'state': _latin1(user_profile.get("state", "[State]")),
+            'date': received.strftime("%d %B %Y"),
+            'time': received.strftime("%I:%M %p")
+        }
+        risk_score = scam_details.get("risk_score", 0)
+        red_flags = scam_details.get("red_flags", [])
+        reasoning = _latin1(scam_details.get("reasoning") or "[AI analysis not available]")
+        extracted_text = _latin1(scam_details.get("extracted_text") or "[Screenshot text not available]")
+        if len(extracted_text) > 800:
+            extracted_text = extracted_text[:800] + "... [truncated]"
+        ref_no = f"SATARK/{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        if scam_details.get("scan_id"):
+            # Complaints drafted in the same second (batches) still get distinct references
+            ref_no += f"-{_latin1(scam_details['scan_id'])[:8]}"
+
+        pdf = self._new_pdf()
+
+        # Header
+        self._lines(pdf, TITLE, [text['title']], align="C")
+        pdf.ln(5)
+        self._lines(pdf, DETAIL, [f"Reference No: {ref_no}", f"Date: {fields['date']}"], align="R")
+        pdf.ln(10)
+
+        # To Section
+        self._lines(pdf, HEADING, ["To:"])
+        self._paragraph(pdf, BODY, text['addressee'].format(**fields))
+        pdf.ln(5)
+
+        # Subject
+        self._lines(pdf, HEADING, [text['subject']])
+        pdf.ln(5)
+
+        # Salutation and body
+        self._lines(pdf, BODY, [text['salutation']])
+        pdf.ln(3)
+        self._paragraph(pdf, BODY, text['opening'].format(**fields))
+        pdf.ln(3)
+        self._paragraph(pdf, BODY, text['impersonation' if company_name else 'no_impersonation'].format(**fields))
+        pdf.ln(5)
+
+        # AI Analysis Section
+        self._lines(pdf, HEADING, [text['analysis']])
+        analysis = [f"- Risk Score: {risk_score}/100 (HIGH RISK)", f"- Scam Type: {fields['scam_type']}"]
+        if red_flags:
+            analysis.append("- Red Flags Detected:")
+            analysis.extend(f"    * {_latin1(flag)}" for flag in red_flags[:5])  # Limit to 5 flags
+        self._lines(pdf, DETAIL, analysis)
+        pdf.ln(3)
+        self._paragraph(pdf, NOTE, f"AI Reasoning: {reasoning}")
+        pdf.ln(5)
+
+        # Evidence Section, in a bordered box
+        self._lines(pdf, HEADING, [text['exhibit']])
+        pdf.set_draw_color(100, 100, 100)
+        pdf.set_fill_color(245, 245, 245)
+        self._paragraph(pdf, EVIDENCE, extracted_text, border=True, fill=True)
+        pdf.ln(5)
+
+        # Request Section and Declaration (wrapped once per template)
+        self._lines(pdf, BODY, self.requests)
+        pdf.ln(5)
+        self._lines(pdf, NOTE, self.declaration)
+        pdf.ln(10)
+
+        # Signature Section
+        self._lines(pdf, BODY, [text['closing']])
+        pdf.ln(8)
+        self._lines(pdf, BODY, [_latin1(user_profile.get("name", "[Your Name]")),
+                                _latin1(user_profile.get("contact", "[Your Contact Number]")),
+                                _latin1(user_profile.get("email", "[Your Email Address]")),
+                                _latin1(user_profile.get("address", "[Your Address]"))])
+        pdf.ln(10)
+
+        # Footer
+        pdf.set_text_color(128, 128, 128)
+        self._lines(pdf, FOOTER, list(text['footer']), align="C")
+
+        return bytes(pdf.output()), pdf.pages_count
+
+
+@lru_cache(maxsize=None)
+def complaint_template(name: str = 'citizen', language: str = 'English') -> ComplaintTemplate:
+    """Template prepared once per process (and per worker process)"""
+    return ComplaintTemplate(name, language)
+
+
+def render_complaint(scam_details: dict, template: str = 'citizen', language: str = 'English') -> bytes:
+    """
+    Generate a formal cyber complaint PDF for reporting scams.
+    
+    Args:
+        scam_details: Dictionary containing:
+            - scam_type: Type of scam detected
+            - phone_number: Scammer's phone number (if extracted)
+            - company_name: Fake company name (if any)
+            - amount: Amount mentioned (if any)
+            - extracted_text: OCR text from screenshot
+            - risk_score: AI-assigned risk score
+            - red_flags: List of detected red flags
+            - reasoning: AI's reasoning
+            - user_profile: Dictionary with name, contact, email, address, city, state
+            - reported_at: ISO time the message was scanned (optional, defaults to now)
+            - scan_id: Added to the reference number (optional)
+            - victim_name: Person the complaint is filed for ('ngo' template)
+        template: Wording - 'citizen' or 'ngo' (see COMPLAINT_TEMPLATES)
+        language: Complaint language; falls back to English
+    
+    Returns:
+        PDF as bytes for download
+    """
+    return complaint_template(template, language).render(scam_details)[0]
+
+
+def _render_to_file(scam_details: dict, template: str, language: str, path: str):
+    """Worker process: lay out the PDF and write it atomically"""
+    pdf = render_complaint(scam_details, template, language)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(pdf)
+    os.replace(tmp_path, path)
+
+
+class ComplaintPDFCache:
+    """On-demand complaint PDFs, rendered in a process pool and cached on disk by content hash"""
+
+    def __init__(self, directory: str = PDF_CACHE_DIR, max_bytes: int = int(PDF_CACHE_MAX_MB * 1024 * 1024),
+                 workers: int = PDF_WORKERS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._pool = None
+        self._flight = SingleFlight()
+
+    def _executor(self, reset: bool = False) -> ProcessPoolExecutor:
+        with self._lock:
+            if reset and self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.workers)
+                atexit.register(self._pool.shutdown)
+            return self._pool
+
+    @staticmethod
+    def cache_key(scam_details: dict, template: str = 'citizen', language: str = 'English') -> str:
+        """SHA-256 of everything that goes into the PDF"""
+        rendered = json.dumps([template, language, scam_details], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(rendered.encode('utf-8')).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def is_cached(self, scam_details: dict, template: str = 'citizen', language: str = 'English') -> bool:
+        return os.path.exists(self.path(self.cache_key(scam_details, template, language)))
+
+    def get(self, scam_details: dict, template: str = 'citizen', language: str = 'English') -> bytes:
+        """
+        The complaint PDF for a scan: from the disk cache, or rendered in the worker pool.
+        Only the calling session waits; the layout itself runs in another process.
+        """
+        key = self.cache_key(scam_details, template, language)
+        path = self.path(key)
+        data = self._read(path)
+        if data is not None:
+            PDF_CACHE.inc(result='hit')
+            return data
+        PDF_CACHE.inc(result='miss')
+        self._flight.do(key, self._render, scam_details, template, language, path)
+        data = self._read(path)
+        # Evicted between render and read (cache far too small) - fall back to rendering here
+        return data if data is not None else render_complaint(scam_details, template, language)
+
+    def _render(self, scam_details: dict, template: str, language: str, path: str):
+        os.makedirs(self.directory, exist_ok=True)
+        start = time.perf_counter()
+        args = (_render_to_file, scam_details, template, language, path)
+        try:
+            self._executor().submit(*args).result(timeout=PDF_RENDER_TIMEOUT)
+        except BrokenProcessPool:
+            # A worker died (OOM, killed) - start a fresh pool and try once more
+            self._executor(reset=True).submit(*args).result(timeout=PDF_RENDER_TIMEOUT)
+        PDF_SECONDS.observe(time.perf_counter() - start)
+        self.evict()
+
+    def _read(self, path: str) -> Optional[bytes]:
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # Recently used - evicted last
+        except FileNotFoundError:
+            return None
+        return data
+
+    def evict(self) -> int:
+        """Delete least recently used PDFs until the cache fits in max_bytes. Returns files deleted."""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith('.pdf'):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        if removed:
+            PDF_CACHE.inc(removed, result='evicted')
+        return removed
+
+    def stats(self) -> Dict:
+        """Files and bytes in the disk cache"""
+        if not os.path.isdir(self.directory):
+            return {'files': 0, 'bytes': 0}
+        sizes = [entry.stat().st_size for entry in os.scandir(self.directory) if entry.name.endswith('.pdf')]
+        return {'files': len(sizes), 'bytes': sum(sizes)}
+
+
+# Process-wide cache shared by every session
+complaints = ComplaintPDFCache()
@@ -3,29 +3,31 @@ Email notification utility for Satark.ai
 Sends alerts when scams are detected
 """
 
-import smtplib
+from email.mime.application import MIMEApplication
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
-import os
+import uuid
 
+from mail_dispatcher import SENDER_EMAIL, dispatcher
+from mail_outbox import idempotency_key
 
-def send_scam_alert_email(scam_details: dict, recipient_email: str = "mistyraju0@gmail.com"):
+
+def send_scam_alert_email(scam_details: dict, recipient_email: str = "mistyraju0@gmail.com", wait: bool = False,
+                          key: str = None):
     """
-    Send email alert when scam is detected
+    Send email alert when scam is detected.
+    The message is stored in the outbox and sent by the background mail dispatcher; returns
+    True once queued, or with wait=True, once actually sent (False if the first attempt failed).
     
     Args:
         scam_details: Dictionary containing scam analysis results
         recipient_email: Email address to send alert to
+        wait: Block until the SMTP send has finished
+        key: Idempotency key (default: derived from the scan result)
     """
     try:
-        # Gmail SMTP configuration
-        smtp_server = "smtp.gmail.com"
-        smtp_port = 587
-        
-        # Use configured credentials
-        sender_email = "kalen5471@gmail.com"
-        sender_password = "qbodchmvakgmvueh"
+        sender_email = SENDER_EMAIL
         
         # Extract scam details
         verdict = scam_details.get("verdict", "UNKNOWN")
@@ -151,20 +153,150 @@ Satark.ai - Your Financial Bodyguard 🛡️
         message.attach(part1)
         message.attach(part2)
         
-        # Send email
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            server.starttls()
-            server.login(sender_email, sender_password)
-            server.sendmail(sender_email, recipient_email, message.as_string())
+        # Hand off to the outbox; the same scan result is alerted once per recipient
+        # (within the outbox's de-duplication window)
+        key = key or idempotency_key('alert', recipient_email, {
+            k: scam_details.get(k) for k in ("verdict", "risk_score", "scam_type", "reasoning", "red_flags", "extracted_entities")
+        })
+        future = dispatcher.submit(message, kind='alert', key=key)
+        return future.result() if wait else True
+        
+    except Exception as e:
+        print(f"❌ Failed to send email: {str(e)}")
+        return False
+
+
+def send_alert_digest(group: dict, recipient_email: str = "mistyraju0@gmail.com"):
+    """
+    Send one digest e-mail for a group of similar scam alerts (see alert_digest.py).
+    group is AlertGroup.to_dict(): scam_type, phones, upi_ids, domains, reports,
+    mailed_immediately, first_seen, last_seen, max_risk, red_flags, reasoning, window_start.
+    """
+    try:
+        scam_type = group.get("scam_type", "Unknown")
+        reports = group.get("reports", 0)
+        entities = [("Phone Number", p) for p in group.get("phones", [])] + \
+                   [("UPI ID", u) for u in group.get("upi_ids", [])] + \
+                   [("Domain", d) for d in group.get("domains", [])]
+        first_seen = group.get("first_seen", "")[:19].replace("T", " ")
+        last_seen = group.get("last_seen", "")[:19].replace("T", " ")
+        
+        message = MIMEMultipart("alternative")
+        message["Subject"] = f"📊 SCAM DIGEST: {scam_type} reported {reports} times - Max Risk: {group.get('max_risk', 0)}"
+        message["From"] = SENDER_EMAIL
+        message["To"] = recipient_email
         
-        print(f"✅ Scam alert email sent to {recipient_email}")
+        html_body = f"""
+        <html>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+            <div style="background: linear-gradient(135deg, #d32f2f, #f44336); color: white; padding: 20px; border-radius: 10px; text-align: center;">
+                <h1>🛡️ Satark.ai Scam Digest</h1>
+                <p>{reports} reports of the same scam campaign</p>
+            </div>
+            <div style="padding: 20px; background: #f9f9f9; border-radius: 10px; margin-top: 20px;">
+                <h3>📋 Scam Type: {scam_type}</h3>
+                <p><strong>First seen:</strong> {first_seen}<br>
+                   <strong>Last seen:</strong> {last_seen}<br>
+                   <strong>Already alerted individually:</strong> {group.get('mailed_immediately', 0)}</p>
+                <div style="background: #e3f2fd; border-left: 4px solid #2196F3; padding: 15px; margin: 15px 0;">
+                    <h3>📊 Shared Entities:</h3>
+                    <ul style="list-style-type: none; padding-left: 0;">
+                        {''.join([f'<li><strong>{label}:</strong> {value}</li>' for label, value in entities]) or '<li>None extracted</li>'}
+                    </ul>
+                </div>
+                <div style="background: #fff3cd; border-left: 4px solid #ff9800; padding: 15px; margin: 15px 0;">
+                    <h3>🚩 Red Flags:</h3>
+                    <ul style="list-style-type: none; padding-left: 0;">
+                        {''.join([f'<li>• {flag}</li>' for flag in group.get("red_flags", [])])}
+                    </ul>
+                </div>
+                <h3>🧠 Latest Analysis:</h3>
+                <p>{group.get("reasoning", "")}</p>
+            </div>
+        </body>
+        </html>
+        """
+        
+        text_body = f"""
+SATARK.AI SCAM DIGEST
+=====================
+
+SCAM TYPE: {scam_type}
+REPORTS: {reports} (already alerted individually: {group.get('mailed_immediately', 0)})
+FIRST SEEN: {first_seen}
+LAST SEEN: {last_seen}
+MAX RISK SCORE: {group.get('max_risk', 0)}%
+
+SHARED ENTITIES:
+{chr(10).join([f'- {label}: {value}' for label, value in entities]) or '- None extracted'}
+
+RED FLAGS:
+{chr(10).join([f'- {flag}' for flag in group.get("red_flags", [])])}
+
+LATEST ANALYSIS:
+{group.get("reasoning", "")}
+
+---
+Satark.ai - Your Financial Bodyguard 🛡️
+        """
+        
+        message.attach(MIMEText(text_body, "plain"))
+        message.attach(MIMEText(html_body, "html"))
+        
+        # One digest per group and window
+        key = idempotency_key('digest', recipient_email, [scam_type, group.get("phones"), group.get("upi_ids"),
+                                                          group.get("domains"), group.get("window_start")])
+        dispatcher.submit(message, kind='digest', key=key)
         return True
         
     except Exception as e:
-        print(f"❌ Failed to send email: {str(e)}")
+        print(f"❌ Failed to queue digest email: {str(e)}")
         return False
 
 
+def send_complaint_email(pdf_bytes: bytes, target_email: str, wait: bool = False):
+    """
+    Send the cyber complaint PDF to the user via the outbox and background mail dispatcher.
+    Returns True once queued, or with wait=True, once actually sent (False if the first attempt failed).
+    """
+    msg = MIMEMultipart()
+    msg['From'] = SENDER_EMAIL
+    msg['To'] = target_email
+    msg['Subject'] = '🛡️ Satark.ai - Cyber Crime Complaint Report'
+    
+    # Email body
+    body = """Dear User,
+
+Please find attached your Cyber Crime Complaint Report generated by Satark.ai.
+
+This document contains:
+- Scam Analysis Report
+- Extracted Evidence
+- Risk Assessment
+- Recommended Actions
+
+For any queries, please contact:
+📞 Cyber Helpline: 1930
+🌐 Report Online: https://cybercrime.gov.in
+
+Stay Safe!
+Satark.ai Team
+Your Financial Bodyguard 🛡️
+"""
+    
+    msg.attach(MIMEText(body, 'plain'))
+    
+    # Attach PDF
+    pdf_attachment = MIMEApplication(pdf_bytes, _subtype='pdf')
+    pdf_attachment.add_header('Content-Disposition', 'attachment', 
+                             filename=f'Cyber_Complaint_{datetime.now().strftime("%Y%m%d")}.pdf')
+    msg.attach(pdf_attachment)
+    
+    # Same PDF to the same address is sent once per de-duplication window (a double click)
+    future = dispatcher.submit(msg, kind='complaint', key=idempotency_key('complaint', target_email, pdf_bytes))
+    return future.result() if wait else True
+
+
 def send_test_email(recipient_email: str = "mistyraju0@gmail.com"):
     """Send a test email to verify configuration"""
     test_details = {
@@ -186,4 +318,6 @@ def send_test_email(recipient_email: str = "mistyraju0@gmail.com"):
         }
     }
     
-    return send_scam_alert_email(test_details, recipient_email)
+    # Every test is a new message, never a duplicate of the previous one
+    return send_scam_alert_email(test_details, recipient_email, wait=True,
+                                 key=idempotency_key('test', recipient_email, uuid.uuid4().hex))
@@ -0,0 +1,222 @@
+"""
+Satark.ai - Entity Extraction Engine
+One pre-compiled pattern pulls every scam entity out of text in a single pass.
+- Indian phone numbers (normalised to 10 digits)
+- UPI VPAs (lowercased, e-mail addresses excluded)
+- URLs and their domains
+- Rupee amounts (₹ / Rs / INR, lakh/crore aware)
+"""
+
+import re
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+TLDS = 'com|in|org|net|co|info|xyz|top|online|site|app|ly|link|live|club'
+
+
+# One branch per entity kind. Alternation order matters: URLs and e-mail
+# addresses are consumed before their pieces can be mistaken for a UPI
+# handle, a bare domain or a phone number.
+BRANCHES = (
+    ('url', r"""(?P<url>\b(?:https?://|www\.)[^\s<>"'()\[\]]+)"""),
+    # E-mail and UPI share one branch: a dotted domain after '@' means e-mail
+    ('handle', r"(?P<handle>(?<![\w.+\-])[\w.+\-]{2,256}@[a-z0-9\-]+(?:\.[a-z0-9\-]+)*)"),
+    ('amount', r"(?P<amount>(?:₹|\brs\.?|\binr)\s?(?P<amount_value>\d[\d,]*(?:\.\d+)?)"
+               r"(?:\s?(?P<amount_unit>lakhs?|lacs?|crores?|cr|k)\b)?)"),
+    # Starts on a word boundary rather than a lookbehind so the engine can skip non-digits fast
+    ('phone', r"(?P<phone>(?:\+91[\s\-]?|\b(?:0091[\s\-]?|91[\s\-]?|0)?)[6-9]\d{4}[\s\-]?\d{5}(?!\d)"
+              r"|\b0\d{10}(?!\d))"),
+    ('domain', r"(?P<domain>\b[a-z0-9][a-z0-9\-]*(?:\.[a-z0-9\-]+)*\.(?:" + TLDS + r")\b)"),
+)
+
+# Cheap C-speed checks deciding which branches a text can possibly match,
+# so the single pass only carries the branches it needs
+HAS_DIGIT = re.compile(r'\d')
+HAS_TLD = re.compile(r'\.(?:' + TLDS + r')\b', re.IGNORECASE)
+
+
+@lru_cache(maxsize=None)
+def _compiled(kinds: Tuple[str, ...]) -> re.Pattern:
+    """Combined single-pass pattern for a set of branches (compiled once per set)"""
+    return re.compile('|'.join(branch for kind, branch in BRANCHES if kind in kinds), re.IGNORECASE)
+
+
+def _branches_for(text: str) -> Tuple[str, ...]:
+    lowered = text.lower()
+    kinds = []
+    if 'http' in lowered or 'www.' in lowered:
+        kinds.append('url')
+    if '@' in text:
+        kinds.append('handle')
+    if HAS_DIGIT.search(text):
+        if '₹' in text or 'rs' in lowered or 'inr' in lowered:
+            kinds.append('amount')
+        kinds.append('phone')
+    if HAS_TLD.search(text):
+        kinds.append('domain')
+    return tuple(kinds)
+
+
+# Full pattern, for callers that want every branch
+ENTITY_PATTERN = _compiled(tuple(kind for kind, _ in BRANCHES))
+URL_HOST_PATTERN = re.compile(r'^(?:https?://)?([^/:?#]+)', re.IGNORECASE)
+NON_DIGIT = re.compile(r'\D')
+# A whole field holding one VPA (handle@provider, no dotted domain)
+UPI_PATTERN = re.compile(r'^[\w.\-]{2,256}@[a-z][a-z0-9\-]{1,63}$')
+
+AMOUNT_MULTIPLIERS = {
+    'k': 1_000,
+    'lakh': 100_000, 'lakhs': 100_000, 'lac': 100_000, 'lacs': 100_000,
+    'crore': 10_000_000, 'crores': 10_000_000, 'cr': 10_000_000,
+}
+
+
+def normalize_phone(phone: str) -> str:
+    """Any Indian phone format to its last 10 digits"""
+    return NON_DIGIT.sub('', phone)[-10:]
+
+
+def normalize_upi(upi_id: str) -> str:
+    return upi_id.strip().lower()
+
+
+def validate_phone(value: str) -> Optional[str]:
+    """Canonical 10-digit mobile number for a field holding one phone number, else None"""
+    digits = NON_DIGIT.sub('', value or '')
+    # Bare, 0-, 91- or 0091-prefixed Indian mobile numbers
+    if len(digits) not in (10, 11, 12, 14) or digits[-10] not in '6789':
+        return None
+    prefix = digits[:-10]
+    if prefix not in ('', '0', '91', '0091'):
+        return None
+    return digits[-10:]
+
+
+def validate_upi(value: str) -> Optional[str]:
+    """Canonical UPI ID for a field holding one VPA, else None"""
+    upi_id = normalize_upi(value or '')
+    return upi_id if UPI_PATTERN.match(upi_id) else None
+
+
+def url_domain(url: str) -> Optional[str]:
+    """Host part of a URL, lowercased, without 'www.'"""
+    match = URL_HOST_PATTERN.match(url.strip())
+    if not match:
+        return None
+    host = match.group(1).lower().rstrip('.')
+    return host[4:] if host.startswith('www.') else host
+
+
+def _amount_value(match: re.Match) -> Optional[float]:
+    try:
+        value = float(match.group('amount_value').replace(',', ''))
+    except ValueError:
+        return None
+    unit = (match.group('amount_unit') or '').lower()
+    return value * AMOUNT_MULTIPLIERS.get(unit, 1)
+
+
+def _empty_result() -> Dict[str, List]:
+    return {'phones': [], 'upi_ids': [], 'urls': [], 'domains': [], 'amounts': [], 'emails': []}
+
+
+def extract_entities(text: str) -> Dict[str, List]:
+    """
+    Extract canonical entities from text in one pass.
+
+    Returns:
+        dict with phones (10-digit), upi_ids (lowercase), urls, domains,
+        amounts (rupees as float) and emails - each deduplicated in order of appearance
+    """
+    result = _empty_result()
+    if not text:
+        return result
+
+    seen = set()
+
+    def add(kind: str, value):
+        if value is None or (kind, value) in seen:
+            return
+        seen.add((kind, value))
+        result[kind].append(value)
+
+    kinds = _branches_for(text)
+    if not kinds:
+        return result
+
+    for match in _compiled(kinds).finditer(text):
+        kind = match.lastgroup
+        if kind.startswith('amount'):
+            kind = 'amount'
+        value = match.group(kind)
+
+        if kind == 'url':
+            url = value.rstrip('.,;:!?')
+            add('urls', url)
+            add('domains', url_domain(url))
+        elif kind == 'handle':
+            handle = value.lower()
+            # A dotted domain after '@' is an e-mail address, otherwise a UPI VPA
+            if '.' in handle.split('@', 1)[1]:
+                add('emails', handle)
+            else:
+                add('upi_ids', normalize_upi(handle))
+        elif kind == 'amount':
+            add('amounts', _amount_value(match))
+        elif kind == 'phone':
+            add('phones', normalize_phone(value))
+        else:
+            add('domains', value.lower())
+
+    return result
+
+
+def extract_batch(texts: Iterable[str]) -> List[Dict[str, List]]:
+    """Extract entities from many texts (one result per text)"""
+    return [extract_entities(text) for text in texts]
+
+
+def merge_entities(results: Iterable[Dict[str, List]]) -> Dict[str, List]:
+    """Union of several extraction results, order preserved"""
+    merged = _empty_result()
+    for result in results:
+        for kind, values in result.items():
+            for value in values:
+                if value not in merged[kind]:
+                    merged[kind].append(value)
+    return merged
+
+
+if __name__ == "__main__":
+    # Benchmark: batch extraction throughput on a synthetic message corpus
+    samples = [
+        "URGENT: Your SBI account is suspended. Call +91 98765 43210 or pay ₹4,999 to verify@okaxis now",
+        "Congratulations! You won Rs. 25 lakh in KBC lottery. Contact 09123456789, visit http://kbc-lottery-win.xyz/claim",
+        "Digital arrest notice from CBI. Transfer INR 1.5 crore to cbi.settlement@ybl or face jail. Mail cbi.officer@gmail.com",
+        "Hi, your order is out for delivery. Track at www.indiapost-track.in/status?id=8842 - helpline 7012345678",
+        "Meeting at 5pm tomorrow, bring the documents. Thanks!",
+    ]
+    corpus = samples * 20000
+    size_mb = sum(len(t.encode('utf-8')) for t in corpus) / (1024 * 1024)
+
+    print("🔎 Sample extraction:")
+    for text in samples[:3]:
+        print(f"   {extract_entities(text)}")
+
+    start = time.perf_counter()
+    results = extract_batch(corpus)
+    elapsed = time.perf_counter() - start
+    print(f"\n⚡ {len(corpus):,} texts ({size_mb:.1f} MB) in {elapsed:.2f}s - {size_mb / elapsed:.1f} MB/s, {len(corpus) / elapsed:,.0f} texts/s")
+
+    # Old approach: three uncompiled phone regexes per text, no normalisation
+    old_patterns = [r'\+91[\s-]?\d{10}', r'\b0\d{10}\b', r'\b[6-9]\d{9}\b']
+    start = time.perf_counter()
+    for text in corpus:
+        numbers = []
+        for pattern in old_patterns:
+            numbers.extend(re.findall(pattern, text))
+        list(set(numbers))
+    elapsed = time.perf_counter() - start
+    print(f"   old phone-only extraction: {size_mb / elapsed:.1f} MB/s")
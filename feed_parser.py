@@ -0,0 +1,163 @@
+"""
+Satark.ai - Streaming RSS/Atom Feed Parser
+Incremental feed parsing built on ElementTree.iterparse.
+- Handles CDATA, XML/HTML entities and namespaced elements
+- Yields structured items (title, link, guid, published, source, description)
+- Stops reading as soon as the per-feed item limit is reached
+"""
+
+import html
+import io
+import re
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, Optional, Union
+
+
+TAG_RE = re.compile(r'<[^>]+>')
+SPACE_RE = re.compile(r'\s+')
+
+# RSS <item> and Atom <entry> (namespace stripped)
+ITEM_TAGS = ('item', 'entry')
+
+
+def _local(tag: str) -> str:
+    """Strip the '{namespace}' prefix ElementTree puts on tags"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _clean_text(text: Optional[str]) -> str:
+    """Decode leftover HTML entities, drop markup and collapse whitespace"""
+    if not text:
+        return ''
+    text = html.unescape(TAG_RE.sub(' ', html.unescape(text)))
+    return SPACE_RE.sub(' ', text).strip()
+
+
+def _parse_date(value: Optional[str]) -> Optional[str]:
+    """RSS (RFC 822) or Atom (ISO 8601) date to ISO 8601 UTC, so watermarks compare as strings"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat()
+
+
+def _item_from_element(elem: ET.Element) -> Dict:
+    item = {
+        'title': '',
+        'link': '',
+        'guid': '',
+        'published': None,
+        'source': '',
+        'description': ''
+    }
+
+    for child in elem:
+        name = _local(child.tag)
+        text = child.text or ''
+
+        if name == 'title':
+            item['title'] = _clean_text(text)
+        elif name == 'link':
+            # RSS puts the URL in the text, Atom in href (prefer rel="alternate")
+            href = child.get('href')
+            if href:
+                if not item['link'] or child.get('rel', 'alternate') == 'alternate':
+                    item['link'] = href.strip()
+            elif text.strip():
+                item['link'] = text.strip()
+        elif name in ('guid', 'id'):
+            item['guid'] = text.strip()
+        elif name in ('pubDate', 'published', 'updated', 'date'):
+            # First date wins: pubDate/published before updated
+            if not item['published']:
+                item['published'] = _parse_date(text)
+        elif name == 'source':
+            item['source'] = _clean_text(text)
+        elif name == 'author' and not item['source']:
+            author = child.find('{http://www.w3.org/2005/Atom}name')
+            item['source'] = _clean_text(author.text if author is not None else text)
+        elif name in ('description', 'summary', 'content') and not item['description']:
+            item['description'] = _clean_text(text)
+
+    if not item['guid']:
+        item['guid'] = item['link']
+    return item
+
+
+def parse_feed(source: Union[bytes, str, io.IOBase], limit: int = None) -> Iterator[Dict]:
+    """
+    Incrementally parse an RSS or Atom feed.
+
+    Args:
+        source: Feed bytes/str or a binary file-like object (e.g. a raw HTTP stream)
+        limit: Stop after this many items (the rest of the feed is never read)
+
+    Yields:
+        dict with title, link, guid, published (ISO UTC or None), source, description
+    """
+    if isinstance(source, str):
+        source = source.encode('utf-8')
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    count = 0
+    try:
+        for event, elem in ET.iterparse(source, events=('end',)):
+            if _local(elem.tag) not in ITEM_TAGS:
+                continue
+
+            yield _item_from_element(elem)
+            elem.clear()  # Free the subtree, the feed is never held whole in memory
+
+            count += 1
+            if limit is not None and count >= limit:
+                return
+    except ET.ParseError:
+        # Truncated or malformed feed - keep the items parsed so far
+        return
+
+
+def _regex_parse(content: str, limit: int):
+    """The previous title/link regex scraping, kept for the benchmark only"""
+    titles = re.findall(r'<title>(.*?)</title>', content)
+    links = re.findall(r'<link>(.*?)</link>', content)
+    return [(title, links[i + 1]) for i, title in enumerate(titles[1:limit + 1]) if i < len(links) - 1]
+
+
+if __name__ == "__main__":
+    # Benchmark against the recorded feed fixtures
+    import os
+
+    fixtures_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+    runs = 200
+
+    for name in ('google_news_rss.xml', 'advisories_atom.xml'):
+        with open(os.path.join(fixtures_dir, name), 'rb') as f:
+            data = f.read()
+        size_mb = len(data) / (1024 * 1024)
+
+        print(f"📰 {name} ({len(data) / 1024:.1f} KB)")
+        for label, limit in (('full feed', None), ('limit=5', 5)):
+            start = time.perf_counter()
+            for _ in range(runs):
+                items = list(parse_feed(data, limit=limit))
+            elapsed = (time.perf_counter() - start) / runs
+            print(f"   iterparse {label:<9}: {len(items):3d} items, {elapsed * 1000:.3f} ms/feed, {size_mb / elapsed:.1f} MB/s")
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            pairs = _regex_parse(data.decode('utf-8'), 100)
+        elapsed = (time.perf_counter() - start) / runs
+        print(f"   regex (old)        : {len(pairs):3d} items, {elapsed * 1000:.3f} ms/feed (titles/links only)")
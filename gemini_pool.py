@@ -0,0 +1,339 @@
+"""
+Satark.ai - Gemini Key Pool and Rate Limiter
+Routes every Gemini call through a pool of API keys instead of firing
+immediately on one key.
+- Token bucket per key for requests/minute (and tokens/minute, debited
+  with the actual usage reported by each response)
+- Least-loaded routing across the keys in GEMINI_API_KEYS / GEMINI_API_KEY
+- AIMD concurrency per key: +1/limit on success, halved (and a short
+  cool-off) on 429, so throughput tracks whatever quota is really left
+- Callers queue (bounded wait) instead of failing; queue wait is reported
+  separately from model latency
+- Keys typed in by users get their own limits, tracked under a hash of the
+  key in a bounded LRU
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import google.generativeai as genai
+from google.ai import generativelanguage as glm
+from dotenv import load_dotenv
+from google.api_core import exceptions as api_exceptions
+
+from metrics import GEMINI_QUEUE_WAIT_SECONDS, GEMINI_REQUESTS
+
+
+load_dotenv()
+
+
+MODEL_NAME = 'gemini-2.5-flash'
+
+# Per-key quota (0 = unlimited)
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "60"))
+GEMINI_TPM = float(os.getenv("GEMINI_TPM", "0"))
+# AIMD concurrency window per key
+GEMINI_INITIAL_CONCURRENCY = float(os.getenv("GEMINI_INITIAL_CONCURRENCY", "2"))
+GEMINI_MAX_CONCURRENCY = float(os.getenv("GEMINI_MAX_CONCURRENCY", "16"))
+# Seconds a key is skipped after a 429 (unless the error carries its own retry delay)
+GEMINI_RATE_LIMIT_COOLOFF = float(os.getenv("GEMINI_RATE_LIMIT_COOLOFF", "10"))
+# Longest a call waits for a free key before giving up
+GEMINI_QUEUE_TIMEOUT = float(os.getenv("GEMINI_QUEUE_TIMEOUT", "60"))
+# Attempts per call; a 429 retries on the least-loaded key
+GEMINI_MAX_ATTEMPTS = int(os.getenv("GEMINI_MAX_ATTEMPTS", "3"))
+# User-typed keys whose limits are tracked (least recently used dropped first)
+GEMINI_MAX_USER_KEYS = int(os.getenv("GEMINI_MAX_USER_KEYS", "256"))
+
+
+def configured_keys() -> List[str]:
+    """Shared keys: GEMINI_API_KEYS (comma-separated) plus GEMINI_API_KEY, deduplicated"""
+    keys = [k.strip() for k in os.getenv("GEMINI_API_KEYS", "").split(',') if k.strip()]
+    single = os.getenv("GEMINI_API_KEY")
+    if single and single not in keys:
+        keys.append(single)
+    return keys
+
+
+class QueueTimeout(Exception):
+    """No key had capacity within the queue timeout"""
+
+
+class KeyState:
+    """Rate and concurrency state of one API key (the key itself is kept only for shared keys)"""
+
+    def __init__(self, key: Optional[str], slot: str, rpm: float = GEMINI_RPM, tpm: float = GEMINI_TPM):
+        self.key = key
+        self.slot = slot  # Loggable name - never the key itself
+        self.rpm = rpm
+        self.tpm = tpm
+        # Buckets start full and hold up to 10s worth of quota
+        self.request_tokens = max(1.0, rpm / 6) if rpm else 0.0
+        self.token_budget = tpm / 6 if tpm else 0.0
+        self.updated = time.monotonic()
+        self.limit = GEMINI_INITIAL_CONCURRENCY
+        self.in_flight = 0
+        self.cooloff_until = 0.0
+        self.calls = 0
+        self.rate_limited = 0
+
+    def refill(self, now: float):
+        elapsed = now - self.updated
+        self.updated = now
+        if self.rpm:
+            self.request_tokens = min(max(1.0, self.rpm / 6), self.request_tokens + elapsed * self.rpm / 60)
+        if self.tpm:
+            self.token_budget = min(self.tpm / 6, self.token_budget + elapsed * self.tpm / 60)
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until this key can take a call (0 = now; inf = only when a call finishes)"""
+        if now < self.cooloff_until:
+            return self.cooloff_until - now
+        if self.in_flight >= int(self.limit):
+            return float('inf')
+        waits = [0.0]
+        if self.rpm and self.request_tokens < 1:
+            waits.append((1 - self.request_tokens) * 60 / self.rpm)
+        if self.tpm and self.token_budget <= 0:
+            waits.append(-self.token_budget * 60 / self.tpm + 0.01)
+        return max(waits)
+
+    def load(self) -> float:
+        return self.in_flight / int(self.limit)
+
+
+class Lease:
+    """One admitted call on a key"""
+
+    def __init__(self, state: KeyState, queue_wait_ms: float, key: str):
+        self.state = state
+        self.queue_wait_ms = queue_wait_ms
+        self.key = key
+
+
+class GeminiKeyPool:
+    """Admission control and least-loaded routing over Gemini API keys"""
+
+    def __init__(self, keys: List[str] = None, max_user_keys: int = GEMINI_MAX_USER_KEYS):
+        self._cond = threading.Condition()
+        self._states: Dict[str, KeyState] = {}
+        self._user_states: 'OrderedDict[str, KeyState]' = OrderedDict()
+        self.max_user_keys = max_user_keys
+        self.shared_keys = list(keys) if keys is not None else configured_keys()
+        for i, key in enumerate(self.shared_keys):
+            self._states[key] = KeyState(key, f"key-{i + 1}")
+
+    def _user_state(self, key: str) -> KeyState:
+        """
+        Limits of a key typed in by a user - its own, never routed to others.
+        Held under a hash of the key; the least recently used ones are dropped
+        beyond max_user_keys (a returning key starts with fresh limits).
+        """
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        state = self._user_states.get(digest)
+        if state is None:
+            state = self._user_states[digest] = KeyState(None, "user-key")
+            while len(self._user_states) > self.max_user_keys:
+                self._user_states.popitem(last=False)
+        else:
+            self._user_states.move_to_end(digest)
+        return state
+
+    def acquire(self, api_key: str = None, timeout: float = GEMINI_QUEUE_TIMEOUT) -> Lease:
+        """
+        Wait for capacity on a user's own key, or the least-loaded shared key.
+        Raises QueueTimeout after `timeout` seconds, ValueError if there is no key at all.
+        """
+        start = time.monotonic()
+        deadline = start + timeout
+        with self._cond:
+            if api_key and api_key not in self.shared_keys:
+                candidates = [self._user_state(api_key)]
+            else:
+                candidates = [self._states[k] for k in self.shared_keys]
+            if not candidates:
+                raise ValueError("No Gemini API key configured")
+            while True:
+                now = time.monotonic()
+                ready = []
+                next_wait = float('inf')
+                for state in candidates:
+                    state.refill(now)
+                    wait = state.wait_time(now)
+                    if wait == 0:
+                        ready.append(state)
+                    next_wait = min(next_wait, wait)
+                if ready:
+                    # Least loaded first; most request tokens left breaks ties
+                    state = min(ready, key=lambda s: (s.load(), -s.request_tokens))
+                    state.in_flight += 1
+                    if state.rpm:
+                        state.request_tokens -= 1
+                    queue_wait = now - start
+                    GEMINI_QUEUE_WAIT_SECONDS.observe(queue_wait)
+                    return Lease(state, round(queue_wait * 1000, 2), state.key or api_key)
+                if now >= deadline:
+                    raise QueueTimeout(f"No Gemini capacity within {timeout:g}s")
+                # Woken early by release(); otherwise when the next key becomes ready
+                self._cond.wait(min(next_wait, deadline - now))
+
+    def release(self, lease: Lease, rate_limited: bool = False, tokens_used: int = 0, retry_after: float = None):
+        """Finish a call: adjust the key's concurrency window (AIMD) and debit tokens used"""
+        state = lease.state
+        with self._cond:
+            state.in_flight -= 1
+            state.calls += 1
+            if rate_limited:
+                state.rate_limited += 1
+                state.limit = max(1.0, state.limit / 2)
+                state.cooloff_until = time.monotonic() + (retry_after or GEMINI_RATE_LIMIT_COOLOFF)
+                state.request_tokens = min(state.request_tokens, 0.0)
+            else:
+                state.limit = min(GEMINI_MAX_CONCURRENCY, state.limit + 1 / state.limit)
+            if state.tpm and tokens_used:
+                state.token_budget -= tokens_used
+            self._cond.notify_all()
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Per-key window, load and 429 counts (keyed by slot name)"""
+        with self._cond:
+            now = time.monotonic()
+            return {
+                state.slot: {
+                    'concurrency_limit': round(state.limit, 2),
+                    'in_flight': state.in_flight,
+                    'calls': state.calls,
+                    'rate_limited': state.rate_limited,
+                    'cooling_off_s': round(max(0.0, state.cooloff_until - now), 1)
+                }
+                for state in list(self._states.values()) + list(self._user_states.values())
+            }
+
+
+def _bind_client(model: genai.GenerativeModel, key: str) -> genai.GenerativeModel:
+    """
+    Give a model its own client for key.
+    google-generativeai only takes keys through genai.configure, which is
+    process-global, and a model builds its client from that on first use. So
+    the private _client attribute (checked on 0.8) is the only way to bind a
+    per-key client, and this is the one place it is set. If a release renames
+    it, calls fail here instead of going out on another key.
+    """
+    if not hasattr(model, '_client'):
+        raise RuntimeError("google-generativeai no longer exposes GenerativeModel._client; update _bind_client")
+    model._client = glm.GenerativeServiceClient(client_options={'api_key': key})
+    return model
+
+
+@lru_cache(maxsize=32)
+def _shared_model(key: str) -> genai.GenerativeModel:
+    return _bind_client(genai.GenerativeModel(MODEL_NAME), key)
+
+
+def model_for_key(key: str, shared: bool = True) -> genai.GenerativeModel:
+    """
+    Model bound to its own client for this key (concurrent calls on different keys can't share one).
+    Only shared keys are cached; a user's key gets a model for the one call,
+    so it is not held in memory after the request.
+    """
+    if shared:
+        return _shared_model(key)
+    return _bind_client(genai.GenerativeModel(MODEL_NAME), key)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Retry delay the API attached to a 429, if any"""
+    for detail in getattr(error, 'details', None) or []:
+        delay = getattr(detail, 'retry_delay', None)
+        if delay is not None:
+            try:
+                return delay.seconds + delay.nanos / 1e9
+            except AttributeError:
+                return None
+    return None
+
+
+def _tokens_used(response) -> int:
+    usage = getattr(response, 'usage_metadata', None)
+    return getattr(usage, 'total_token_count', 0) or 0
+
+
+def generate(contents, api_key: str = None, timeout: float = GEMINI_QUEUE_TIMEOUT) -> Tuple[object, Dict]:
+    """
+    generate_content through the pool, retrying 429s on the least-loaded key.
+
+    Returns:
+        (response, info) - info has queue_wait_ms (total time waiting for a key),
+        latency_ms (the successful model call), attempts and key_slot
+    Raises:
+        QueueTimeout, or the last API error
+    """
+    deadline = time.monotonic() + timeout
+    queue_wait_ms = 0.0
+    for attempt in range(1, GEMINI_MAX_ATTEMPTS + 1):
+        lease = pool.acquire(api_key, max(0.0, deadline - time.monotonic()))
+        queue_wait_ms += lease.queue_wait_ms
+        start = time.perf_counter()
+        try:
+            response = model_for_key(lease.key, shared=lease.state.key is not None).generate_content(contents)
+        except api_exceptions.TooManyRequests as e:
+            pool.release(lease, rate_limited=True, retry_after=_retry_after(e))
+            GEMINI_REQUESTS.inc(outcome='rate_limited')
+            if attempt == GEMINI_MAX_ATTEMPTS:
+                raise
+            continue
+        except Exception:
+            pool.release(lease)
+            raise
+        pool.release(lease, tokens_used=_tokens_used(response))
+        return response, {
+            'queue_wait_ms': round(queue_wait_ms, 2),
+            'latency_ms': round((time.perf_counter() - start) * 1000, 2),
+            'attempts': attempt,
+            'key_slot': lease.state.slot
+        }
+
+
+# Process-wide pool shared by every session
+pool = GeminiKeyPool()
+
+
+if __name__ == "__main__":
+    # Simulation: 3 keys with a hidden quota of 4 concurrent calls each, 60 callers
+    import random
+    from concurrent.futures import ThreadPoolExecutor
+
+    sim = GeminiKeyPool(['a', 'b', 'c'])
+    for s in sim._states.values():
+        s.rpm = 0  # Only the concurrency quota in this run
+    hidden_quota = 4
+    active = {k: 0 for k in 'abc'}
+    lock = threading.Lock()
+    outcomes = {'ok': 0, '429': 0}
+
+    def call(_):
+        while True:
+            lease = sim.acquire(timeout=60)
+            with lock:
+                active[lease.key] += 1
+                over = active[lease.key] > hidden_quota
+            time.sleep(random.uniform(0.05, 0.15))
+            with lock:
+                active[lease.key] -= 1
+                outcomes['429' if over else 'ok'] += 1
+            sim.release(lease, rate_limited=over, retry_after=0.2)
+            if not over:
+                return lease.queue_wait_ms
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(60) as executor:
+        waits = list(executor.map(call, range(600)))
+    elapsed = time.perf_counter() - start
+    print(f"⚡ 600 calls in {elapsed:.1f}s ({600 / elapsed:.0f}/s; quota-bound ideal ~{3 * hidden_quota / 0.1:.0f}/s), "
+          f"{outcomes['429']} rate-limited attempts, median queue wait {sorted(waits)[300]:.0f} ms")
+    for slot, stats in sim.get_stats().items():
+        print(f"   {slot}: limit {stats['concurrency_limit']}, calls {stats['calls']}, 429s {stats['rate_limited']}")
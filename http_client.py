@@ -0,0 +1,278 @@
+"""
+Satark.ai - Shared HTTP Client
+One pooled, keep-alive HTTP session used by every scraper.
+- Per-host connection pooling (no fresh DNS/TCP/TLS per request)
+- Retry with exponential backoff on idempotent GETs
+- gzip/deflate (and brotli when installed) compression
+- Per-host request counts, connections opened and time-to-first-byte
+- Persistent ETag/Last-Modified cache for conditional GETs
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from metrics import HTTP_REQUESTS
+
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+
+def _accept_encoding() -> str:
+    """Advertise brotli only when urllib3 can actually decode it"""
+    try:
+        import brotli  # noqa: F401
+        return 'gzip, deflate, br'
+    except ImportError:
+        pass
+    try:
+        import brotlicffi  # noqa: F401
+        return 'gzip, deflate, br'
+    except ImportError:
+        return 'gzip, deflate'
+
+
+class HTTPClient:
+    """Shared requests.Session with pooling, retries and per-host stats"""
+
+    def __init__(self,
+                 max_retries: int = None,
+                 backoff_factor: float = None,
+                 pool_maxsize: int = None,
+                 timeout: float = 10,
+                 cache_file: str = "http_cache.json"):
+        # Configurable from .env, same as GEMINI_API_KEY
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("SCRAPER_MAX_RETRIES", "2"))
+        self.backoff_factor = backoff_factor if backoff_factor is not None else float(os.getenv("SCRAPER_BACKOFF", "0.5"))
+        self.pool_maxsize = pool_maxsize if pool_maxsize is not None else int(os.getenv("SCRAPER_POOL_SIZE", "4"))
+        self.timeout = timeout
+
+        retry = Retry(
+            total=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET', 'HEAD']),  # Only retry idempotent requests
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        self.adapter = HTTPAdapter(
+            pool_connections=16,  # Number of hosts kept in the pool manager
+            pool_maxsize=self.pool_maxsize,
+            max_retries=retry
+        )
+
+        self.session = requests.Session()
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        self.session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Accept-Encoding': _accept_encoding(),
+            'Connection': 'keep-alive'
+        })
+
+        self._lock = threading.Lock()
+        self._host_stats = {}
+        self._source_stats = {}
+
+        self.cache_file = cache_file
+        self.validators = self.load_cache()
+
+    def load_cache(self) -> dict:
+        """Load stored ETag/Last-Modified validators per URL"""
+        if os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception:
+                pass
+        return {}
+
+    def save_cache(self):
+        """Persist validators so conditional GETs survive restarts"""
+        with self._lock:
+            snapshot = dict(self.validators)
+        try:
+            with open(self.cache_file, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, indent=2)
+        except Exception as e:
+            print(f"HTTP cache save failed: {e}")
+
+    def get(self, url: str, timeout: float = None, source: str = None,
+            conditional: bool = False, **kwargs) -> requests.Response:
+        """
+        GET through the shared session, recording per-host stats.
+
+        With conditional=True the stored ETag/Last-Modified for this URL is
+        sent as If-None-Match/If-Modified-Since; a 304 response means the
+        resource is unchanged and the caller should skip parsing.
+        """
+        parsed = urlparse(url)
+        host = parsed.netloc
+        connections_before = self._connections_opened(parsed.hostname)
+        start_time = time.time()
+
+        if conditional:
+            headers = dict(kwargs.pop('headers', None) or {})
+            cached = self.validators.get(url, {})
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+            kwargs['headers'] = headers
+
+        try:
+            response = self.session.get(url, timeout=timeout or self.timeout, **kwargs)
+        except requests.RequestException as e:
+            self._record(host, error=True, total_ms=(time.time() - start_time) * 1000)
+            self._record_source(source, error_type=type(e).__name__)
+            HTTP_REQUESTS.inc(source=source or host, result='error')
+            raise
+
+        if conditional and response.status_code == 200:
+            self._store_validators(url, response)
+        HTTP_REQUESTS.inc(source=source or host, result='not_modified' if response.status_code == 304 else 'fetched')
+        self._record_source(
+            source,
+            bytes_transferred=self._wire_bytes(response),
+            cache_hit=response.status_code == 304,
+            status=response.status_code
+        )
+
+        # response.elapsed stops when the response headers have been parsed,
+        # which is the time-to-first-byte from the client's point of view
+        self._record(
+            host,
+            ttfb_ms=response.elapsed.total_seconds() * 1000,
+            total_ms=(time.time() - start_time) * 1000,
+            new_connections=self._connections_opened(parsed.hostname) - connections_before
+        )
+        return response
+
+    def _store_validators(self, url: str, response: requests.Response):
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        with self._lock:
+            if etag or last_modified:
+                self.validators[url] = {
+                    'etag': etag,
+                    'last_modified': last_modified,
+                    'stored_at': time.time()
+                }
+            else:
+                self.validators.pop(url, None)
+
+    @staticmethod
+    def _wire_bytes(response: requests.Response) -> int:
+        """Bytes on the wire (compressed Content-Length when the server sends it)"""
+        length = response.headers.get('Content-Length')
+        if length and length.isdigit():
+            return int(length)
+        return len(response.content)
+
+    def _connections_opened(self, hostname: str) -> int:
+        """Connections urllib3 has opened to this host across its pools"""
+        pools = self.adapter.poolmanager.pools
+        opened = 0
+        try:
+            for key in list(pools.keys()):
+                if key.key_host == hostname:
+                    opened += pools[key].num_connections
+        except Exception:
+            pass
+        return opened
+
+    def _record(self, host: str, ttfb_ms: float = 0.0, total_ms: float = 0.0,
+                new_connections: int = 0, error: bool = False):
+        with self._lock:
+            stats = self._host_stats.setdefault(host, {
+                'requests': 0,
+                'errors': 0,
+                'connections_opened': 0,
+                'ttfb_ms_total': 0.0,
+                'ttfb_ms_max': 0.0,
+                'total_ms': 0.0
+            })
+            stats['requests'] += 1
+            stats['total_ms'] += total_ms
+            stats['connections_opened'] += max(0, new_connections)
+            if error:
+                stats['errors'] += 1
+                return
+            stats['ttfb_ms_total'] += ttfb_ms
+            stats['ttfb_ms_max'] = max(stats['ttfb_ms_max'], ttfb_ms)
+
+    def _record_source(self, source: str, bytes_transferred: int = 0,
+                       cache_hit: bool = False, status: int = None, error_type: str = None):
+        if not source:
+            return
+        with self._lock:
+            stats = self._source_stats.setdefault(source, {
+                'requests': 0,
+                'errors': 0,
+                'bytes_transferred': 0,
+                'cache_hits': 0,
+                'last_status': None,
+                'error_types': {}
+            })
+            stats['requests'] += 1
+            stats['bytes_transferred'] += bytes_transferred
+            if cache_hit:
+                stats['cache_hits'] += 1
+            if status is not None:
+                stats['last_status'] = status
+            if error_type:
+                stats['errors'] += 1
+                stats['error_types'][error_type] = stats['error_types'].get(error_type, 0) + 1
+
+    def get_source_stats(self) -> Dict:
+        """Per-source bytes transferred, conditional GET cache hits, last HTTP status and errors"""
+        with self._lock:
+            result = {}
+            for source, stats in self._source_stats.items():
+                result[source] = dict(stats, error_types=dict(stats['error_types']))
+                result[source]['cache_hit_rate'] = round(stats['cache_hits'] / stats['requests'], 2) if stats['requests'] else 0.0
+            return result
+
+    def get_stats(self) -> Dict:
+        """Per-host request counts, reused connections and TTFB"""
+        with self._lock:
+            result = {}
+            for host, stats in self._host_stats.items():
+                ok = stats['requests'] - stats['errors']
+                result[host] = {
+                    'requests': stats['requests'],
+                    'errors': stats['errors'],
+                    'connections_opened': stats['connections_opened'],
+                    # Every request beyond the first connection skipped a handshake
+                    'connections_reused': max(0, ok - stats['connections_opened']),
+                    'avg_ttfb_ms': round(stats['ttfb_ms_total'] / ok, 2) if ok else 0.0,
+                    'max_ttfb_ms': round(stats['ttfb_ms_max'], 2),
+                    'avg_total_ms': round(stats['total_ms'] / stats['requests'], 2)
+                }
+            return result
+
+    def reset_stats(self):
+        """Clear per-host and per-source stats (connections stay pooled)"""
+        with self._lock:
+            self._host_stats = {}
+            self._source_stats = {}
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+
+
+# Initialize global instance shared by all scrapers
+http_client = HTTPClient()
+
+
+def get_http_stats() -> Dict:
+    """Get per-host HTTP statistics"""
+    return http_client.get_stats()
@@ -0,0 +1,307 @@
+"""
+Satark.ai - Durable Scan Job Queue
+Scans are submitted to a SQLite-backed queue and answered with a job ID
+right away; a pool of worker processes runs them at the pace the Gemini
+quota allows. Results are kept for polling, or POSTed to a callback URL.
+- WAL-mode SQLite: one file, safe across processes, survives restarts
+- Visibility timeout: a claimed job whose worker dies is picked up again
+- Retries with exponential backoff, then 'failed' with the last error
+- Image payloads are dropped once a job is finished
+
+Usage:
+    python job_queue.py worker [--processes 4]
+    python job_queue.py stats
+    python job_queue.py purge [--days 7]
+    python job_queue.py bench
+"""
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import signal
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+from metrics import JOB_QUEUE_WAIT_SECONDS, JOBS
+
+
+JOB_QUEUE_DB = os.getenv("JOB_QUEUE_DB", "scan_jobs.db")
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# A running job not finished within this many seconds is handed to another worker
+JOB_VISIBILITY_TIMEOUT = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "180"))
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "10"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_SECONDS = 0.5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,            -- queued, running, done, failed
+    payload BLOB,                    -- image bytes, dropped when finished
+    params TEXT NOT NULL,            -- JSON: language, search, callback_url
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    visible_at REAL NOT NULL,        -- queued: earliest start; running: lease expiry
+    worker TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,                     -- JSON scan result
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, visible_at);
+"""
+
+
+class JobQueue:
+    """SQLite job queue; one instance per process (connections are per thread)"""
+
+    def __init__(self, path: str = JOB_QUEUE_DB, max_attempts: int = JOB_MAX_ATTEMPTS,
+                 visibility_timeout: float = JOB_VISIBILITY_TIMEOUT, retry_backoff: float = JOB_RETRY_BACKOFF):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.visibility_timeout = visibility_timeout
+        self.retry_backoff = retry_backoff
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit; writes that must be atomic use explicit BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def submit(self, image_bytes: bytes, language: str = "Hinglish", search: bool = True,
+               callback_url: str = None) -> str:
+        """Queue a scan. Returns the job ID."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        params = {'language': language, 'search': search, 'callback_url': callback_url}
+        self._conn().execute(
+            "INSERT INTO jobs (id, status, payload, params, max_attempts, visible_at, created_at) "
+            "VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+            (job_id, image_bytes, json.dumps(params), self.max_attempts, now, now))
+        JOBS.inc(event='submitted')
+        return job_id
+
+    def claim(self, worker: str) -> Optional[Dict]:
+        """
+        Lease the next ready job (queued, or running with an expired lease) to a worker.
+        Returns the job with its payload and params, or None if nothing is ready.
+        """
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Expired leases that have used up their attempts fail instead of running again
+            expired = conn.execute(
+                "UPDATE jobs SET status = 'failed', payload = NULL, finished_at = ?, "
+                "error = COALESCE(error, 'Worker lease expired') "
+                "WHERE status = 'running' AND visible_at <= ? AND attempts >= max_attempts",
+                (now, now)).rowcount
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status IN ('queued', 'running') AND visible_at <= ? "
+                "ORDER BY visible_at LIMIT 1", (now,)).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, "
+                    "visible_at = ?, started_at = ? WHERE id = ?",
+                    (worker, now + self.visibility_timeout, now, row['id']))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        if expired:
+            JOBS.inc(expired, event='lease_expired')
+        if row is None:
+            return None
+        if row['attempts'] == 0:
+            JOB_QUEUE_WAIT_SECONDS.observe(now - row['created_at'])
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        job['attempts'] += 1
+        return job
+
+    def complete(self, job_id: str, worker: str, result: Dict) -> bool:
+        """Store a result. False if the lease was lost (another worker owns the job now)."""
+        updated = self._conn().execute(
+            "UPDATE jobs SET status = 'done', payload = NULL, result = ?, error = NULL, finished_at = ? "
+            "WHERE id = ? AND status = 'running' AND worker = ?",
+            (json.dumps(result, ensure_ascii=False, default=str), time.time(), job_id, worker)).rowcount
+        if updated:
+            JOBS.inc(event='done')
+        return bool(updated)
+
+    def fail(self, job_id: str, worker: str, error: str, result: Dict = None) -> str:
+        """Record a failed attempt: requeue with backoff, or fail for good. Returns the new status."""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ? AND status = 'running' AND worker = ?",
+                               (job_id, worker)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return 'lost'
+            result_json = json.dumps(result, ensure_ascii=False, default=str) if result else None
+            if row['attempts'] < row['max_attempts']:
+                status = 'queued'
+                delay = self.retry_backoff * 2 ** (row['attempts'] - 1)
+                conn.execute("UPDATE jobs SET status = 'queued', visible_at = ?, worker = NULL, error = ? WHERE id = ?",
+                             (now + delay, error, job_id))
+            else:
+                status = 'failed'
+                conn.execute("UPDATE jobs SET status = 'failed', payload = NULL, result = ?, error = ?, finished_at = ? "
+                             "WHERE id = ?", (result_json, error, now, job_id))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        JOBS.inc(event='retried' if status == 'queued' else 'failed')
+        return status
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Job status for polling: status, attempts, timestamps, and result/error when finished"""
+        row = self._conn().execute(
+            "SELECT id, status, attempts, created_at, started_at, finished_at, result, error FROM jobs WHERE id = ?",
+            (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def stats(self) -> Dict:
+        """Jobs per status and the age of the oldest queued job"""
+        conn = self._conn()
+        counts = {status: count for status, count in conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")}
+        oldest = conn.execute("SELECT MIN(created_at) FROM jobs WHERE status = 'queued'").fetchone()[0]
+        return {
+            'queued': counts.get('queued', 0),
+            'running': counts.get('running', 0),
+            'done': counts.get('done', 0),
+            'failed': counts.get('failed', 0),
+            'oldest_queued_s': round(time.time() - oldest, 1) if oldest else 0.0
+        }
+
+    def purge(self, older_than_days: float = 7) -> int:
+        """Delete finished jobs older than N days. Returns how many were deleted."""
+        cutoff = time.time() - older_than_days * 86400
+        return self._conn().execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                                    (cutoff,)).rowcount
+
+
+def _post_callback(url: str, job: Dict):
+    """Best-effort POST of the finished job to the submitter's callback URL"""
+    import requests
+    try:
+        requests.post(url, json=job, timeout=10)
+    except requests.RequestException as e:
+        print(f"Job callback to {url} failed: {e}")
+
+
+def run_job(queue: JobQueue, job: Dict, worker: str):
+    """Scan one claimed job and record the outcome"""
+    from PIL import Image
+    from utils import analyze_with_internet_search
+
+    params = job['params']
+    try:
+        with Image.open(io.BytesIO(job['payload'])) as image:
+            image.load()
+            result = analyze_with_internet_search(image, language=params['language'], search=params['search'])
+    except Exception as e:
+        queue.fail(job['id'], worker, f"{type(e).__name__}: {e}")
+    else:
+        result.pop('raw_response', None)
+        if result.get('verdict') == 'ERROR':
+            # API errors (quota, network) are worth another attempt later
+            queue.fail(job['id'], worker, result.get('reasoning', 'Scan failed'), result)
+        else:
+            queue.complete(job['id'], worker, result)
+
+    if params.get('callback_url'):
+        finished = queue.get(job['id'])
+        if finished and finished['status'] in ('done', 'failed'):
+            _post_callback(params['callback_url'], finished)
+
+
+def worker_loop(path: str = JOB_QUEUE_DB, stop: multiprocessing.Event = None):
+    """Claim and run jobs until stopped"""
+    queue = JobQueue(path)
+    worker = f"{os.uname().nodename if hasattr(os, 'uname') else 'local'}:{os.getpid()}:{threading.get_ident()}"
+    while not (stop and stop.is_set()):
+        job = queue.claim(worker)
+        if job is None:
+            time.sleep(JOB_POLL_SECONDS)
+            continue
+        run_job(queue, job, worker)
+
+
+def _worker_process(path: str, stop):
+    # Ctrl-C / SIGTERM reach the parent, which sets stop; the current job is finished first
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker_loop(path, stop)
+
+
+def run_workers(processes: int = JOB_WORKERS, path: str = JOB_QUEUE_DB):
+    """Run a pool of worker processes until Ctrl-C / SIGTERM"""
+    stop = multiprocessing.Event()
+    workers = [multiprocessing.Process(target=_worker_process, args=(path, stop), name=f"scan-worker-{i}")
+               for i in range(processes)]
+    for process in workers:
+        process.start()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    print(f"🧵 {processes} scan workers on {path}")
+    try:
+        while not stop.is_set() and any(p.is_alive() for p in workers):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    stop.set()
+    print("⏹️ Stopping after current jobs...")
+    for process in workers:
+        process.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Satark.ai scan job queue")
+    parser.add_argument('command', choices=['worker', 'stats', 'purge', 'bench'])
+    parser.add_argument('--processes', type=int, default=JOB_WORKERS, help="Worker processes")
+    parser.add_argument('--days', type=float, default=7, help="purge: age of finished jobs to delete")
+    parser.add_argument('--db', default=JOB_QUEUE_DB, help="Queue database file")
+    args = parser.parse_args()
+
+    if args.command == 'worker':
+        run_workers(args.processes, args.db)
+    elif args.command == 'stats':
+        print(json.dumps(JobQueue(args.db).stats(), indent=2))
+    elif args.command == 'purge':
+        print(f"🧹 Deleted {JobQueue(args.db).purge(args.days)} finished jobs")
+    else:
+        # Benchmark: queue overhead per job (submit + claim + complete), no scanning
+        import tempfile
+        bench_path = os.path.join(tempfile.mkdtemp(), 'bench_jobs.db')
+        queue = JobQueue(bench_path)
+        payload = os.urandom(200 * 1024)  # Typical compressed screenshot
+        n = 2000
+        start = time.perf_counter()
+        for _ in range(n):
+            queue.submit(payload)
+        submitted = time.perf_counter() - start
+        start = time.perf_counter()
+        while (job := queue.claim('bench')) is not None:
+            queue.complete(job['id'], 'bench', {'verdict': 'SAFE'})
+        drained = time.perf_counter() - start
+        print(f"⚡ submit: {n / submitted:,.0f} jobs/s, claim+complete: {n / drained:,.0f} jobs/s ({n} x 200 KB)")
@@ -8,39 +8,134 @@ Sources:
 - Public scam report datasets
 """
 
-import requests
 from datetime import datetime, timedelta
 import json
+import hashlib
+import heapq
 import re
 import os
-from typing import List, Dict
+from typing import Dict, Iterable, List, Optional, Tuple
 import time
-from bs4 import BeautifulSoup
+import threading
+from http_client import http_client
+from feed_parser import parse_feed
+from page_parser import advisory_items, parse_page
+from entity_extractor import extract_entities, normalize_phone, normalize_upi
+from snapshot import TABLES, LazyTable, SnapshotReader, publish_lock, publish_snapshot
+from reputation import bumped_score, current_score, merged_entry, source_weight
+from source_health import SourceHealth
+from metrics import (LIVE_DB_LOOKUP_SECONDS, LIVE_DB_LOOKUPS, REFRESH_ITEMS_INGESTED,
+                     REFRESH_SECONDS, REFRESH_SOURCE_RUNS, REFRESH_SOURCE_SECONDS)
+
+
+# Content hashes of ingested items kept for dedupe (oldest dropped first)
+MAX_SEEN_HASHES = 10000
+
+# Eviction candidates planned beyond the overflow, for entities added
+# between planning retention (outside the lock) and applying it
+RETENTION_SLACK = 1000
+
+# Intelligence sources, in refresh order:
+# (source key, fetcher method, HTTP source names it requests, scam type of its reports)
+SOURCES = (
+    ('google_news', 'fetch_google_news_scams', ('Google News',), "News Report"),
+    ('consumer_complaints', 'fetch_consumer_complaints', ('Consumer Complaints India',), "Consumer Complaint"),
+    ('govt_advisory', 'fetch_cybercrime_advisories', ('National Cyber Crime Portal', 'RBI Press Releases'), "Govt Advisory"),
+    ('social_media', 'fetch_twitter_scam_reports', ('Twitter/X',), "Social Media Report"),
+)
+# Sources whose keyword filter can match nothing on a quiet day - an empty run
+# is healthy for them, not a reason to bench them
+QUIET_SOURCES = ('govt_advisory',)
 
 
 class LiveScammerDB:
     """Real-time scammer database with multiple data sources"""
     
     def __init__(self):
-        self.cache_file = "scam_cache.json"
-        self.cache_duration = 3600  # 1 hour cache
-        self.scam_data = self.load_cache()
+        self.cache_file = "scam_cache.json"  # JSON import/export only, the store is the snapshot
+        self.cache_duration = 3600  # 1 hour TTL for feed-derived live reports
+        # Reported numbers/UPIs are durable; they are only evicted by this policy
+        self.entity_retention_days = int(os.getenv("ENTITY_RETENTION_DAYS", "365"))
+        self.max_entities = int(os.getenv("MAX_REPORTED_ENTITIES", "1000000"))
+        self._lock = threading.RLock()  # Guards writes to scam_data
+        # Reads are served from the shared snapshot; scam_data is only
+        # loaded by a process that writes (refresher, manual reports)
+        self.snapshot_file = os.getenv("SNAPSHOT_FILE", "scam_snapshot.bin")
+        self.snapshot = SnapshotReader(self.snapshot_file)
+        self._scam_data = None
+        self._seen_hashes = set()
+        # Per-source run history and cool-off, persisted in the database
+        self.health = SourceHealth(quiet_sources=QUIET_SOURCES)
+        # (source, query) feeds that answered 304 in the current refresh
+        self._unchanged_feeds = set()
+    
+    @property
+    def scam_data(self) -> dict:
+        """Writable database, loaded from the snapshot on first use"""
+        if self._scam_data is None:
+            with self._lock:
+                if self._scam_data is None:
+                    data = self.load_cache()
+                    data.setdefault('ingest_state', {'watermarks': {}, 'seen_hashes': []})
+                    self._seen_hashes = set(data['ingest_state']['seen_hashes'])
+                    self.health.load(data.get('source_health'))
+                    self._scam_data = data
+        return self._scam_data
+    
+    def read_snapshot(self):
+        """
+        Current shared snapshot for the read path. If none was published yet
+        (first start), this process imports the JSON cache and publishes one.
+        """
+        snap = self.snapshot.current()
+        if snap is None:
+            self.save_cache()
+            snap = self.snapshot.reload()
+        return snap
+    
+    def _lookup(self, table: str, key: str):
+        """Entry from the shared snapshot (the in-process dict if publishing is unavailable)"""
+        snap = self.read_snapshot()
+        if snap is not None:
+            return snap.lookup(table, key)
+        return self.scam_data[table].get(key)
+    
+    def _feed_expired(self, last_updated: str) -> bool:
+        return datetime.now() - datetime.fromisoformat(last_updated) >= timedelta(seconds=self.cache_duration)
     
     def load_cache(self) -> dict:
-        """Load cached scam data if recent"""
-        if os.path.exists(self.cache_file):
-            try:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    cache_time = datetime.fromisoformat(data.get('last_updated', '2020-01-01'))
-                    
-                    # Check if cache is still valid (within 1 hour)
-                    if datetime.now() - cache_time < timedelta(seconds=self.cache_duration):
-                        return data
-            except Exception as e:
-                pass
+        """
+        Load scam data from the binary snapshot (the JSON cache is imported on first start).
+        Reported numbers/UPIs and their history are durable and always kept - they
+        stay in the snapshot and are decoded only when touched.
+        Only the feed-derived live reports expire after cache_duration.
+        """
+        data = self.initialize_empty_db()
         
-        return self.initialize_empty_db()
+        try:
+            snap = self.snapshot.reload()
+            if snap is not None:
+                stored = snap.to_scam_data()
+            elif os.path.exists(self.cache_file):
+                stored = self._read_json(self.cache_file)
+            else:
+                return data
+            data.update(stored)
+            
+            # Feed tier expired - keep the stale last_updated so the
+            # background refresher picks it up, but drop the old reports
+            if self._feed_expired(stored.get('last_updated', '2020-01-01')):
+                data['live_reports'] = []
+                data['sources'] = {}
+        except Exception as e:
+            print(f"Cache load failed: {e}")
+        
+        return data
+    
+    @staticmethod
+    def _read_json(path: str) -> dict:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
     
     def initialize_empty_db(self) -> dict:
         """Initialize with known scam patterns"""
@@ -55,16 +150,68 @@ class LiveScammerDB:
                 'income tax notice', 'legal action', 'warrant issued'
             ],
             'live_reports': [],
-            'total_reports': 0
+            'total_reports': 0,
+            'ingest_state': {
+                'watermarks': {},  # Newest published timestamp seen per source (per query for Google News)
+                'seen_hashes': []  # Content hashes of already-ingested items
+            }
         }
     
-    def save_cache(self):
-        """Save current data to cache"""
+    def save_cache(self) -> bool:
+        """
+        Save current data as a new snapshot, published to every worker.
+        Other processes (a bulk import, the refresher) wait on the publish lock
+        from our sync to our publish, so neither side's changes are lost.
+        Returns False if publishing failed.
+        """
         try:
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.scam_data, f, indent=2, ensure_ascii=False)
+            with self._lock, publish_lock(self.snapshot_file):
+                self._sync_base()
+                publish_snapshot(self.scam_data, self.snapshot_file)
+                snap = self.snapshot.reload()
+                # Touched entries are in the new snapshot - start from an empty overlay
+                if snap is not None:
+                    for table in TABLES:
+                        self.scam_data[table] = LazyTable(snap, table)
+            return True
         except Exception as e:
             print(f"Cache save failed: {e}")
+            return False
+    
+    def _sync_base(self):
+        """
+        If another process (e.g. a bulk import) published since our tables were
+        loaded, replay our pending changes on top of its snapshot instead of
+        overwriting it; entries both sides reported are merged. Call with the lock held.
+        """
+        base = getattr(self.scam_data['reported_numbers'], 'base', None)
+        if base is None:
+            return
+        latest = self.snapshot.reload()
+        if latest is None or latest.version <= base.version:
+            return
+        for table in TABLES:
+            self.scam_data[table] = self.scam_data[table].rebased(latest, merge=merged_entry)
+        # Report counts add up; live reports and ingest state stay ours
+        self.scam_data['total_reports'] += latest.meta.get('total_reports', 0) - base.meta.get('total_reports', 0)
+    
+    def export_json(self, path: str = None) -> str:
+        """Write the whole database as JSON (backups, other tools)"""
+        path = path or self.cache_file
+        with self._lock:
+            data = {k: v.to_dict() if isinstance(v, LazyTable) else v for k, v in self.scam_data.items()}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        return path
+    
+    def import_json(self, path: str = None):
+        """Replace the database with a JSON export and publish it"""
+        data = self.initialize_empty_db()
+        data.update(self._read_json(path or self.cache_file))
+        with self._lock:
+            self._scam_data = data
+            self._seen_hashes = set(data['ingest_state'].get('seen_hashes', []))
+            self.save_cache()
     
     def fetch_google_news_scams(self) -> List[Dict]:
         """
@@ -86,29 +233,35 @@ class LiveScammerDB:
                 url = f"https://news.google.com/rss/search?q={query}+when:1d&hl=en-IN&gl=IN&ceid=IN:en"
                 
                 try:
-                    response = requests.get(url, timeout=5)
+                    response = http_client.get(url, timeout=5, source='Google News', conditional=True)
+                    if response.status_code == 304:
+                        self._unchanged_feeds.add(('Google News', query))
+                        continue  # Feed unchanged since last refresh - skip parsing
                     if response.status_code == 200:
-                        # Parse RSS feed for titles and links
-                        content = response.text
-                        
-                        # Extract titles (simplified parsing)
-                        titles = re.findall(r'<title>(.*?)</title>', content)
-                        links = re.findall(r'<link>(.*?)</link>', content)
-                        
-                        for i, title in enumerate(titles[1:6]):  # Skip first title (feed title)
-                            if i < len(links) - 1:
-                                scam_reports.append({
-                                    'title': title,
-                                    'link': links[i + 1],
-                                    'source': 'Google News',
-                                    'timestamp': datetime.now().isoformat()
-                                })
+                        # Stream-parse the RSS feed, stopping after 5 items
+                        for item in parse_feed(response.content, limit=5):
+                            entities = extract_entities(f"{item['title']} {item['description']}")
+                            scam_reports.append({
+                                'title': item['title'],
+                                'link': item['link'],
+                                'guid': item['guid'],
+                                'published': item['published'],
+                                'publisher': item['source'],
+                                'description': item['description'],
+                                'source': 'Google News',
+                                'query': query,  # Each query's feed keeps its own watermark
+                                'phones_found': entities['phones'],
+                                'upis_found': entities['upi_ids'],
+                                'timestamp': datetime.now().isoformat()
+                            })
                 except Exception as e:
+                    self.health.note_error('google_news', e)
                     continue
             
             return scam_reports[:10]  # Return top 10
             
         except Exception as e:
+            self.health.note_error('google_news', e)
             return []
     
     def fetch_consumer_complaints(self) -> List[Dict]:
@@ -127,13 +280,13 @@ class LiveScammerDB:
             
             for url in urls_to_scrape[:1]:  # Limit to avoid rate limiting
                 try:
-                    headers = {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                    }
-                    response = requests.get(url, headers=headers, timeout=10)
+                    response = http_client.get(url, timeout=10, source='Consumer Complaints India', conditional=True)
+                    if response.status_code == 304:
+                        self._unchanged_feeds.add(('Consumer Complaints India', None))
+                        continue  # Page unchanged since last refresh - skip parsing
                     
                     if response.status_code == 200:
-                        soup = BeautifulSoup(response.content, 'html.parser')
+                        soup = parse_page(response.content, 'consumer_complaints')
                         
                         # Find complaint titles/descriptions
                         complaint_items = soup.find_all(['div', 'article'], class_=re.compile('complaint|post', re.I), limit=5)
@@ -142,23 +295,26 @@ class LiveScammerDB:
                             title = item.find(['h2', 'h3', 'a'])
                             if title:
                                 text = title.get_text(strip=True)
-                                # Extract phone numbers from complaint text
-                                phones = self.extract_phone_numbers(text)
+                                # Extract phone numbers and UPI IDs from complaint text
+                                entities = extract_entities(text)
                                 
                                 complaints.append({
                                     'title': text[:200],
                                     'source': 'Consumer Complaints India',
-                                    'phones_found': phones,
+                                    'phones_found': entities['phones'],
+                                    'upis_found': entities['upi_ids'],
                                     'timestamp': datetime.now().isoformat()
                                 })
                         
                         # Small delay to be respectful
                         time.sleep(1)
                 except Exception as e:
+                    self.health.note_error('consumer_complaints', e)
                     continue
             
             return complaints
         except Exception as e:
+            self.health.note_error('consumer_complaints', e)
             return []
     
     def fetch_cybercrime_advisories(self) -> List[Dict]:
@@ -183,34 +339,41 @@ class LiveScammerDB:
             
             for source_data in advisory_sources[:1]:  # Limit to 1 to avoid rate limiting
                 try:
-                    headers = {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                    }
-                    response = requests.get(source_data['url'], headers=headers, timeout=10)
+                    response = http_client.get(source_data['url'], timeout=10, source=source_data['source'], conditional=True)
+                    if response.status_code == 304:
+                        self._unchanged_feeds.add((source_data['source'], None))
+                        continue  # Page unchanged since last refresh - skip parsing
                     
                     if response.status_code == 200:
-                        soup = BeautifulSoup(response.content, 'html.parser')
+                        # Only the advisory list is built; a page without one is parsed in full
+                        text_elements = advisory_items(parse_page(response.content, 'govt_advisory'))
+                        if not text_elements:
+                            text_elements = advisory_items(parse_page(response.content))
                         
                         # Look for advisory text containing scam keywords
-                        text_elements = soup.find_all(['p', 'div', 'li'], limit=20)
                         
                         for elem in text_elements:
                             text = elem.get_text(strip=True)
                             # Check if text contains scam-related keywords
                             if any(keyword in text.lower() for keyword in ['scam', 'fraud', 'cyber', 'phishing']):
+                                entities = extract_entities(text)
                                 advisories.append({
                                     'title': text[:200],
                                     'source': source_data['source'],
                                     'url': source_data['url'],
+                                    'phones_found': entities['phones'],
+                                    'upis_found': entities['upi_ids'],
                                     'timestamp': datetime.now().isoformat()
                                 })
                         
                         time.sleep(2)  # Be respectful to government servers
                 except Exception as e:
+                    self.health.note_error('govt_advisory', e)
                     continue
             
             return advisories[:5]
         except Exception as e:
+            self.health.note_error('govt_advisory', e)
             return []
     
     def fetch_twitter_scam_reports(self) -> List[Dict]:
@@ -239,118 +402,336 @@ class LiveScammerDB:
                     query = search_queries[0].replace(' ', '+').replace('#', '%23')
                     url = f"{instance}/search?f=tweets&q={query}"
                     
-                    headers = {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                    }
-                    
-                    response = requests.get(url, headers=headers, timeout=10)
+                    response = http_client.get(url, timeout=10, source='Twitter/X', conditional=True)
+                    if response.status_code == 304:
+                        self._unchanged_feeds.add(('Twitter/X', None))
+                        break  # Search results unchanged - nothing new to parse
                     
                     if response.status_code == 200:
-                        soup = BeautifulSoup(response.content, 'html.parser')
+                        soup = parse_page(response.content, 'social_media')
                         
                         # Find tweet content
                         tweets = soup.find_all('div', class_='tweet-content', limit=5)
                         
                         for tweet in tweets:
                             text = tweet.get_text(strip=True)
-                            phones = self.extract_phone_numbers(text)
+                            entities = extract_entities(text)
+                            phones = entities['phones']
                             
-                            if phones or any(word in text.lower() for word in ['scam', 'fraud', 'fake']):
+                            if phones or entities['upi_ids'] or any(word in text.lower() for word in ['scam', 'fraud', 'fake']):
                                 reports.append({
                                     'title': text[:200],
                                     'source': 'Twitter/X',
                                     'phones_found': phones,
+                                    'upis_found': entities['upi_ids'],
                                     'timestamp': datetime.now().isoformat()
                                 })
                     
                     break  # Exit loop if successful
                 except Exception as e:
+                    self.health.note_error('social_media', e)
                     continue
             
             return reports
         except Exception as e:
+            self.health.note_error('social_media', e)
             return []
     
     def extract_phone_numbers(self, text: str) -> List[str]:
-        """Extract Indian phone numbers from text"""
-        # Indian phone patterns: +91XXXXXXXXXX, 0XXXXXXXXXX, XXXXXXXXXX
-        patterns = [
-            r'\+91[\s-]?\d{10}',
-            r'\b0\d{10}\b',
-            r'\b[6-9]\d{9}\b'
-        ]
-        
-        numbers = []
-        for pattern in patterns:
-            found = re.findall(pattern, text)
-            numbers.extend(found)
-        
-        return list(set(numbers))  # Remove duplicates
+        """Extract Indian phone numbers from text, normalised to 10 digits"""
+        return extract_entities(text)['phones']
+    
+    @staticmethod
+    def normalize_phone(phone: str) -> str:
+        """Normalize phone number to its last 10 digits"""
+        return normalize_phone(phone)
     
     def check_phone_number(self, phone: str) -> Dict:
         """Check if phone number is in reported scams"""
-        # Normalize phone number
-        normalized = re.sub(r'[\s\-\+]', '', phone)
-        normalized = normalized[-10:]  # Get last 10 digits
+        with LIVE_DB_LOOKUP_SECONDS.time(kind='phone'):
+            report = self._lookup('reported_numbers', self.normalize_phone(phone))
+        LIVE_DB_LOOKUPS.inc(kind='phone', result='hit' if report else 'miss')
         
-        if normalized in self.scam_data['reported_numbers']:
-            report = self.scam_data['reported_numbers'][normalized]
+        if report:
             return {
                 'found': True,
                 'reports': report['count'],
                 'first_seen': report['first_seen'],
                 'last_seen': report['last_seen'],
-                'scam_types': report['scam_types']
+                'scam_types': report['scam_types'],
+                'reputation': round(current_score(report), 3)
             }
         
         return {'found': False}
     
     def check_upi_id(self, upi_id: str) -> Dict:
         """Check if UPI ID is in reported scams"""
-        if upi_id and upi_id.lower() in self.scam_data['reported_upis']:
-            report = self.scam_data['reported_upis'][upi_id.lower()]
+        with LIVE_DB_LOOKUP_SECONDS.time(kind='upi'):
+            report = self._lookup('reported_upis', normalize_upi(upi_id)) if upi_id else None
+        LIVE_DB_LOOKUPS.inc(kind='upi', result='hit' if report else 'miss')
+        
+        if report:
             return {
                 'found': True,
                 'reports': report['count'],
                 'first_seen': report['first_seen'],
-                'scam_types': report['scam_types']
+                'last_seen': report.get('last_seen') or report['first_seen'],
+                'scam_types': report['scam_types'],
+                'reputation': round(current_score(report), 3)
             }
         
         return {'found': False}
     
-    def add_report(self, phone: str = None, upi_id: str = None, scam_type: str = "Unknown"):
+    @staticmethod
+    def _last_seen(entry: Dict) -> str:
+        return entry.get('last_seen') or entry.get('first_seen', '')
+    
+    def plan_retention(self) -> Optional[Dict]:
+        """
+        Pick the entities retention would evict, from the epoch last_seen in the
+        published snapshot's records. Needs no lock: the snapshot is immutable,
+        and only the chosen keys are decoded.
+        Returns None if the tables are plain dicts (publishing unavailable).
+        """
+        snap = getattr(self.scam_data['reported_numbers'], 'base', None)
+        if snap is None:
+            return None
+        cutoff = (datetime.now() - timedelta(days=self.entity_retention_days)).timestamp()
+        # Upper bound on the overflow, plus room for entities added before the plan is applied
+        budget = sum(snap.count(t) for t in TABLES) - self.max_entities + RETENTION_SLACK
+        
+        expired = []
+        def unexpired():
+            for table in TABLES:
+                for last_seen, i in snap.iter_last_seen(table):
+                    if last_seen < cutoff:
+                        expired.append((table, i))
+                    else:
+                        yield last_seen, table, i
+        
+        if budget > 0:
+            oldest = [(table, i) for _, table, i in heapq.nsmallest(budget, unexpired())]
+        else:
+            oldest = []
+            for _ in unexpired():
+                pass
+        
+        return {
+            'base': snap,
+            'expired': [(table, snap.key_at(table, i)) for table, i in expired],
+            'oldest': [(table, snap.key_at(table, i)) for table, i in oldest]
+        }
+    
+    def apply_retention(self, plan: Dict = None) -> int:
+        """
+        Evict reported entities not seen within entity_retention_days, then
+        the least recently seen ones beyond max_entities.
+        Only the keys picked by plan_retention (made here if not given) are
+        touched under the lock. Returns the number of evicted entities.
+        """
+        if plan is None:
+            plan = self.plan_retention()
+        cutoff = (datetime.now() - timedelta(days=self.entity_retention_days)).isoformat()
+        evicted = 0
+        
+        with self._lock:
+            if plan is None:
+                return self._walk_retention(cutoff)
+        
+            for table, key in plan['expired']:
+                evicted += self._evict(table, key, plan['base'], cutoff)
+        
+            # Candidates reported again since the plan are kept; if too few remain,
+            # the rest of the overflow goes on the next refresh
+            overflow = sum(len(self.scam_data[t]) for t in TABLES) - self.max_entities
+            for table, key in plan['oldest']:
+                if overflow <= 0:
+                    break
+                if self._evict(table, key, plan['base']):
+                    overflow -= 1
+                    evicted += 1
+        
+        return evicted
+    
+    def _evict(self, table: str, key: str, base, cutoff: str = None) -> bool:
+        """
+        Delete a planned key if it is unchanged since the planned snapshot.
+        An expired key that changed is deleted only if it is still older than cutoff.
+        Call with the lock held.
+        """
+        entries = self.scam_data[table]
+        if entries.base is base and not entries.is_pending(key):
+            del entries[key]
+            return True
+        if cutoff is None:
+            return False
+        entry = entries.get(key)
+        if entry is None or self._last_seen(entry) >= cutoff:
+            return False
+        del entries[key]
+        return True
+    
+    def _walk_retention(self, cutoff: str) -> int:
+        """Retention over plain dict tables (no snapshot to plan from). Call with the lock held."""
+        evicted = 0
+        for table in TABLES:
+            entries = self.scam_data[table]
+            expired = [key for key, entry in entries.items() if self._last_seen(entry) < cutoff]
+            for key in expired:
+                del entries[key]
+            evicted += len(expired)
+        
+        overflow = sum(len(self.scam_data[t]) for t in TABLES) - self.max_entities
+        if overflow > 0:
+            oldest = heapq.nsmallest(
+                overflow,
+                ((self._last_seen(entry), table, key) for table in TABLES for key, entry in self.scam_data[table].items())
+            )
+            for _, table, key in oldest:
+                del self.scam_data[table][key]
+            evicted += len(oldest)
+        return evicted
+    
+    def add_report(self, phone: str = None, upi_id: str = None, scam_type: str = "Unknown", save: bool = True):
         """Add a new scam report to the database"""
-        now = datetime.now().isoformat()
+        with self._lock:
+            self._sync_base()
+            self._add_report(phone, upi_id, scam_type)
+            if save:
+                self.save_cache()
+    
+    def add_reports(self, reports: Iterable[Dict], save: bool = True) -> Dict:
+        """
+        Apply many reports in one transaction, with a single snapshot publish.
+        
+        Args:
+            reports: dicts with 'phone' and/or 'upi_id' (already normalised),
+                     'scam_type' and optionally 'reported_at' (datetime)
+        
+        Returns:
+            Counts of reports applied and of numbers/UPI IDs not reported before
+        Raises:
+            RuntimeError if the snapshot could not be published (nothing was saved)
+        """
+        stats = {'reports': 0, 'new_numbers': 0, 'new_upis': 0}
+        now = datetime.now()
+        with self._lock:
+            self._sync_base()
+            for report in reports:
+                scam_type = report.get('scam_type') or "Unknown"
+                reported_at = report.get('reported_at') or now
+                if report.get('phone'):
+                    stats['new_numbers'] += self._record_entity('reported_numbers', report['phone'], scam_type, reported_at)
+                if report.get('upi_id'):
+                    stats['new_upis'] += self._record_entity('reported_upis', report['upi_id'], scam_type, reported_at)
+                stats['reports'] += 1
+            self.scam_data['total_reports'] += stats['reports']
+            if save and not self.save_cache():
+                raise RuntimeError("Snapshot publish failed - reports not saved")
+        return stats
+    
+    def _add_report(self, phone: str, upi_id: str, scam_type: str):
+        now = datetime.now()
         
         if phone:
-            normalized = re.sub(r'[\s\-\+]', '', phone)[-10:]
-            
-            if normalized in self.scam_data['reported_numbers']:
-                self.scam_data['reported_numbers'][normalized]['count'] += 1
-                self.scam_data['reported_numbers'][normalized]['last_seen'] = now
-                if scam_type not in self.scam_data['reported_numbers'][normalized]['scam_types']:
-                    self.scam_data['reported_numbers'][normalized]['scam_types'].append(scam_type)
-            else:
-                self.scam_data['reported_numbers'][normalized] = {
-                    'count': 1,
-                    'first_seen': now,
-                    'last_seen': now,
-                    'scam_types': [scam_type]
-                }
+            self._record_entity('reported_numbers', self.normalize_phone(phone), scam_type, now)
         
         if upi_id:
-            upi_lower = upi_id.lower()
-            if upi_lower in self.scam_data['reported_upis']:
-                self.scam_data['reported_upis'][upi_lower]['count'] += 1
-            else:
-                self.scam_data['reported_upis'][upi_lower] = {
-                    'count': 1,
-                    'first_seen': now,
-                    'scam_types': [scam_type]
-                }
+            self._record_entity('reported_upis', normalize_upi(upi_id), scam_type, now)
         
         self.scam_data['total_reports'] += 1
-        self.save_cache()
+    
+    def _record_entity(self, table: str, key: str, scam_type: str, now: datetime) -> bool:
+        """Count one report and update the entity's reputation score in O(1). Returns True if the entity is new."""
+        entries = self.scam_data[table]
+        entry = entries.get(key)
+        reported_at = now.isoformat()
+        
+        if entry is not None:
+            entry['score'] = bumped_score(entry, scam_type, now)  # Decays from the old last_seen
+            entry['count'] += 1
+            # Imported reports can be older than what we already have
+            entry['last_seen'] = max(entry.get('last_seen') or reported_at, reported_at)
+            entry['first_seen'] = min(entry['first_seen'], reported_at)
+            if scam_type not in entry['scam_types']:
+                entry['scam_types'].append(scam_type)
+            entries[key] = entry  # Snapshot entries are decoded copies - write back
+            return False
+        
+        entries[key] = {
+            'count': 1,
+            'first_seen': reported_at,
+            'last_seen': reported_at,
+            'scam_types': [scam_type],
+            'score': source_weight(scam_type)
+        }
+        return True
+    
+    @staticmethod
+    def item_hash(item: Dict) -> str:
+        """Content hash identifying a scraped item across refreshes"""
+        key = '|'.join([
+            item.get('source', ''),
+            item.get('guid') or item.get('link') or item.get('url', ''),
+            item.get('title', '')
+        ])
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+    
+    def filter_new_items(self, items: List[Dict], source_key: str) -> List[Dict]:
+        """
+        Keep only items not ingested by an earlier refresh.
+        Items older than their feed's watermark (newest 'published' seen) or
+        whose content hash was already ingested are dropped. Items tagged with
+        a 'query' (one source, several feeds) get a watermark per query, so one
+        feed's newer items don't hide another feed's late-indexed ones.
+        """
+        state = self.scam_data['ingest_state']
+        watermarks = state['watermarks']
+        newest = {}
+        new_items = []
+        
+        for item in items:
+            feed = f"{source_key}:{item['query']}" if item.get('query') else source_key
+            watermark = watermarks.get(feed)
+            published = item.get('published')
+            # ISO timestamps compare correctly as strings
+            if watermark and published and published < watermark:
+                continue
+            
+            content_hash = self.item_hash(item)
+            if content_hash in self._seen_hashes:
+                continue
+            
+            self._seen_hashes.add(content_hash)
+            state['seen_hashes'].append(content_hash)
+            new_items.append(item)
+            
+            if published and published > newest.get(feed, watermark or ''):
+                newest[feed] = published
+        
+        watermarks.update(newest)
+        
+        # Bound the dedupe set, dropping the oldest hashes
+        if len(state['seen_hashes']) > MAX_SEEN_HASHES:
+            state['seen_hashes'] = state['seen_hashes'][-MAX_SEEN_HASHES:]
+            self._seen_hashes = set(state['seen_hashes'])
+        
+        return new_items
+    
+    def ingest_entities(self, item: Dict, scam_type: str) -> Tuple[int, int]:
+        """
+        Record the phones/UPI IDs extracted from a new item, counted as one report.
+        Call with the lock held and the base synced, as update_database's apply phase does.
+        Returns (new_numbers, new_upis) - how many were not reported before.
+        """
+        now = datetime.now()
+        numbers = {self.normalize_phone(n) for n in item.get('phones_found', [])} - {''}
+        upi_ids = {normalize_upi(u) for u in item.get('upis_found', [])} - {''}
+        new_numbers = sum(self._record_entity('reported_numbers', number, scam_type, now) for number in numbers)
+        new_upis = sum(self._record_entity('reported_upis', upi_id, scam_type, now) for upi_id in upi_ids)
+        if numbers or upi_ids:
+            self.scam_data['total_reports'] += 1
+        return new_numbers, new_upis
     
     def update_database(self) -> Dict:
         """
@@ -360,117 +741,160 @@ class LiveScammerDB:
         - Cybercrime.gov.in Advisories
         - Twitter/X Public Reports
         
-        Returns statistics about the update
+        Returns statistics about the update, with one health record per
+        source in 'source_runs' (see source_health.py)
         """
         start_time = time.time()
+        http_client.reset_stats()  # Per-refresh HTTP stats
+        self._unchanged_feeds = set()
+        self.scam_data  # Load the database (and persisted source health) before picking sources
         
-        all_reports = []
+        new_items = 0
         new_numbers = 0
         new_upis = 0
         
-        # Source 1: Google News (Fast, reliable)
-        try:
-            news_reports = self.fetch_google_news_scams()
-            all_reports.extend(news_reports)
-            
-            for report in news_reports:
-                text = report.get('title', '')
-                numbers = self.extract_phone_numbers(text)
-                for number in numbers:
-                    if number not in self.scam_data['reported_numbers']:
-                        new_numbers += 1
-                    self.add_report(phone=number, scam_type="News Report")
-        except Exception as e:
-            pass
+        # Fetch phase: network only. The live data is not touched, so sessions
+        # reading the database never wait on a crawl. Sources benched after
+        # repeated failures are skipped until their cool-off ends.
+        fetched = {}
+        runs = {}
+        for source_key, fetcher, http_names, _ in SOURCES:
+            fetched[source_key], runs[source_key] = self._run_source(source_key, fetcher, http_names)
         
-        # Source 2: Consumer Complaints (Real user reports)
-        try:
-            complaints = self.fetch_consumer_complaints()
-            all_reports.extend(complaints)
-            
-            for complaint in complaints:
-                phones = complaint.get('phones_found', [])
-                for phone in phones:
-                    if phone not in self.scam_data['reported_numbers']:
-                        new_numbers += 1
-                    self.add_report(phone=phone, scam_type="Consumer Complaint")
-        except Exception as e:
-            pass
+        all_reports = [item for items in fetched.values() for item in items]
         
-        # Source 3: Government Cybercrime Advisories
-        try:
-            advisories = self.fetch_cybercrime_advisories()
-            all_reports.extend(advisories)
-            
-            for advisory in advisories:
-                text = advisory.get('title', '')
-                numbers = self.extract_phone_numbers(text)
-                for number in numbers:
-                    if number not in self.scam_data['reported_numbers']:
-                        new_numbers += 1
-                    self.add_report(phone=number, scam_type="Govt Advisory")
-        except Exception as e:
-            pass
+        # Feeds that answered 304 are unchanged (per query for Google News), and
+        # benched sources were not asked - keep their previous reports
+        benched_sources = [name for source_key, _, http_names, _ in SOURCES
+                           if runs[source_key] is None for name in http_names]
         
-        # Source 4: Twitter/X Reports (Real-time)
-        try:
-            twitter_reports = self.fetch_twitter_scam_reports()
-            all_reports.extend(twitter_reports)
+        # Retention candidates come from the published snapshot, also outside the lock
+        retention = self.plan_retention()
+        
+        # Apply phase: short, under the write lock. Only genuinely new items are ingested
+        # (entities were already extracted by the fetchers, outside the lock).
+        with self._lock:
+            self._sync_base()
+            for source_key, _, _, scam_type in SOURCES:
+                ingested = 0
+                for item in self.filter_new_items(fetched[source_key], source_key):
+                    ingested += 1
+                    numbers, upis = self.ingest_entities(item, scam_type)
+                    new_numbers += numbers
+                    new_upis += upis
+                new_items += ingested
+                
+                if runs[source_key] is None:
+                    runs[source_key] = self.health.skip(source_key)
+                else:
+                    runs[source_key] = self.health.record(source_key, dict(runs[source_key], items_ingested=ingested))
+                    REFRESH_SOURCE_SECONDS.observe(runs[source_key]['duration_ms'] / 1000, source=source_key)
+                    REFRESH_ITEMS_INGESTED.inc(ingested, source=source_key)
+                REFRESH_SOURCE_RUNS.inc(source=source_key, outcome=runs[source_key]['outcome'])
+            self.scam_data['source_health'] = self.health.to_dict()
             
-            for report in twitter_reports:
-                phones = report.get('phones_found', [])
-                for phone in phones:
-                    if phone not in self.scam_data['reported_numbers']:
-                        new_numbers += 1
-                    self.add_report(phone=phone, scam_type="Social Media Report")
-        except Exception as e:
-            pass
-        
-        # Update live reports
-        self.scam_data['live_reports'] = all_reports[:15]  # Store top 15
-        self.scam_data['last_updated'] = datetime.now().isoformat()
-        
-        # Add source breakdown
-        self.scam_data['sources'] = {
-            'google_news': len([r for r in all_reports if r.get('source') == 'Google News']),
-            'consumer_complaints': len([r for r in all_reports if r.get('source') == 'Consumer Complaints India']),
-            'govt_advisory': len([r for r in all_reports if 'Cyber Crime' in r.get('source', '') or 'RBI' in r.get('source', '')]),
-            'social_media': len([r for r in all_reports if r.get('source') == 'Twitter/X'])
-        }
+            carried_reports = [r for r in self.scam_data.get('live_reports', [])
+                               if r.get('source') in benched_sources
+                               or (r.get('source'), r.get('query')) in self._unchanged_feeds]
+            
+            # Update live reports
+            self.scam_data['live_reports'] = (all_reports + carried_reports)[:15]  # Store top 15
+            evicted = self.apply_retention(retention)
+            self.scam_data['last_updated'] = datetime.now().isoformat()
+            
+            # Add source breakdown
+            self.scam_data['sources'] = {
+                'google_news': len([r for r in all_reports if r.get('source') == 'Google News']),
+                'consumer_complaints': len([r for r in all_reports if r.get('source') == 'Consumer Complaints India']),
+                'govt_advisory': len([r for r in all_reports if 'Cyber Crime' in r.get('source', '') or 'RBI' in r.get('source', '')]),
+                'social_media': len([r for r in all_reports if r.get('source') == 'Twitter/X'])
+            }
         
         # Save to cache
         self.save_cache()
+        http_client.save_cache()
+        REFRESH_SECONDS.observe(time.time() - start_time)
         
         return {
             'success': True,
             'total_reports_fetched': len(all_reports),
+            'new_items': new_items,
             'new_numbers': new_numbers,
+            'new_upis': new_upis,
+            'evicted_entities': evicted,
             'total_numbers': len(self.scam_data['reported_numbers']),
             'total_upis': len(self.scam_data['reported_upis']),
             'update_time_ms': round((time.time() - start_time) * 1000, 2),
             'last_updated': self.scam_data['last_updated'],
-            'sources': self.scam_data.get('sources', {})
+            'sources': self.scam_data.get('sources', {}),
+            'http': http_client.get_stats(),
+            'http_sources': http_client.get_source_stats(),
+            'source_runs': runs
         }
     
+    def _run_source(self, source_key: str, fetcher: str, http_names: Tuple[str, ...]):
+        """
+        Fetch one source, timing it and collecting its HTTP stats.
+        Returns (items, run) - run is None if the source is cooling off.
+        """
+        if self.health.cooloff_remaining(source_key):
+            return [], None
+        
+        self.health.begin(source_key)
+        start = time.time()
+        try:
+            items = getattr(self, fetcher)()
+        except Exception as e:
+            self.health.note_error(source_key, e)
+            items = []
+        duration_ms = (time.time() - start) * 1000
+        
+        http = [s for name, s in http_client.get_source_stats().items() if name in http_names]
+        statuses = [s['last_status'] for s in http if s['last_status'] is not None]
+        return items, {
+            'duration_ms': round(duration_ms, 2),
+            'status': max(statuses) if statuses else None,
+            'requests': sum(s['requests'] for s in http),
+            'cache_hits': sum(s['cache_hits'] for s in http),
+            'bytes': sum(s['bytes_transferred'] for s in http),
+            'items_parsed': len(items)
+        }
+    
+    def get_source_health(self) -> Dict:
+        """Per-source refresh health (last outcome, success rate, cool-off) from the latest snapshot"""
+        snap = self.read_snapshot()
+        meta = snap.meta if snap else self.scam_data
+        health = SourceHealth(quiet_sources=QUIET_SOURCES)
+        health.load(meta.get('source_health'))
+        return health.summary()
+    
     def get_stats(self) -> Dict:
         """Get database statistics"""
+        snap = self.read_snapshot()
+        meta = snap.meta if snap else self.scam_data
         now = datetime.now()
-        last_update = datetime.fromisoformat(self.scam_data['last_updated'])
+        last_update = datetime.fromisoformat(meta['last_updated'])
         hours_since_update = (now - last_update).total_seconds() / 3600
         
         return {
-            'total_reports': self.scam_data['total_reports'],
-            'reported_numbers': len(self.scam_data['reported_numbers']),
-            'reported_upis': len(self.scam_data['reported_upis']),
-            'last_updated': self.scam_data['last_updated'],
+            'total_reports': meta['total_reports'],
+            'reported_numbers': snap.count('reported_numbers') if snap else len(meta['reported_numbers']),
+            'reported_upis': snap.count('reported_upis') if snap else len(meta['reported_upis']),
+            'last_updated': meta['last_updated'],
             'hours_since_update': round(hours_since_update, 1),
-            'cache_valid': hours_since_update < 1.0,
-            'recent_news': len(self.scam_data.get('live_reports', []))
+            'cache_valid': hours_since_update < self.cache_duration / 3600,
+            'recent_news': len(self.get_recent_reports(limit=None)),
+            'snapshot_version': snap.version if snap else None
         }
     
     def get_recent_reports(self, limit: int = 5) -> List[Dict]:
         """Get most recent scam reports"""
-        return self.scam_data.get('live_reports', [])[:limit]
+        snap = self.read_snapshot()
+        meta = snap.meta if snap else self.scam_data
+        # Feed tier past its TTL - same rule as load_cache
+        if self._feed_expired(meta['last_updated']):
+            return []
+        return (meta.get('live_reports') or [])[:limit]
 
 
 # Initialize global instance
@@ -503,9 +927,13 @@ if __name__ == "__main__":
     print("🔄 Updating Live Scammer Database...")
     result = update_db()
     print(f"✅ Update complete!")
-    print(f"   News found: {result['news_found']}")
+    print(f"   Reports found: {result['total_reports_fetched']}")
     print(f"   Total numbers: {result['total_numbers']}")
     print(f"   Update time: {result['update_time_ms']}ms")
+    for source_key, run in result['source_runs'].items():
+        print(f"   {source_key}: {run['outcome']} in {run['duration_ms']}ms, status {run.get('status')}, "
+              f"{run.get('bytes', 0)} bytes, {run['items_parsed']} parsed, {run['items_ingested']} ingested"
+              + (f", {run['error']}" if run['error'] else ""))
     
     stats = get_db_stats()
     print(f"\n📊 Database Stats:")
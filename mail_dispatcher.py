@@ -0,0 +1,328 @@
+"""
+Satark.ai - Background Mail Dispatcher
+Alert and complaint e-mails are handed to a background sender instead of
+being sent on the Streamlit thread, so a scan result never waits on SMTP.
+- Messages go through the durable outbox (mail_outbox.py): retried with
+  backoff, and delivered after a restart
+- One persistent SMTP session (connect + STARTTLS + login once) reused for
+  every message, re-established automatically if the server drops it
+- Messages queued while a send is in progress go out on the same session
+- submit() returns at once, with a Future for callers that want the outcome
+- Send time, queue-to-delivery time and failures in the metrics registry
+- Disabled until GMAIL_SENDER and GMAIL_APP_PASSWORD are set; mail submitted
+  meanwhile waits in the outbox and goes out once a configured process starts
+
+Usage:
+    python mail_dispatcher.py bench [--messages 50] [--connect-delay 0.3]
+"""
+
+import argparse
+import atexit
+import os
+import smtplib
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+from email.message import Message
+from typing import Dict
+
+from dotenv import load_dotenv
+
+from mail_outbox import Outbox, is_permanent
+from metrics import EMAIL_DELIVERY_SECONDS, EMAIL_SECONDS, EMAILS, SMTP_SESSIONS
+
+
+load_dotenv()
+
+
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+# Same credentials as EMAIL_SETUP.md (a Gmail app password); without both, mail stays in the outbox
+SMTP_USER = os.getenv("GMAIL_SENDER", "")
+SMTP_PASSWORD = os.getenv("GMAIL_APP_PASSWORD", "")
+SMTP_CONFIGURED = bool(SMTP_USER and SMTP_PASSWORD)
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") == "1"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "10"))
+# Close the session after this long without mail (servers drop idle sessions anyway)
+SMTP_IDLE_SECONDS = float(os.getenv("SMTP_IDLE_SECONDS", "60"))
+
+SENDER_EMAIL = SMTP_USER
+
+
+class SMTPSession:
+    """A logged-in SMTP connection reused across messages"""
+
+    def __init__(self, host: str = SMTP_HOST, port: int = SMTP_PORT, user: str = SMTP_USER,
+                 password: str = SMTP_PASSWORD, starttls: bool = SMTP_STARTTLS, timeout: float = SMTP_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self._server = None
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.user:
+                server.login(self.user, self.password)
+        except Exception:
+            server.close()
+            raise
+        self._server = server
+        SMTP_SESSIONS.inc()
+
+    def send(self, message: Message):
+        """Send on the open session, reconnecting once if the server has dropped it"""
+        if not message['From'] and self.user:
+            # Queued while no sender was configured
+            del message['From']
+            message['From'] = self.user
+        for attempt in (1, 2):
+            if self._server is None:
+                self._connect()
+            try:
+                self._server.send_message(message)
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                self.close()
+                if attempt == 2:
+                    raise
+
+    def close(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            self._server.close()
+        self._server = None
+
+    @property
+    def connected(self) -> bool:
+        return self._server is not None
+
+
+class MailDispatcher:
+    """Sends outbox messages from one background thread over a pooled SMTP session"""
+
+    def __init__(self, session: SMTPSession = None, outbox: Outbox = None,
+                 idle_seconds: float = SMTP_IDLE_SECONDS, verbose: bool = True, enabled: bool = None):
+        self.session = session or SMTPSession()
+        self.idle_seconds = idle_seconds
+        self.verbose = verbose
+        # A custom session brings its own credentials; the default one needs GMAIL_* set
+        self.enabled = enabled if enabled is not None else (session is not None or SMTP_CONFIGURED)
+        self._warned = False
+        self._outbox = outbox
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._futures: Dict[int, Future] = {}
+        self._thread = None
+
+    @property
+    def outbox(self) -> Outbox:
+        # Opened on first use, so importing this module doesn't create the database
+        with self._lock:
+            if self._outbox is None:
+                self._outbox = Outbox()
+            return self._outbox
+
+    def submit(self, message: Message, kind: str = 'alert', key: str = None) -> Future:
+        """
+        Store a message in the outbox and wake the sender.
+        The Future resolves to True once sent, False if the first attempt failed or sending
+        is disabled - the outbox keeps it. A duplicate of a message still in the outbox
+        resolves with that message's outcome (True at once if it was already sent).
+        """
+        future = Future()
+        message_id, queued, status = self.outbox.enqueue(message, kind, key)
+        if status == 'sent':
+            future.set_result(True)
+            return future
+        if not queued:
+            with self._lock:
+                pending = self._futures.get(message_id)
+            if pending is not None:
+                return pending  # Submitted by this process - same outcome
+        if not self.enabled:
+            self.start()  # Warns once
+            future.set_result(False)
+            return future
+        with self._lock:
+            self._futures[message_id] = future
+        self.start()
+        self._wake.set()
+        return future
+
+    def start(self):
+        """Start the sender thread; it also delivers mail left in the outbox by an earlier run"""
+        if not self.enabled:
+            if not self._warned:
+                self._warned = True
+                print("⚠️ Email sending disabled: set GMAIL_SENDER and GMAIL_APP_PASSWORD. "
+                      "Alerts and complaints stay queued in the mail outbox until then.")
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                if self._thread is None:
+                    # Give just-submitted mail a chance to go out when the process exits
+                    atexit.register(self.flush, 10)
+                self._thread = threading.Thread(target=self._run, name="mail-dispatcher", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        last_sent = time.monotonic()
+        while True:
+            try:
+                self._wake.clear()
+                item = self.outbox.claim()
+                if item is not None:
+                    self._deliver(item)
+                    last_sent = time.monotonic()
+                    continue
+                if self.session.connected and time.monotonic() - last_sent >= self.idle_seconds:
+                    self.session.close()
+                due = self.outbox.next_due_in()
+                self._wake.wait(self.idle_seconds if due is None else min(due, self.idle_seconds))
+            except Exception as e:
+                # Keep the sender alive through database hiccups (locked, disk full)
+                print(f"❌ Mail dispatcher error: {e}")
+                time.sleep(1)
+
+    def _deliver(self, item: Dict):
+        message, kind = item['message'], item['kind']
+        start = time.perf_counter()
+        try:
+            self.session.send(message)
+        except Exception as e:
+            # Don't reuse a session left in an unknown state
+            self.session.close()
+            status = self.outbox.mark_failed(item['id'], f"{type(e).__name__}: {e}", is_permanent(e))
+            EMAILS.inc(kind=kind, outcome='failed')
+            print(f"❌ Failed to send {kind} email to {item['recipient']} "
+                  f"(attempt {item['attempts']}, {'will retry' if status == 'queued' else status}): {e}")
+            self._resolve(item['id'], False)
+            return
+        EMAIL_SECONDS.observe(time.perf_counter() - start, kind=kind)
+        self.outbox.mark_sent(item['id'])
+        EMAIL_DELIVERY_SECONDS.observe(time.time() - item['created_at'], kind=kind)
+        EMAILS.inc(kind=kind, outcome='sent')
+        if self.verbose:
+            print(f"✅ {kind.capitalize()} email sent to {item['recipient']}")
+        self._resolve(item['id'], True)
+
+    def _resolve(self, message_id: int, sent: bool):
+        with self._lock:
+            future = self._futures.pop(message_id, None)
+        if future is not None:
+            future.set_result(sent)
+
+    def pending(self) -> int:
+        """Messages waiting in the outbox (queued or being sent)"""
+        stats = self.outbox.stats()
+        return stats['queued'] + stats['sending']
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait until every message submitted by this process has had a delivery attempt. False on timeout."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            with self._lock:
+                if not self._futures:
+                    return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+
+
+# Process-wide dispatcher shared by every session
+dispatcher = MailDispatcher()
+
+
+class _StandInHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for the benchmark; the greeting delay stands in for TLS + login round trips"""
+
+    def handle(self):
+        time.sleep(self.server.connect_delay)
+        self.wfile.write(b"220 stand-in ESMTP\r\n")
+        for line in self.rfile:
+            command = line[:4].upper()
+            if command == b'DATA':
+                self.wfile.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                for data_line in self.rfile:
+                    if data_line == b'.\r\n':
+                        break
+                with self.server.lock:
+                    self.server.received += 1
+                self.wfile.write(b"250 Queued\r\n")
+            elif command == b'QUIT':
+                self.wfile.write(b"221 Bye\r\n")
+                return
+            else:
+                self.wfile.write(b"250 OK\r\n")
+
+
+def _stand_in_server(connect_delay: float) -> socketserver.ThreadingTCPServer:
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _StandInHandler)
+    server.daemon_threads = True
+    server.connect_delay = connect_delay
+    server.received = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def benchmark(messages: int = 50, connect_delay: float = 0.3):
+    """Connection per message (the old way) vs the outbox + pooled dispatcher, against a local stand-in server"""
+    import tempfile
+    from email.mime.text import MIMEText
+
+    server = _stand_in_server(connect_delay)
+    port = server.server_address[1]
+
+    def make(i):
+        message = MIMEText(f"Benchmark message {i}", "plain")
+        message["Subject"] = f"🚨 SCAM ALERT {i}"
+        message["From"] = "bench@satark.local"
+        message["To"] = "alerts@satark.local"
+        return message
+
+    start = time.perf_counter()
+    for i in range(messages):
+        with smtplib.SMTP('127.0.0.1', port, timeout=10) as smtp:
+            smtp.send_message(make(i))
+    direct = time.perf_counter() - start
+
+    bench_outbox = Outbox(os.path.join(tempfile.mkdtemp(), 'bench_outbox.db'))
+    bench = MailDispatcher(SMTPSession('127.0.0.1', port, user='', password='', starttls=False),
+                           outbox=bench_outbox, verbose=False)
+    start = time.perf_counter()
+    futures = [bench.submit(make(i), kind='bench') for i in range(messages)]
+    submitted = time.perf_counter() - start
+    bench.flush()
+    pooled = time.perf_counter() - start
+    bench.session.close()
+
+    assert all(f.result() for f in futures) and server.received == 2 * messages
+    print(f"📧 {messages} messages, {connect_delay * 1000:.0f} ms handshake")
+    print(f"   connection per message:  {direct:.2f}s ({messages / direct:.1f} msg/s), "
+          f"caller blocked {direct / messages * 1000:.0f} ms per message")
+    print(f"   outbox + pooled session: {pooled:.2f}s ({messages / pooled:.1f} msg/s), "
+          f"caller blocked {submitted / messages * 1000:.3f} ms per message")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Satark.ai mail dispatcher")
+    sub = parser.add_subparsers(dest='command', required=True)
+    bench = sub.add_parser('bench', help="Benchmark against a local SMTP stand-in")
+    bench.add_argument('--messages', type=int, default=50)
+    bench.add_argument('--connect-delay', type=float, default=0.3, help="Seconds per new session (TLS + login)")
+    args = parser.parse_args()
+
+    if args.command == 'bench':
+        benchmark(args.messages, args.connect_delay)
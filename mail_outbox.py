@@ -0,0 +1,273 @@
+"""
+Satark.ai - Durable Mail Outbox
+Every outgoing e-mail is written to a SQLite outbox before it is sent, so
+an SMTP outage or a restart delays mail instead of dropping it.
+- The rendered message (body + PDF attachment) is stored; dropped once sent
+- Retries with exponential backoff; permanent rejections (5xx) fail at once
+- Idempotency key per message: the same alert/complaint is not queued again
+  while it is pending or was sent within OUTBOX_DEDUPE_WINDOW; its Message-ID
+  is fixed at enqueue, so a retry after a crash mid-delivery is de-duplicated
+  by the receiving server
+- Messages not delivered within OUTBOX_MAX_AGE are expired
+- Depth per status and oldest message age on /metrics and the CLI
+
+Usage:
+    python mail_outbox.py stats
+    python mail_outbox.py purge [--days 7]
+"""
+
+import argparse
+import email
+import hashlib
+import json
+import os
+import smtplib
+import sqlite3
+import threading
+import time
+from email.message import Message
+from typing import Dict, Optional, Tuple
+
+from metrics import MAIL_OUTBOX, MAIL_OUTBOX_MESSAGES, MAIL_OUTBOX_OLDEST_SECONDS, registry
+
+
+OUTBOX_DB = os.getenv("OUTBOX_DB", "mail_outbox.db")
+OUTBOX_RETRY_BACKOFF = float(os.getenv("OUTBOX_RETRY_BACKOFF", "30"))
+OUTBOX_MAX_BACKOFF = float(os.getenv("OUTBOX_MAX_BACKOFF", "1800"))
+# Undelivered mail older than this is expired (an alert a day late is noise)
+OUTBOX_MAX_AGE = float(os.getenv("OUTBOX_MAX_AGE", "86400"))
+# A message being sent by a process that died is retried after this many seconds
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "120"))
+# A message already sent is only de-duplicated for this long (double clicks,
+# reruns); after that the same content is a deliberate resend
+OUTBOX_DEDUPE_WINDOW = float(os.getenv("OUTBOX_DEDUPE_WINDOW", "600"))
+
+STATUSES = ('queued', 'sending', 'sent', 'failed', 'expired')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,              -- alert, complaint
+    recipient TEXT NOT NULL,
+    message BLOB,                    -- rendered message, dropped once sent
+    status TEXT NOT NULL,            -- queued, sending, sent, failed, expired
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,   -- queued: earliest send; sending: lease expiry
+    created_at REAL NOT NULL,
+    finished_at REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_ready ON outbox (status, next_attempt_at);
+"""
+
+
+def idempotency_key(kind: str, recipient: str, *parts) -> str:
+    """Stable key for a message: same kind, recipient and content = same key"""
+    digest = hashlib.sha256(f"{kind}\0{recipient}".encode('utf-8'))
+    for part in parts:
+        digest.update(b'\0')
+        digest.update(part if isinstance(part, bytes) else
+                      json.dumps(part, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def content_parts(message: Message) -> list:
+    """
+    The parts of a message that define its content: subject, then the type,
+    file name and decoded payload of every leaf part. Leaves out what changes
+    each time a message is built, such as the Date header and MIME boundaries.
+    """
+    parts = [message['Subject'] or '']
+    for part in message.walk():
+        if part.is_multipart():
+            continue
+        parts.append(f"{part.get_content_type()}\0{part.get_filename() or ''}")
+        parts.append(part.get_payload(decode=True) or b'')
+    return parts
+
+
+def is_permanent(error: Exception) -> bool:
+    """SMTP rejections that won't succeed on retry (5xx other than authentication)"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return False  # Fixable by correcting the credentials; keep the mail
+    code = getattr(error, 'smtp_code', None)
+    return isinstance(code, int) and 500 <= code < 600
+
+
+class Outbox:
+    """SQLite outbox; one instance per process (connections are per thread)"""
+
+    def __init__(self, path: str = OUTBOX_DB, retry_backoff: float = OUTBOX_RETRY_BACKOFF,
+                 max_backoff: float = OUTBOX_MAX_BACKOFF, max_age: float = OUTBOX_MAX_AGE,
+                 lease_seconds: float = OUTBOX_LEASE_SECONDS, dedupe_window: float = OUTBOX_DEDUPE_WINDOW):
+        self.path = path
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.max_age = max_age
+        self.lease_seconds = lease_seconds
+        self.dedupe_window = dedupe_window
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+        registry.collector(self._publish_metrics)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit; writes that must be atomic use explicit BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, message: Message, kind: str, key: str = None) -> Tuple[int, bool, str]:
+        """
+        Store a message for delivery. A message with the same key that is still
+        pending, or was sent less than dedupe_window seconds ago, is not queued
+        again; one that failed, expired or was sent earlier is superseded.
+
+        Returns:
+            (id, queued, status) - if queued is False, the id and status of the existing message
+        """
+        if key is None:
+            key = idempotency_key(kind, message['To'], *content_parts(message))
+        now = time.time()
+        # Fixed per outbox row: retries of it carry the same Message-ID, a later resend a new one
+        del message['Message-ID']
+        message['Message-ID'] = f"<{key[:32]}.{int(now * 1000)}@satark.ai>"
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT id, status, finished_at FROM outbox WHERE idempotency_key = ?", (key,)).fetchone()
+            if row is not None and (row['status'] in ('queued', 'sending') or
+                                    (row['status'] == 'sent' and now - row['finished_at'] < self.dedupe_window)):
+                conn.execute("COMMIT")
+                MAIL_OUTBOX.inc(event='duplicate')
+                return row['id'], False, row['status']
+            if row is not None:
+                # Free the key for the new message; the old row stays for stats until purged
+                conn.execute("UPDATE outbox SET idempotency_key = idempotency_key || ':' || id WHERE id = ?",
+                             (row['id'],))
+            cursor = conn.execute(
+                "INSERT INTO outbox (idempotency_key, kind, recipient, message, status, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+                (key, kind, message['To'], message.as_bytes(), now, now))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        MAIL_OUTBOX.inc(event='queued')
+        return cursor.lastrowid, True, 'queued'
+
+    def claim(self) -> Optional[Dict]:
+        """
+        Lease the next message that is due (queued, or sending with an expired lease).
+        Returns it with the parsed message, or None if nothing is due.
+        """
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            expired = conn.execute(
+                "UPDATE outbox SET status = 'expired', message = NULL, finished_at = ? "
+                "WHERE status IN ('queued', 'sending') AND created_at < ?",
+                (now, now - self.max_age)).rowcount
+            row = conn.execute(
+                "SELECT * FROM outbox WHERE status IN ('queued', 'sending') AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at LIMIT 1", (now,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE outbox SET status = 'sending', attempts = attempts + 1, next_attempt_at = ? "
+                             "WHERE id = ?", (now + self.lease_seconds, row['id']))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        if expired:
+            MAIL_OUTBOX.inc(expired, event='expired')
+        if row is None:
+            return None
+        item = dict(row)
+        item['message'] = email.message_from_bytes(row['message'])
+        item['attempts'] += 1
+        return item
+
+    def mark_sent(self, message_id: int):
+        self._conn().execute("UPDATE outbox SET status = 'sent', message = NULL, last_error = NULL, finished_at = ? "
+                             "WHERE id = ?", (time.time(), message_id))
+        MAIL_OUTBOX.inc(event='sent')
+
+    def mark_failed(self, message_id: int, error: str, permanent: bool = False) -> str:
+        """Record a failed attempt: retry with backoff, or fail/expire for good. Returns the new status."""
+        conn = self._conn()
+        now = time.time()
+        row = conn.execute("SELECT attempts, created_at FROM outbox WHERE id = ?", (message_id,)).fetchone()
+        retry_at = now + min(self.max_backoff, self.retry_backoff * 2 ** (row['attempts'] - 1))
+        if permanent:
+            status = 'failed'
+        elif retry_at > row['created_at'] + self.max_age:
+            status = 'expired'
+        else:
+            status = 'queued'
+        if status == 'queued':
+            conn.execute("UPDATE outbox SET status = 'queued', next_attempt_at = ?, last_error = ? WHERE id = ?",
+                         (retry_at, error, message_id))
+        else:
+            conn.execute("UPDATE outbox SET status = ?, message = NULL, last_error = ?, finished_at = ? WHERE id = ?",
+                         (status, error, now, message_id))
+        MAIL_OUTBOX.inc(event='retried' if status == 'queued' else status)
+        return status
+
+    def next_due_in(self) -> Optional[float]:
+        """Seconds until the next undelivered message is due (0 = now), None if there is none"""
+        due = self._conn().execute(
+            "SELECT MIN(next_attempt_at) FROM outbox WHERE status IN ('queued', 'sending')").fetchone()[0]
+        return None if due is None else max(0.0, due - time.time())
+
+    def get(self, message_id: int) -> Optional[Dict]:
+        row = self._conn().execute(
+            "SELECT id, kind, recipient, status, attempts, created_at, finished_at, last_error FROM outbox WHERE id = ?",
+            (message_id,)).fetchone()
+        return dict(row) if row else None
+
+    def stats(self) -> Dict:
+        """Messages per status, age of the oldest undelivered one, and deliveries in the last hour"""
+        conn = self._conn()
+        now = time.time()
+        counts = {status: count for status, count in conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status")}
+        oldest = conn.execute("SELECT MIN(created_at) FROM outbox WHERE status IN ('queued', 'sending')").fetchone()[0]
+        sent_last_hour = conn.execute("SELECT COUNT(*) FROM outbox WHERE status = 'sent' AND finished_at >= ?",
+                                      (now - 3600,)).fetchone()[0]
+        stats = {status: counts.get(status, 0) for status in STATUSES}
+        stats['oldest_undelivered_s'] = round(now - oldest, 1) if oldest else 0.0
+        stats['sent_last_hour'] = sent_last_hour
+        return stats
+
+    def _publish_metrics(self):
+        stats = self.stats()
+        for status in STATUSES:
+            MAIL_OUTBOX_MESSAGES.set(stats[status], status=status)
+        MAIL_OUTBOX_OLDEST_SECONDS.set(stats['oldest_undelivered_s'])
+
+    def purge(self, older_than_days: float = 7) -> int:
+        """Delete finished messages older than N days. Returns how many were deleted."""
+        cutoff = time.time() - older_than_days * 86400
+        return self._conn().execute("DELETE FROM outbox WHERE status IN ('sent', 'failed', 'expired') AND finished_at < ?",
+                                    (cutoff,)).rowcount
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Satark.ai mail outbox")
+    parser.add_argument('command', choices=['stats', 'purge'])
+    parser.add_argument('--days', type=float, default=7, help="purge: age of finished messages to delete")
+    parser.add_argument('--db', default=OUTBOX_DB, help="Outbox database file")
+    args = parser.parse_args()
+
+    if args.command == 'stats':
+        print(json.dumps(Outbox(args.db).stats(), indent=2))
+    else:
+        print(f"🧹 Deleted {Outbox(args.db).purge(args.days)} finished messages")
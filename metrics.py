@@ -0,0 +1,376 @@
+"""
+Satark.ai - Process-Wide Metrics
+Counters, gauges and histograms for the whole scan pipeline, shared by every
+Streamlit session in the process.
+- Fixed-bucket histograms (p95/p99 via histogram_quantile, or percentile() locally)
+- Labelled series, thread-safe, O(buckets) per observation
+- OpenMetrics text exposition on a local HTTP endpoint (METRICS_PORT)
+  and/or a periodically rewritten file (METRICS_FILE)
+"""
+
+import bisect
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+# Seconds - from sub-millisecond snapshot lookups up to slow Gemini calls and crawls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # 0 = no HTTP endpoint
+METRICS_FILE = os.getenv("METRICS_FILE", "")  # Empty = no file export
+METRICS_FILE_INTERVAL = float(os.getenv("METRICS_FILE_INTERVAL", "15"))
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: Tuple[Tuple[str, str], ...], extra: Tuple[str, str] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, one series per label set"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}_total{_format_labels(key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge:
+    """Current value (queue depth, age), one series per label set"""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple, float] = {}
+
+    def set(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in values]
+
+
+class Histogram:
+    """Fixed-bucket histogram, one series per label set"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # label key -> [per-bucket counts (last is +Inf), sum, count]
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with-block (also when it raises)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(_label_key(labels))
+            return series[2] if series else 0
+
+    def percentile(self, q: float, **labels) -> Optional[float]:
+        """
+        Estimate the q-th percentile (0-100) from the buckets, interpolating
+        linearly inside the bucket like Prometheus' histogram_quantile.
+        """
+        with self._lock:
+            series = self._series.get(_label_key(labels))
+            if not series or not series[2]:
+                return None
+            counts, total = list(series[0]), series[2]
+        rank = q / 100 * total
+        seen = 0
+        for i, bucket_count in enumerate(counts):
+            if seen + bucket_count >= rank and bucket_count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]  # Beyond the largest bucket
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._series.items())
+        lines = []
+        for key, (counts, total_sum, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', _format_value(float(bound))))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total_sum)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class Registry:
+    """All metrics of this process, rendered as one OpenMetrics exposition"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, object] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing  # Re-registering (e.g. after a module reload) keeps the same series
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._register(Counter(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, buckets))
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._register(Gauge(name, help_text))
+
+    def collector(self, fn: Callable[[], None]):
+        """Call fn before every render, to refresh gauges that are read from elsewhere (a database, a queue)"""
+        with self._lock:
+            if fn not in self._collectors:
+                self._collectors.append(fn)
+
+    def render(self) -> str:
+        with self._lock:
+            collectors = list(self._collectors)
+        for fn in collectors:
+            try:
+                fn()
+            except Exception as e:
+                print(f"Metrics collector {getattr(fn, '__qualname__', fn)} failed: {e}")
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.extend(metric.render())
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry shared by every module
+registry = Registry()
+
+
+def timed(histogram: Histogram, **labels) -> Callable:
+    """Decorator observing each call's duration in histogram"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with histogram.time(**labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Scan pipeline
+SCAN_SECONDS = registry.histogram('satark_scan_seconds', "End-to-end screenshot scan (Gemini + live DB + search)")
+SCANS = registry.counter('satark_scans', "Scans by mode (executed, coalesced onto an identical in-flight scan)")
+SCAN_COALESCE_WAITERS = registry.histogram('satark_scan_coalesce_waiters', "Callers that shared each executed scan",
+                                           (0.0, 1.0, 2.0, 5.0, 10.0, 25.0, 50.0, 100.0))
+GEMINI_SECONDS = registry.histogram('satark_gemini_request_seconds', "Gemini generate_content latency")
+GEMINI_REQUESTS = registry.counter('satark_gemini_requests',
+                                   "Gemini calls by outcome (ok, parse_error, api_error, queue_timeout; rate_limited per 429 attempt)")
+GEMINI_QUEUE_WAIT_SECONDS = registry.histogram('satark_gemini_queue_wait_seconds', "Time a Gemini call waited for a key")
+LIVE_DB_LOOKUP_SECONDS = registry.histogram('satark_live_db_lookup_seconds', "Live scam database lookup latency by kind")
+LIVE_DB_LOOKUPS = registry.counter('satark_live_db_lookups', "Live scam database lookups by kind and result (hit, miss)")
+SEARCH_SECONDS = registry.histogram('satark_search_seconds', "Internet search latency per query")
+SEARCH_QUERIES = registry.counter('satark_search_queries', "Internet search queries by result (results, empty, error)")
+
+# Outputs
+EMAIL_SECONDS = registry.histogram('satark_email_send_seconds', "SMTP send latency by kind")
+EMAILS = registry.counter('satark_emails', "E-mails by kind and outcome (sent, failed)")
+EMAIL_DELIVERY_SECONDS = registry.histogram('satark_email_delivery_seconds', "Time from queueing an e-mail to sending it, by kind")
+SMTP_SESSIONS = registry.counter('satark_smtp_sessions', "SMTP sessions opened (connect, STARTTLS, login)")
+ALERTS = registry.counter('satark_alerts', "SCAM alerts by action (immediate, digested, digest_sent)")
+ALERT_DIGEST_SIZE = registry.histogram('satark_alert_digest_size', "Reports summarised per digest e-mail",
+                                       (1.0, 2.0, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 1000.0))
+MAIL_OUTBOX = registry.counter('satark_mail_outbox_events',
+                               "Outbox events (queued, duplicate, sent, retried, failed, expired)")
+MAIL_OUTBOX_MESSAGES = registry.gauge('satark_mail_outbox_messages', "Messages in the outbox by status")
+MAIL_OUTBOX_OLDEST_SECONDS = registry.gauge('satark_mail_outbox_oldest_seconds', "Age of the oldest undelivered message")
+PDF_SECONDS = registry.histogram('satark_pdf_generation_seconds', "Cyber complaint PDF generation time")
+PDF_CACHE = registry.counter('satark_pdf_cache', "Complaint PDF cache lookups (hit, miss) and evictions")
+
+# Intelligence refresh
+REFRESH_SECONDS = registry.histogram('satark_refresh_seconds', "Full intelligence refresh duration")
+REFRESH_SOURCE_SECONDS = registry.histogram('satark_refresh_source_seconds', "Refresh duration per source")
+REFRESH_SOURCE_RUNS = registry.counter('satark_refresh_source_runs', "Refresh runs per source by outcome")
+REFRESH_ITEMS_INGESTED = registry.counter('satark_refresh_items_ingested', "New items ingested per source")
+HTTP_REQUESTS = registry.counter('satark_http_requests', "Scraper HTTP requests by source and result (fetched, not_modified, error)")
+
+# Scan job queue
+JOBS = registry.counter('satark_jobs', "Scan job events (submitted, done, retried, failed, lease_expired)")
+JOB_QUEUE_WAIT_SECONDS = registry.histogram('satark_job_queue_wait_seconds', "Time from submit to first claim",
+                                            LATENCY_BUCKETS + (120.0, 300.0, 600.0))
+
+# Headless API
+API_SECONDS = registry.histogram('satark_api_request_seconds', "API request latency by endpoint")
+API_REQUESTS = registry.counter('satark_api_requests', "API requests by endpoint and status")
+
+# Streamlit UI
+UI_RUN_SECONDS = registry.histogram('satark_ui_run_seconds',
+                                    "Streamlit script runs by scope (full rerun, or one fragment: intelligence, citizen, developer)")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood the Streamlit log
+
+
+def write_file(path: str):
+    """Write the current exposition atomically (for node_exporter's textfile collector or tailing)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(registry.render())
+    os.replace(tmp_path, path)
+
+
+_exporter_lock = threading.Lock()
+_exporter_started = False
+
+
+def start_exporter(port: int = METRICS_PORT, host: str = METRICS_HOST,
+                   path: str = METRICS_FILE, interval: float = METRICS_FILE_INTERVAL):
+    """
+    Start the configured exporters once per process (later calls are no-ops).
+    port > 0 serves GET /metrics; a non-empty path is rewritten every interval seconds.
+    """
+    global _exporter_started
+    with _exporter_lock:
+        if _exporter_started:
+            return
+        _exporter_started = True
+
+    if port:
+        try:
+            server = ThreadingHTTPServer((host, port), _Handler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+            print(f"📈 Metrics at http://{host}:{port}/metrics")
+        except OSError as e:
+            print(f"Metrics endpoint not started: {e}")
+
+    if path:
+        def write_loop():
+            while True:
+                try:
+                    write_file(path)
+                except Exception as e:
+                    print(f"Metrics file write failed: {e}")
+                time.sleep(interval)
+
+        threading.Thread(target=write_loop, name="metrics-file", daemon=True).start()
+
+
+if __name__ == "__main__":
+    # Benchmark: cost of one histogram observation under thread contention
+    import random
+    from concurrent.futures import ThreadPoolExecutor
+
+    hist = Histogram('bench_seconds', "benchmark")
+    per_thread = 200_000
+    threads = 8
+
+    def work(_):
+        rand = random.random
+        for _ in range(per_thread):
+            hist.observe(rand() * 2, stage='bench')
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(work, range(threads)))
+    elapsed = time.perf_counter() - start
+    total = per_thread * threads
+    print(f"⚡ {total:,} observations on {threads} threads in {elapsed:.2f}s - {elapsed / total * 1e9:.0f} ns each")
+    print(f"   p50 {hist.percentile(50, stage='bench'):.3f}s, p95 {hist.percentile(95, stage='bench'):.3f}s, "
+          f"p99 {hist.percentile(99, stage='bench'):.3f}s (bucket estimates; exact for uniform 0-2s: 1.0 / 1.9 / 1.98)")
+    print()
+    print(registry.render())
@@ -0,0 +1,97 @@
+"""
+Satark.ai - Targeted HTML Parsing for Scrapers
+Builds only the part of each page a scraper actually reads.
+- Per-source SoupStrainer filters, built once at import
+- lxml backend when installed, html.parser otherwise
+"""
+
+import re
+import time
+from typing import Dict
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+
+def _pick_backend() -> str:
+    """Fastest available BeautifulSoup tree builder"""
+    try:
+        import lxml  # noqa: F401
+        return 'lxml'
+    except ImportError:
+        return 'html.parser'
+
+
+PARSER_BACKEND = _pick_backend()
+
+COMPLAINT_CLASS_RE = re.compile('complaint|post', re.I)
+# Regex, because while parsing a strainer sees the raw multi-valued class string
+TWEET_CLASS_RE = re.compile(r'(^|\s)tweet-content(\s|$)')
+# The "What's New" advisory list on cybercrime.gov.in
+ADVISORY_CLASS_RE = re.compile(r'(^|\s)whatsnew(\s|$)')
+
+# What each scraper needs from its page - everything else is skipped while parsing
+SOURCE_STRAINERS: Dict[str, SoupStrainer] = {
+    # Complaint cards (title is a heading/link inside the card)
+    'consumer_complaints': SoupStrainer(['div', 'article'], class_=COMPLAINT_CLASS_RE),
+    # The advisory list container (its items are selected with advisory_items)
+    'govt_advisory': SoupStrainer('div', class_=ADVISORY_CLASS_RE),
+    # Tweet bodies on Nitter search pages
+    'social_media': SoupStrainer('div', class_=TWEET_CLASS_RE),
+}
+
+
+def parse_page(content: bytes, source_key: str = None) -> BeautifulSoup:
+    """
+    Parse a scraped page, materialising only the elements its source needs.
+
+    Args:
+        content: Raw page bytes
+        source_key: Key into SOURCE_STRAINERS (full parse if unknown/None)
+
+    Returns:
+        BeautifulSoup tree restricted to the source's elements
+    """
+    strainer = SOURCE_STRAINERS.get(source_key)
+    return BeautifulSoup(content, PARSER_BACKEND, parse_only=strainer)
+
+
+def advisory_items(soup: BeautifulSoup, limit: int = 20) -> list:
+    """Advisory entries: the items of the advisory list, or of the whole page if it has none"""
+    container = soup.find('div', class_=ADVISORY_CLASS_RE) or soup
+    return container.find_all(['p', 'li'], limit=limit)
+
+
+if __name__ == "__main__":
+    # Benchmark: full html.parser tree (old) vs strained tree on the fastest backend
+    import os
+
+    fixtures_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+    runs = 20
+    pages = [
+        ('consumer_complaints.html', 'consumer_complaints',
+         lambda soup: soup.find_all(['div', 'article'], class_=COMPLAINT_CLASS_RE, limit=5)),
+        ('cybercrime_whatsnew.html', 'govt_advisory',
+         advisory_items),
+        ('nitter_search.html', 'social_media',
+         lambda soup: soup.find_all('div', class_='tweet-content', limit=5)),
+    ]
+
+    print(f"Backend: {PARSER_BACKEND}")
+    for name, source_key, select in pages:
+        with open(os.path.join(fixtures_dir, name), 'rb') as f:
+            data = f.read()
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            old = select(BeautifulSoup(data, 'html.parser'))
+        old_ms = (time.perf_counter() - start) / runs * 1000
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            new = select(parse_page(data, source_key))
+        new_ms = (time.perf_counter() - start) / runs * 1000
+
+        same = [e.get_text(strip=True) for e in old] == [e.get_text(strip=True) for e in new]
+        print(f"📄 {name} ({len(data) / 1024:.1f} KB)")
+        print(f"   full html.parser : {old_ms:7.2f} ms/page")
+        print(f"   strained {PARSER_BACKEND:<8}: {new_ms:7.2f} ms/page  ({(1 - new_ms / old_ms) * 100:.0f}% faster, same elements: {same})")
@@ -0,0 +1,193 @@
+"""
+Satark.ai - Background Intelligence Refresher
+Keeps the live scam database fresh without blocking any user session.
+- One refresher thread per process on a jittered interval
+- Manual refresh requests piggyback on an in-flight run (single-flight)
+- Readers always see the last completed update
+- Only one worker process per machine refreshes; the others follow its
+  published snapshot and forward manual requests to it
+"""
+
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from live_scraper import live_db, LiveScammerDB
+from singleflight import SingleFlight
+from snapshot import WriterLock
+
+
+REFRESH_KEY = 'update_database'
+# How often a follower process retries the writer lock / the leader checks for forwarded requests
+FOLLOWER_POLL_SECONDS = 30
+REQUEST_POLL_SECONDS = 2
+
+
+class IntelligenceRefresher:
+    """Runs update_database in the background on a jittered schedule"""
+
+    def __init__(self, db: LiveScammerDB = live_db, interval: float = None, jitter: float = None):
+        self.db = db
+        # Seconds between refreshes, +/- jitter fraction so processes don't crawl in lockstep
+        self.interval = interval if interval is not None else float(os.getenv("REFRESH_INTERVAL_SECONDS", "3600"))
+        self.jitter = jitter if jitter is not None else float(os.getenv("REFRESH_JITTER", "0.1"))
+
+        self._flight = SingleFlight()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._writer_lock = WriterLock(f"{db.snapshot_file}.lock")
+        self._request_file = f"{db.snapshot_file}.refresh"
+        self._last_request = self._request_mtime()
+
+        self.piggybacked = 0  # Manual requests that joined an in-flight run
+        self.last_result: Optional[Dict] = None
+        self.last_completed: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.next_run_at: Optional[float] = None
+
+    def start(self):
+        """Start the background thread (no-op if already running)"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="intel-refresher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background thread after the current run"""
+        self._stop.set()
+        self._wake.set()
+
+    def _jittered(self, seconds: float) -> float:
+        return max(0.0, seconds * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def _initial_delay(self) -> float:
+        """Refresh soon if the feed tier is stale or empty, else wait out the interval"""
+        try:
+            stats = self.db.get_stats()
+            age = stats['hours_since_update'] * 3600 if stats['recent_news'] else self.interval
+        except Exception:
+            age = self.interval
+        return self._jittered(max(0.0, self.interval - age)) if age < self.interval else random.uniform(0, 5)
+
+    def _request_mtime(self) -> int:
+        try:
+            return os.stat(self._request_file).st_mtime_ns
+        except OSError:
+            return 0
+    
+    def _wait(self, delay: float):
+        """Sleep until the next run, a local wake-up, or a request forwarded by a follower"""
+        deadline = time.time() + delay
+        while not self._stop.is_set():
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            if self._wake.wait(timeout=min(remaining, REQUEST_POLL_SECONDS)):
+                break
+            requested = self._request_mtime()
+            if requested != self._last_request:
+                self._last_request = requested
+                break
+        self._wake.clear()
+    
+    def _run(self):
+        delay = None
+        while not self._stop.is_set():
+            if not self._writer_lock.acquire():
+                # Another worker process is the leader - its snapshot is what we read
+                self.next_run_at = None
+                self._stop.wait(timeout=FOLLOWER_POLL_SECONDS)
+                continue
+            if delay is None:
+                delay = self._initial_delay()  # Just became leader
+            self.next_run_at = time.time() + delay
+            self._wait(delay)
+            if self._stop.is_set():
+                break
+            self.refresh()
+            delay = self._jittered(self.interval)
+
+    def _do_refresh(self) -> Dict:
+        try:
+            result = self.db.update_database()
+            self.last_result = result
+            self.last_completed = datetime.now().isoformat()
+            self.last_error = None
+            return result
+        except Exception as e:
+            self.last_error = str(e)
+            return {'success': False, 'error': str(e)}
+
+    def refresh(self) -> Dict:
+        """Run a refresh now, or wait for the one already in flight"""
+        result, shared = self._flight.do(REFRESH_KEY, self._do_refresh)
+        return result
+
+    def refresh_now(self, wait: bool = False) -> Optional[Dict]:
+        """
+        Request a refresh from a user session.
+
+        With wait=False the request returns immediately: it either joins the
+        run already in flight or wakes the background thread for a new one.
+        In a follower process the request is forwarded to the leader.
+        """
+        if not self._writer_lock.acquire():
+            self._forward_request()
+            return None
+        if wait:
+            return self.refresh()
+        if self.is_refreshing():
+            self.piggybacked += 1
+        else:
+            if self._thread and self._thread.is_alive():
+                self._wake.set()
+            else:
+                threading.Thread(target=self.refresh, name="intel-refresh-once", daemon=True).start()
+        return None
+
+    def _forward_request(self):
+        """Touch the request file the leader process polls"""
+        try:
+            with open(self._request_file, 'a'):
+                pass
+            os.utime(self._request_file)
+            self.piggybacked += 1
+        except OSError as e:
+            print(f"Refresh request failed: {e}")
+    
+    def is_refreshing(self) -> bool:
+        return self._flight.in_flight(REFRESH_KEY)
+
+    def get_status(self) -> Dict:
+        """Refresher state for the UI"""
+        return {
+            'refreshing': self.is_refreshing(),
+            'leader': self._writer_lock.held,
+            'last_completed': self.last_completed,
+            'last_error': self.last_error,
+            'next_run_in_s': round(max(0.0, self.next_run_at - time.time())) if self.next_run_at else None,
+            'interval_s': self.interval,
+            'runs': self._flight.get_stats()['executions'],
+            'coalesced': self._flight.get_stats()['coalesced'] + self.piggybacked
+        }
+
+
+_refresher = None
+_refresher_lock = threading.Lock()
+
+
+def get_refresher() -> IntelligenceRefresher:
+    """Process-wide refresher, started on first use"""
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = IntelligenceRefresher()
+            _refresher.start()
+        return _refresher
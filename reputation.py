@@ -0,0 +1,93 @@
+"""
+Satark.ai - Reputation Scores for Reported Entities
+Every reported phone number / UPI ID carries a time-decayed score:
+report weights (by source reliability) that halve every half-life.
+- O(1) update per report: decay the stored score to now, add the weight
+- The stored score is "as of last_seen", so no history is ever rescanned
+- Lookups decay it to the query time in O(1)
+"""
+
+import math
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+
+# Days for a report's contribution to halve
+HALF_LIFE_DAYS = float(os.getenv("REPUTATION_HALF_LIFE_DAYS", "30"))
+
+# How much one report from each kind of source counts
+SOURCE_WEIGHTS = {
+    'Govt Advisory': 1.0,
+    'Consumer Complaint': 0.7,
+    'News Report': 0.6,
+    'Social Media Report': 0.4,
+    'Partner Report': 0.8,  # Bulk dumps from partner banks / telecom complaint cells
+}
+DEFAULT_WEIGHT = 0.5
+
+# Score at which a live DB hit alone is enough to call it a SCAM
+SCAM_SCORE = float(os.getenv("REPUTATION_SCAM_SCORE", "3.0"))
+# Score giving ~63% of the maximum risk boost
+BOOST_SCALE = 2.0
+
+
+def source_weight(scam_type: str) -> float:
+    """Reliability weight of one report"""
+    return SOURCE_WEIGHTS.get(scam_type, DEFAULT_WEIGHT)
+
+
+def _decay(age_days: float) -> float:
+    return 0.5 ** (max(0.0, age_days) / HALF_LIFE_DAYS)
+
+
+def _age_days(later: datetime, earlier: datetime) -> float:
+    return (later - earlier).total_seconds() / 86400
+
+
+def current_score(entry: Dict, now: datetime = None) -> float:
+    """Entry score decayed from its last report to now"""
+    # Entries from before scores existed count every report at full weight
+    score = entry.get('score', float(entry.get('count', 0)))
+    last_seen = entry.get('last_seen') or entry.get('first_seen')
+    if not score or not last_seen:
+        return score
+    return score * _decay(_age_days(now or datetime.now(), datetime.fromisoformat(last_seen)))
+
+
+def bumped_score(entry: Dict, scam_type: str, now: datetime) -> float:
+    """
+    Score after one more report made at `now` (call before updating last_seen).
+    A report older than last_seen (e.g. from an imported dump) is decayed to
+    last_seen instead, so the stored score stays "as of last_seen".
+    """
+    last_seen = entry.get('last_seen')
+    if last_seen and now < datetime.fromisoformat(last_seen):
+        stored = entry.get('score', float(entry.get('count', 0)))
+        return stored + source_weight(scam_type) * _decay(_age_days(datetime.fromisoformat(last_seen), now))
+    return current_score(entry, now) + source_weight(scam_type)
+
+
+def merged_entry(base: Optional[Dict], ours: Dict, theirs: Dict) -> Dict:
+    """
+    An entry two writers changed from the same base: the reports we added
+    since base, applied on top of theirs. Counts add up, first/last seen
+    widen, scam types merge, and our score gain is decayed to the merged last_seen.
+    """
+    base = base or {}
+    ours_seen = datetime.fromisoformat(ours.get('last_seen') or ours['first_seen'])
+    theirs_seen = datetime.fromisoformat(theirs.get('last_seen') or theirs['first_seen'])
+    last_seen = max(ours_seen, theirs_seen)
+    gained = ours.get('score', float(ours['count'])) - (current_score(base, ours_seen) if base else 0.0)
+    return {
+        'count': theirs['count'] + ours['count'] - base.get('count', 0),
+        'first_seen': min(theirs['first_seen'], ours['first_seen']),
+        'last_seen': last_seen.isoformat(),
+        'scam_types': theirs['scam_types'] + [t for t in ours['scam_types'] if t not in theirs['scam_types']],
+        'score': current_score(theirs, last_seen) + max(0.0, gained) * _decay(_age_days(last_seen, ours_seen))
+    }
+
+
+def risk_boost(score: float, max_boost: int) -> int:
+    """Risk score boost for a live DB hit, saturating towards max_boost"""
+    return round(max_boost * (1 - math.exp(-max(0.0, score) / BOOST_SCALE)))
@@ -0,0 +1,93 @@
+"""
+Satark.ai - Single-Flight Call Coalescing
+Concurrent calls with the same key share one in-flight execution
+instead of each doing the same expensive work.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    """One in-flight execution and the callers waiting on it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one execution.
+    on_complete(key, waiters) is called once per execution, after it has left
+    the in-flight map, so waiters is final (no later caller can still join).
+    """
+
+    def __init__(self, on_complete: Optional[Callable[[Hashable, int], None]] = None):
+        self._lock = threading.Lock()
+        self._on_complete = on_complete
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        Run fn(*args, **kwargs) unless a call with this key is already in flight,
+        in which case wait for it and share its result.
+
+        Returns:
+            (result, shared) - shared is True when the result came from another caller
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+                waiters = call.waiters
+            call.done.set()
+            if self._on_complete is not None:
+                self._on_complete(key, waiters)
+
+        return call.result, False
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Whether a call with this key is currently running"""
+        with self._lock:
+            return key in self._calls
+
+    def waiters(self, key: Hashable) -> int:
+        """Callers currently waiting on the in-flight call for this key"""
+        with self._lock:
+            call = self._calls.get(key)
+            return call.waiters if call else 0
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._calls)
+            }
@@ -0,0 +1,632 @@
+"""
+Satark.ai - Shared Intelligence Snapshot
+The binary, versioned store of the live scam database. Every worker
+process on the machine memory-maps it instead of loading its own copy.
+- Index header: section name, codec, offset and length of every section
+- Sections are decoded lazily, so stats and lookups work before the body is read
+- Sorted key tables, looked up by binary search straight from the mapping
+- Optional zlib sections (smaller files, decoded per process on first use)
+- Writers publish a new file atomically (write temp file, fsync, rename)
+- Readers pick up a new version with a cheap stat check, no locking
+- An inter-process writer lock elects the one process that refreshes
+- A blocking publish lock serialises sync-merge-publish across processes
+  (refresher, manual reports, bulk imports), so no publish is lost
+"""
+
+import heapq
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows - no flock, every process stays a writer
+    fcntl = None
+
+
+MAGIC = b'SATKSNAP'
+FORMAT_VERSION = 3
+
+# magic, format version, snapshot version, published at (epoch), section count
+HEADER = struct.Struct('<8sIQdI')
+# name, codec, offset, stored length, decoded length
+SECTION = struct.Struct('<16sBQQQ')
+# Format 1 had no codec: name, offset, length
+SECTION_V1 = struct.Struct('<16sQQ')
+# count, first_seen, last_seen (epoch), scam type start, scam type count, reputation score as of last_seen
+RECORD = struct.Struct('<IddIHd')
+# Formats 1-2 had no score
+RECORD_V2 = struct.Struct('<IddIH')
+KEY_SPAN = struct.Struct('<II')
+
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+CODECS = {'none': CODEC_RAW, 'zlib': CODEC_ZLIB}
+
+# scam_data table -> section name prefix
+TABLES = {
+    'reported_numbers': 'phones',
+    'reported_upis': 'upis',
+}
+
+# Writer-only scam_data state, kept out of 'meta' so readers never decode it
+STATE_FIELD = 'ingest_state'
+
+
+def _epoch(value: Optional[str]) -> float:
+    if not value:
+        return 0.0
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return 0.0
+
+
+def _iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch).isoformat() if epoch else ''
+
+
+def _padding(length: int) -> bytes:
+    """Zero bytes keeping the next section 8-byte aligned"""
+    return b'\0' * (-length % 8)
+
+
+def _sorted_items(table) -> Iterable[Tuple[str, Dict]]:
+    """(key, entry) pairs in key order from a dict, a LazyTable or an already sorted iterable"""
+    if isinstance(table, dict):
+        return ((key, table[key]) for key in sorted(table))
+    if isinstance(table, LazyTable):
+        return table.sorted_items(raw=True)
+    return table
+
+
+def _build_table(items: Iterable[Tuple[str, Dict]], type_ids: Dict[str, int]) -> Tuple[int, bytes, bytes, bytes, bytes]:
+    """Entry count, key offsets, key bytes, fixed-size records and scam type ids for one table"""
+    offsets = array('I', [0])
+    keys = bytearray()
+    records = bytearray()
+    types = array('H')
+
+    # str order is code point order, which is also UTF-8 byte order
+    for key, entry in items:
+        keys += key.encode('utf-8')
+        offsets.append(len(keys))
+
+        if isinstance(entry, tuple):
+            # Untouched entry copied from the previous snapshot, never decoded
+            count, first_seen, last_seen, scam_types, score = entry
+        else:
+            count = entry.get('count', 0)
+            first_seen = _epoch(entry.get('first_seen'))
+            last_seen = _epoch(entry.get('last_seen')) or first_seen
+            scam_types = entry.get('scam_types', [])
+            score = entry.get('score', float(count))
+
+        ids = [type_ids.setdefault(t, len(type_ids)) for t in scam_types]
+        records += RECORD.pack(count, first_seen, last_seen, len(types), len(ids), score)
+        types.extend(ids)
+
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+        types.byteswap()
+    return len(offsets) - 1, offsets.tobytes(), bytes(keys), bytes(records), types.tobytes()
+
+
+def publish_snapshot(scam_data: Dict, path: str, compression: str = None) -> int:
+    """
+    Write scam_data as a new snapshot and atomically replace the current one.
+    Readers that still map the previous file keep a valid view of it.
+
+    Args:
+        scam_data: Database dict; tables may be dicts, LazyTables or sorted (key, entry) iterables
+        path: Snapshot file
+        compression: 'none' (default, sections are shared via mmap) or 'zlib'
+
+    Returns:
+        The new snapshot version
+    """
+    compression = compression or os.getenv("SNAPSHOT_COMPRESSION", "none")
+    codec = CODECS[compression]
+    version = time.time_ns()
+    type_ids: Dict[str, int] = {}
+    counts = {}
+    sections = []
+
+    for table, prefix in TABLES.items():
+        counts[table], offsets, keys, records, types = _build_table(_sorted_items(scam_data.get(table, {})), type_ids)
+        sections += [
+            (f'{prefix}.offsets', offsets),
+            (f'{prefix}.keys', keys),
+            (f'{prefix}.records', records),
+            (f'{prefix}.types', types),
+        ]
+
+    meta = {k: v for k, v in scam_data.items() if k not in TABLES and k != STATE_FIELD}
+    meta['scam_types'] = sorted(type_ids, key=type_ids.get)
+    meta['counts'] = counts
+    sections.insert(0, ('meta', json.dumps(meta, ensure_ascii=False).encode('utf-8')))
+    sections.insert(1, ('state', json.dumps(scam_data.get(STATE_FIELD, {})).encode('utf-8')))
+
+    if codec == CODEC_ZLIB:
+        sections = [(name, zlib.compress(data), len(data)) for name, data in sections]
+    else:
+        sections = [(name, data, len(data)) for name, data in sections]
+
+    # Index header first, then the 8-byte aligned section bodies
+    offset = HEADER.size + SECTION.size * len(sections)
+    offset += -offset % 8
+    index = []
+    for name, data, raw_length in sections:
+        index.append(SECTION.pack(name.encode('ascii'), codec, offset, len(data), raw_length))
+        offset += len(data) + len(_padding(len(data)))
+
+    head = HEADER.pack(MAGIC, FORMAT_VERSION, version, time.time(), len(sections)) + b''.join(index)
+
+    # Same directory as the target so the rename is atomic
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(head + _padding(len(head)))
+        for name, data, raw_length in sections:
+            f.write(data)
+            f.write(_padding(len(data)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return version
+
+
+class Snapshot:
+    """Read-only view over one mapped snapshot file"""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            # The mapping outlives the descriptor, and survives the file being replaced
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.identity = self._identity(os.fstat(f.fileno()))
+
+        magic, self.format_version, self.version, self.published_at, count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or not 1 <= self.format_version <= FORMAT_VERSION:
+            raise ValueError(f"Not a scam snapshot (or a newer format): {path}")
+
+        # Only the index is read here; section bodies are decoded on first use
+        self._sections = {}
+        for i in range(count):
+            if self.format_version == 1:
+                name, offset, length = SECTION_V1.unpack_from(self._mm, HEADER.size + i * SECTION_V1.size)
+                codec, raw_length = CODEC_RAW, length
+            else:
+                name, codec, offset, length, raw_length = SECTION.unpack_from(self._mm, HEADER.size + i * SECTION.size)
+            self._sections[name.rstrip(b'\0').decode('ascii')] = (codec, offset, length)
+        self._buffers = {}
+        self._record_struct = RECORD if self.format_version >= 3 else RECORD_V2
+
+        self.meta = json.loads(self._read('meta'))
+        self._scam_types = self.meta.get('scam_types', [])
+
+    @staticmethod
+    def _identity(st: os.stat_result) -> Tuple:
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _buffer(self, name: str) -> Tuple[object, int]:
+        """(buffer, base offset) of a section - the mapping itself unless it is compressed"""
+        cached = self._buffers.get(name)
+        if cached is None:
+            codec, offset, length = self._sections[name]
+            if codec == CODEC_ZLIB:
+                cached = (zlib.decompress(self._mm[offset:offset + length]), 0)
+            else:
+                cached = (self._mm, offset)
+            self._buffers[name] = cached
+        return cached
+
+    def _read(self, name: str) -> bytes:
+        """Whole decoded section"""
+        if name not in self._sections:
+            return b''
+        buf, base = self._buffer(name)
+        codec, offset, length = self._sections[name]
+        return buf if codec == CODEC_ZLIB else buf[base:base + length]
+
+    @property
+    def touched_sections(self) -> list:
+        """Sections read so far (the rest of the file was never paged in)"""
+        return sorted(self._buffers)
+
+    def count(self, table: str) -> int:
+        return self.meta['counts'].get(table, 0)
+
+    def state(self) -> Dict:
+        """Writer-only ingest state"""
+        data = self._read('state')
+        return json.loads(data) if data else {}
+
+    def lookup(self, table: str, key: str) -> Optional[Dict]:
+        """Entry for key (same shape as scam_data[table][key]) or None"""
+        prefix = TABLES[table]
+        offsets, offsets_base = self._buffer(f'{prefix}.offsets')
+        keys, keys_base = self._buffer(f'{prefix}.keys')
+        target = key.encode('utf-8')
+
+        # Binary search over the sorted keys, reading straight from the mapping
+        lo, hi = 0, self.count(table)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start, end = KEY_SPAN.unpack_from(offsets, offsets_base + mid * 4)
+            probe = keys[keys_base + start:keys_base + end]
+            if probe < target:
+                lo = mid + 1
+            elif probe > target:
+                hi = mid
+            else:
+                return self._record(prefix, mid)
+        return None
+
+    def _record(self, prefix: str, index: int) -> Dict:
+        records, records_base = self._buffer(f'{prefix}.records')
+        record = self._record_struct
+        count, first_seen, last_seen, type_start, type_count, *score = record.unpack_from(
+            records, records_base + index * record.size
+        )
+        types, types_base = self._buffer(f'{prefix}.types')
+        type_ids = struct.unpack_from(f'<{type_count}H', types, types_base + type_start * 2)
+        return {
+            'count': count,
+            'first_seen': _iso(first_seen),
+            'last_seen': _iso(last_seen),
+            'scam_types': [self._scam_types[i] for i in type_ids],
+            # Snapshots without scores count every report at full weight
+            'score': score[0] if score else float(count)
+        }
+
+    def iter_last_seen(self, table: str) -> Iterator[Tuple[float, int]]:
+        """(last_seen epoch, index) of every entry, read from the records alone - no keys or scam types decoded"""
+        n = self.count(table)
+        if not n:
+            return iter(())
+        records, records_base = self._buffer(f'{TABLES[table]}.records')
+        record = self._record_struct
+        view = memoryview(records)[records_base:records_base + n * record.size]
+        return ((fields[2], i) for i, fields in enumerate(record.iter_unpack(view)))
+
+    def key_at(self, table: str, index: int) -> str:
+        """Key of the entry at index (in key order)"""
+        prefix = TABLES[table]
+        offsets, offsets_base = self._buffer(f'{prefix}.offsets')
+        keys, keys_base = self._buffer(f'{prefix}.keys')
+        start, end = KEY_SPAN.unpack_from(offsets, offsets_base + index * 4)
+        return keys[keys_base + start:keys_base + end].decode('utf-8')
+
+    def iter_table(self, table: str, raw: bool = False) -> Iterator[Tuple[str, object]]:
+        """
+        Every (key, entry) of a table in key order, decoded one at a time.
+        With raw=True entries are (count, first_seen, last_seen, scam_types, score)
+        tuples with epoch timestamps, which publish_snapshot copies as-is.
+        """
+        prefix = TABLES[table]
+        n = self.count(table)
+        if not n:
+            return
+        offsets = array('I', self._read(f'{prefix}.offsets'))
+        types = array('H', self._read(f'{prefix}.types'))
+        if sys.byteorder != 'little':
+            offsets.byteswap()
+            types.byteswap()
+        keys, keys_base = self._buffer(f'{prefix}.keys')
+        records, records_base = self._buffer(f'{prefix}.records')
+        scam_types = self._scam_types
+
+        record = self._record_struct
+        view = memoryview(records)[records_base:records_base + n * record.size]
+        for i, (count, first_seen, last_seen, type_start, type_count, *score) in enumerate(record.iter_unpack(view)):
+            key = keys[keys_base + offsets[i]:keys_base + offsets[i + 1]].decode('utf-8')
+            names = tuple(scam_types[t] for t in types[type_start:type_start + type_count])
+            score = score[0] if score else float(count)
+            if raw:
+                yield key, (count, first_seen, last_seen, names, score)
+            else:
+                yield key, {
+                    'count': count,
+                    'first_seen': _iso(first_seen),
+                    'last_seen': _iso(last_seen),
+                    'scam_types': list(names),
+                    'score': score
+                }
+
+    def to_scam_data(self) -> Dict:
+        """Writable database dict: meta fields, ingest state and lazy tables over this snapshot"""
+        data = {k: v for k, v in self.meta.items() if k not in ('counts', 'scam_types')}
+        state = self.state()
+        if state:
+            data[STATE_FIELD] = state
+        for table in TABLES:
+            data[table] = LazyTable(self, table)
+        return data
+
+
+class LazyTable(MutableMapping):
+    """
+    Writable dict-like view of one snapshot table.
+    Entries are decoded from the mapping only when read; written, new and
+    deleted entries live in an overlay until the next publish.
+    """
+
+    def __init__(self, snapshot: Optional[Snapshot], table: str):
+        self._base = snapshot
+        self._table = table
+        self._overlay: Dict[str, Dict] = {}
+        self._new = set()      # Overlay keys the base doesn't have
+        self._deleted = set()  # Base keys removed since the base was published
+        self._absent = set()   # Keys already looked up and not in the base
+
+    @property
+    def base(self) -> Optional[Snapshot]:
+        return self._base
+
+    def _base_entry(self, key: str) -> Optional[Dict]:
+        if self._base is None or key in self._absent:
+            return None
+        entry = self._base.lookup(self._table, key)
+        if entry is None:
+            self._absent.add(key)  # A new key is checked, then inserted - search once
+        return entry
+
+    def _in_base(self, key: str) -> bool:
+        return self._base_entry(key) is not None
+
+    def is_pending(self, key: str) -> bool:
+        """True if the key was touched, added or deleted since the base was published"""
+        return key in self._overlay or key in self._deleted
+
+    def __getitem__(self, key: str) -> Dict:
+        entry = self._overlay.get(key)
+        if entry is not None:
+            return entry
+        if key in self._deleted:
+            raise KeyError(key)
+        entry = self._base_entry(key)
+        if entry is None:
+            raise KeyError(key)
+        # A fresh copy - only entries written back join the overlay
+        return entry
+
+    def __contains__(self, key) -> bool:
+        if key in self._overlay:
+            return True
+        return key not in self._deleted and self._in_base(key)
+
+    def __setitem__(self, key: str, entry: Dict):
+        if key not in self._overlay:
+            if key in self._deleted:
+                self._deleted.discard(key)
+            elif not self._in_base(key):
+                self._new.add(key)
+        self._overlay[key] = entry
+
+    def __delitem__(self, key: str):
+        if key in self._new:
+            self._new.discard(key)
+            del self._overlay[key]
+        elif key in self._deleted or not (key in self._overlay or self._in_base(key)):
+            raise KeyError(key)
+        else:
+            self._overlay.pop(key, None)
+            self._deleted.add(key)
+
+    def __len__(self) -> int:
+        base = self._base.count(self._table) if self._base is not None else 0
+        return base + len(self._new) - len(self._deleted)
+
+    def sorted_items(self, raw: bool = False) -> Iterator[Tuple[str, object]]:
+        """Base entries merged with the overlay, in key order (untouched ones as raw tuples if raw)"""
+        base = self._base.iter_table(self._table, raw=raw) if self._base is not None else iter(())
+        base = (
+            (key, self._overlay.get(key, entry))
+            for key, entry in base if key not in self._deleted
+        )
+        new = ((key, self._overlay[key]) for key in sorted(self._new))
+        return heapq.merge(base, new, key=lambda item: item[0])
+
+    def __iter__(self) -> Iterator[str]:
+        return (key for key, _ in self.sorted_items())
+
+    def items(self):
+        # Streams entries without pulling them all into the overlay
+        return self.sorted_items()
+
+    def to_dict(self) -> Dict[str, Dict]:
+        return dict(self.sorted_items())
+
+    def rebased(self, snapshot: Snapshot, merge: Callable[[Optional[Dict], Dict, Dict], Dict] = None) -> 'LazyTable':
+        """
+        The same pending changes on top of a newer snapshot. For a key both
+        sides changed, merge(base entry, ours, theirs) gives the result
+        (without merge, ours is kept).
+        """
+        table = LazyTable(snapshot, self._table)
+        for key, entry in self._overlay.items():
+            if merge is not None:
+                theirs = snapshot.lookup(self._table, key)
+                base = None if key in self._new else self._base_entry(key)
+                if theirs is not None and theirs != base:
+                    entry = merge(base, entry, theirs)
+            table[key] = entry
+        for key in self._deleted:
+            if key in table:
+                del table[key]
+        return table
+
+
+class SnapshotReader:
+    """
+    Follows the latest published snapshot.
+    At most every check_interval seconds a stat() tells whether the file was
+    replaced; if so the new one is mapped and swapped in with a plain
+    reference assignment, so readers never take a lock.
+    """
+
+    def __init__(self, path: str, check_interval: float = None):
+        self.path = path
+        self.check_interval = check_interval if check_interval is not None else float(os.getenv("SNAPSHOT_CHECK_INTERVAL", "1.0"))
+        self._snapshot: Optional[Snapshot] = None
+        self._next_check = 0.0
+        self.reloads = 0
+
+    def current(self) -> Optional[Snapshot]:
+        """Latest snapshot, or None if none was published yet"""
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            self.reload()
+        return self._snapshot
+
+    def reload(self) -> Optional[Snapshot]:
+        """Check for a newer snapshot right now"""
+        try:
+            identity = Snapshot._identity(os.stat(self.path))
+        except FileNotFoundError:
+            return self._snapshot
+
+        current = self._snapshot
+        if current is not None and current.identity == identity:
+            return current
+
+        try:
+            snapshot = Snapshot(self.path)
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Snapshot load failed: {e}")
+            return current
+
+        # Versions only move forward, even if an older writer renamed last
+        if current is None or snapshot.version > current.version:
+            self._snapshot = snapshot
+            self.reloads += 1
+        return self._snapshot
+
+
+@contextmanager
+def publish_lock(path: str):
+    """
+    Blocking inter-process lock on a snapshot. Hold it from syncing onto the
+    latest snapshot until the new one is published, so two writers never
+    publish from the same base and drop each other's changes.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.publish.lock", 'a+') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class WriterLock:
+    """Non-blocking inter-process lock: its holder is the one process that refreshes and publishes"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def acquire(self) -> bool:
+        """Take the lock if it is free; kept until the process exits"""
+        if self._file is not None or fcntl is None:
+            return True
+        f = open(self.path, 'a+')
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        return True
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None or fcntl is None
+
+
+if __name__ == "__main__":
+    # Benchmark: cold-start load of the binary snapshot vs the JSON cache
+    # Usage: python snapshot.py [entries ...]   (default: 10000 1000000)
+    import tempfile
+    import tracemalloc
+
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 1_000_000]
+    workdir = tempfile.mkdtemp()
+    now = datetime.now().isoformat()
+
+    def synthetic(n):
+        # Already in key order, so even 10M entries never sit in a dict
+        for i in range(n):
+            yield f"9{i:09d}", {'count': 1 + i % 7, 'first_seen': now, 'last_seen': now,
+                                'scam_types': ['Consumer Complaint', 'News Report'][:1 + i % 2]}
+
+    def base_data(n):
+        return {'last_updated': now, 'total_reports': n, 'live_reports': [], 'sources': {},
+                'reported_upis': {}, 'ingest_state': {'watermarks': {}, 'seen_hashes': []}}
+
+    for n in sizes:
+        print(f"\n📦 {n:,} reported numbers")
+        for compression in ('none', 'zlib'):
+            if compression == 'zlib' and n > 1_000_000:
+                continue
+            path = os.path.join(workdir, f"snap_{n}_{compression}.bin")
+            data = base_data(n)
+            data['reported_numbers'] = synthetic(n)
+            start = time.perf_counter()
+            publish_snapshot(data, path, compression=compression)
+            publish_s = time.perf_counter() - start
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            snap = Snapshot(path)
+            stats = snap.count('reported_numbers')
+            open_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            entry = snap.lookup('reported_numbers', f"9{n // 2:09d}")
+            lookup_ms = (time.perf_counter() - start) * 1000
+            peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            tracemalloc.stop()
+            assert stats == n and entry is not None
+
+            print(f"   binary/{compression:<4}: {os.path.getsize(path) / (1024 * 1024):7.1f} MB, published in {publish_s:6.2f}s | "
+                  f"open+stats {open_ms:7.2f} ms, first lookup {lookup_ms:7.2f} ms, peak heap {peak_mb:7.1f} MB "
+                  f"(touched: {', '.join(snap.touched_sections)})")
+
+            if n <= 1_000_000 and compression == 'none':
+                start = time.perf_counter()
+                table = dict(snap.iter_table('reported_numbers'))
+                print(f"   full decode to dict   : {time.perf_counter() - start:6.2f}s (only needed for a JSON export)")
+
+        if n > 1_000_000:
+            print("   JSON cache: skipped (would not fit in memory here)")
+            continue
+
+        # The old startup path: json.load of the whole cache
+        json_path = os.path.join(workdir, f"cache_{n}.json")
+        data = base_data(n)
+        data['reported_numbers'] = table
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        del data, table
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        with open(json_path, 'r', encoding='utf-8') as f:
+            stored = json.load(f)
+        stats = len(stored['reported_numbers'])
+        load_ms = (time.perf_counter() - start) * 1000
+        peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+        del stored
+        print(f"   JSON cache : {os.path.getsize(json_path) / (1024 * 1024):7.1f} MB | json.load+stats {load_ms:9.2f} ms, peak heap {peak_mb:7.1f} MB")
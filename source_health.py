@@ -0,0 +1,193 @@
+"""
+Satark.ai - Per-Source Refresh Health
+Records what every intelligence source did on every refresh and benches the
+ones that keep failing.
+- One run record per source per refresh: duration, HTTP status, bytes,
+  items parsed / ingested, outcome and exception classes
+- Rolling history per source (newest last)
+- Cool-off: after N consecutive failed runs a source is skipped, for a
+  period that doubles with every further failure (capped)
+- Quiet sources (a keyword filter that can legitimately match nothing) are
+  healthy when empty; for the others an empty run is a failure
+- Plain-dict state, persisted with the database so it survives restarts
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from urllib3 import exceptions as urllib3_exceptions
+
+
+HISTORY_SIZE = int(os.getenv("SOURCE_HISTORY_SIZE", "20"))
+FAILURE_THRESHOLD = int(os.getenv("SOURCE_FAILURE_THRESHOLD", "3"))
+COOLOFF_SECONDS = float(os.getenv("SOURCE_COOLOFF_SECONDS", "1800"))
+MAX_COOLOFF_SECONDS = float(os.getenv("SOURCE_MAX_COOLOFF_SECONDS", "21600"))
+
+# Outcomes that count towards a cool-off. 'empty' is one too (a dead mirror or
+# a changed page layout answers 200 but yields nothing), except for quiet sources.
+FAILED_OUTCOMES = ('error', 'timeout', 'empty')
+
+
+def error_name(error: Exception) -> str:
+    """
+    Class name recorded for a fetcher's exception. When urllib3 retries run
+    out on timeouts, requests raises ConnectionError around a MaxRetryError;
+    the timeout underneath is recorded instead, so the run counts as a timeout.
+    """
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    # NewConnectionError subclasses ConnectTimeoutError, but is a refused/failed connect
+    if (isinstance(reason, urllib3_exceptions.TimeoutError)
+            and not isinstance(reason, urllib3_exceptions.NewConnectionError)):
+        return type(reason).__name__
+    return type(error).__name__
+
+
+def classify(run: Dict) -> str:
+    """Outcome of one source run: ok, unchanged, empty, error or timeout"""
+    errors = run.get('errors') or []
+    if run.get('items_parsed'):
+        return 'ok'
+    if any('Timeout' in name for name in errors):
+        return 'timeout'
+    if errors or (run.get('status') or 0) >= 400:
+        return 'error'
+    # Every URL answered 304 - nothing new, but the source is healthy
+    if run.get('requests') and run.get('cache_hits') == run.get('requests'):
+        return 'unchanged'
+    return 'empty'
+
+
+class SourceHealth:
+    """Rolling per-source run history with failure cool-off"""
+
+    def __init__(self,
+                 history_size: int = HISTORY_SIZE,
+                 failure_threshold: int = FAILURE_THRESHOLD,
+                 cooloff_seconds: float = COOLOFF_SECONDS,
+                 max_cooloff_seconds: float = MAX_COOLOFF_SECONDS,
+                 quiet_sources: Iterable[str] = ()):
+        self.history_size = history_size
+        self.failure_threshold = failure_threshold
+        self.cooloff_seconds = cooloff_seconds
+        self.max_cooloff_seconds = max_cooloff_seconds
+        self.quiet_sources = frozenset(quiet_sources)
+        self._lock = threading.Lock()
+        self._sources = {}
+        self._errors = {}  # Exception classes noted during each source's current run
+
+    def failed(self, key: str, outcome: str) -> bool:
+        """Whether a run with this outcome counts towards the source's cool-off"""
+        if outcome == 'empty' and key in self.quiet_sources:
+            return False
+        return outcome in FAILED_OUTCOMES
+
+    def _source(self, key: str) -> Dict:
+        return self._sources.setdefault(key, {
+            'history': deque(maxlen=self.history_size),
+            'consecutive_failures': 0,
+            'cooloff_until': 0.0
+        })
+
+    def load(self, state: Dict):
+        """Restore from to_dict() output (e.g. the database snapshot meta)"""
+        with self._lock:
+            self._sources = {}
+            for key, saved in (state or {}).items():
+                source = self._source(key)
+                source['history'].extend(saved.get('history', []))
+                source['consecutive_failures'] = saved.get('consecutive_failures', 0)
+                source['cooloff_until'] = saved.get('cooloff_until', 0.0)
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                key: {
+                    'history': list(source['history']),
+                    'consecutive_failures': source['consecutive_failures'],
+                    'cooloff_until': source['cooloff_until']
+                }
+                for key, source in self._sources.items()
+            }
+
+    def cooloff_remaining(self, key: str, now: float = None) -> float:
+        """Seconds until a benched source is tried again (0 if it is not benched)"""
+        with self._lock:
+            until = self._sources.get(key, {}).get('cooloff_until', 0.0)
+        return max(0.0, until - (now or time.time()))
+
+    def begin(self, key: str):
+        """Start a run: clear the errors noted for this source"""
+        with self._lock:
+            self._errors[key] = []
+
+    def note_error(self, key: str, error: Exception):
+        """Record an exception a fetcher caught (and recovered from) during its run"""
+        with self._lock:
+            self._errors.setdefault(key, []).append(error_name(error))
+
+    def record(self, key: str, run: Dict, now: float = None) -> Dict:
+        """
+        Finish a run: classify it, append it to the history and update the cool-off.
+
+        Args:
+            run: duration_ms, status, requests, cache_hits, bytes, items_parsed,
+                 items_ingested (errors are taken from note_error)
+
+        Returns:
+            The stored run record
+        """
+        now = now or time.time()
+        with self._lock:
+            run = dict(run)
+            run['errors'] = list(run.get('errors', [])) + self._errors.pop(key, [])
+            run['error'] = run['errors'][-1] if run['errors'] else None
+            run.setdefault('outcome', classify(run))
+            run['at'] = datetime.fromtimestamp(now).isoformat()
+
+            source = self._source(key)
+            source['history'].append(run)
+            if self.failed(key, run['outcome']):
+                source['consecutive_failures'] += 1
+                excess = source['consecutive_failures'] - self.failure_threshold
+                if excess >= 0:
+                    cooloff = min(self.max_cooloff_seconds, self.cooloff_seconds * 2 ** excess)
+                    source['cooloff_until'] = now + cooloff
+                    run['cooloff_s'] = round(cooloff)
+            elif run['outcome'] != 'skipped':
+                source['consecutive_failures'] = 0
+                source['cooloff_until'] = 0.0
+            return run
+
+    def skip(self, key: str, now: float = None) -> Dict:
+        """Record a run that was skipped because the source is cooling off"""
+        return self.record(key, {'outcome': 'skipped', 'errors': [], 'duration_ms': 0.0,
+                                 'items_parsed': 0, 'items_ingested': 0}, now)
+
+    def summary(self, now: float = None) -> Dict[str, Dict]:
+        """Per-source health: last outcome, success rate, average duration, cool-off"""
+        now = now or time.time()
+        with self._lock:
+            result = {}
+            for key, source in self._sources.items():
+                runs = [r for r in source['history'] if r.get('outcome') != 'skipped']
+                last: Optional[Dict] = source['history'][-1] if source['history'] else None
+                failed = sum(1 for r in runs if self.failed(key, r['outcome']))
+                result[key] = {
+                    'last_outcome': last['outcome'] if last else None,
+                    'last_error': next((r['error'] for r in reversed(runs) if r.get('error')), None),
+                    'runs': len(runs),
+                    'success_rate': round(1 - failed / len(runs), 2) if runs else None,
+                    'avg_duration_ms': round(sum(r['duration_ms'] for r in runs) / len(runs), 2) if runs else 0.0,
+                    'items_ingested': sum(r.get('items_ingested', 0) for r in runs),
+                    'consecutive_failures': source['consecutive_failures'],
+                    'cooloff_remaining_s': round(max(0.0, source['cooloff_until'] - now))
+                }
+            return result
+
+    def history(self, key: str) -> List[Dict]:
+        with self._lock:
+            return list(self._sources.get(key, {}).get('history', []))
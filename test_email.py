@@ -4,13 +4,22 @@ Quick test script to verify email sending works
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+import os
 from datetime import datetime
 
+from dotenv import load_dotenv
+
+load_dotenv()
+
 def test_email():
-    sender_email = "kalen5471@gmail.com"
-    sender_password = "qbodchmvakgmvueh"
+    sender_email = os.getenv("GMAIL_SENDER")
+    sender_password = os.getenv("GMAIL_APP_PASSWORD")
     target_email = "mistyraju0@gmail.com"
     
+    if not sender_email or not sender_password:
+        print("❌ Set GMAIL_SENDER and GMAIL_APP_PASSWORD in .env first (see EMAIL_SETUP.md)")
+        return False
+    
     try:
         # Create message
         msg = MIMEMultipart()
@@ -0,0 +1,329 @@
+"""
+Satark.ai - UI Text
+Translated strings for the Streamlit app (Hinglish, English, Hindi, Marathi).
+Kept out of app.py so a rerun looks them up instead of rebuilding the
+tables - Python imports this module once per process.
+"""
+
+# Caption under the language selector
+LANG_WELCOME = {
+    "Hinglish": "🔥 Savage Gen-Z mode ON!",
+    "English": "🎯 Professional mode activated",
+    "Hindi": "🛡️ सुरक्षा मोड सक्रिय",
+    "Marathi": "🛡️ सुरक्षा मोड सक्रिय"
+}
+
+# Language-specific UI text (Complete translations)
+UI_TEXT = {
+    "Hinglish": {
+        # Header
+        "tagline": "Tera Apna Financial Bodyguard",
+        "subtitle": "Upload karo screenshot, hum batayenge real hai ya scam! 💪",
+        # Upload section
+        "upload_header": "📸 Screenshot Upload Karo",
+        "upload_flow": "📸 Upload → 🧠 AI Analysis → 🛡️ Safety Advice",
+        "upload_label": "WhatsApp/SMS ka screenshot yahan daalo",
+        "image_details": "📋 **Image Details**",
+        "file_label": "File:",
+        "size_label": "Size:",
+        "dimensions_label": "Dimensions:",
+        # Analysis
+        "analyze_btn": "🔍 Analyze Karo!",
+        "status_activated": "🤖 Satark Agent Activated...",
+        "status_received": "📷 Screenshot mila...",
+        "status_ocr": "🔍 Text extract ho raha hai...",
+        "status_analyzing": "🧠 Analysis ho raha hai",
+        "status_checking": "🔎 Scam database check ho raha hai...",
+        # Results
+        "agent_decision": "🤖 Agent Ka Faisla",
+        "citizen_tab": "🛡️ Citizen View",
+        "dev_tab": "🛠️ Developer View",
+        "risk_meter": "📊 Dhoka Meter",
+        "what_to_do": "💡 Ab Kya Karna Hai?",
+        # Verdicts
+        "safe_title": "✅ SAFE",
+        "safe_subtitle": "Yeh legit lagta hai, chill maar!",
+        "suspicious_title": "⚠️ SUSPICIOUS",
+        "suspicious_subtitle": "Thoda shak hai... Proceed with caution.",
+        "scam_title": "🚨 SCAM DETECTED! 🚨",
+        "scam_subtitle": "Yeh 100% fraud hai! Engage mat karo!",
+        "desi_note_safe": "💬 **Desi Note:** _Yeh legit lagta hai, tension mat le bhai!_",
+        "desi_note_suspicious": "💬 **Desi Note:** _Thoda shak hai... Sambhal ke re bhai!_",
+        "desi_note_scam": "💬 **Desi Big Brother Says:** _BHAAG JA YAHAN SE! Yeh 100% fraud hai!_",
+        "danger_warning": "⛔ DANGER: OTP, PIN ya bank details share mat karo!",
+        # Actions
+        "recommended_actions": "⚡ Recommended Actions",
+        "legal_action": "📝 Legal Action - Complaint Draft Karo",
+        "download_complaint": "👮 Cyber Complaint PDF Download Karo",
+        "red_flags_title": "🚩 Red Flags Detected",
+        "why_label": "❓ **Kyun?**",
+        "detected_type": "🏷️ Detected Type:",
+        "immediate_action": "🚫 **Turant Action Lo:**",
+        "caution": "⚠️ **Savdhaan:**",
+        "all_clear": "✅ **Sab Theek:**",
+        # Recommended steps
+        "steps_scam": """**Recommended Steps:**
+1. 🚫 Is number/sender ko turant block karo
+2. 🗑️ Message/app delete karo
+3. 📞 Cyber Cell: **1930** (National Helpline)
+4. ⚠️ Family aur friends ko batao""",
+        "steps_suspicious": """**Recommended Steps:**
+1. 🔍 Official channels se sender verify karo
+2. 🚫 OTP ya personal details share mat karo
+3. 📱 Official app/website check karo""",
+        "lang_footer": "🌐 Hindi / Marathi support active!"
+    },
+    "English": {
+        # Header
+        "tagline": "Your Financial Bodyguard",
+        "subtitle": "Upload a screenshot, we'll tell you if it's real or scam! 💪",
+        # Upload section
+        "upload_header": "📸 Upload Screenshot",
+        "upload_flow": "📸 Upload → 🧠 AI Analysis → 🛡️ Safety Advice",
+        "upload_label": "Upload WhatsApp/SMS screenshot here",
+        "image_details": "📋 **Image Details**",
+        "file_label": "File:",
+        "size_label": "Size:",
+        "dimensions_label": "Dimensions:",
+        # Analysis
+        "analyze_btn": "🔍 Analyze Now!",
+        "status_activated": "🤖 Satark Agent Activated...",
+        "status_received": "📷 Screenshot received...",
+        "status_ocr": "🔍 Extracting text using OCR...",
+        "status_analyzing": "🧠 Analyzing",
+        "status_checking": "🔎 Checking against scam database...",
+        # Results
+        "agent_decision": "🤖 Agent Decision",
+        "citizen_tab": "🛡️ Citizen View",
+        "dev_tab": "🛠️ Developer View",
+        "risk_meter": "📊 Risk Meter",
+        "what_to_do": "💡 What Should You Do?",
+        # Verdicts
+        "safe_title": "✅ SAFE",
+        "safe_subtitle": "This content appears to be legitimate.",
+        "suspicious_title": "⚠️ SUSPICIOUS",
+        "suspicious_subtitle": "This content has some red flags. Proceed with caution.",
+        "scam_title": "🚨 SCAM DETECTED! 🚨",
+        "scam_subtitle": "This is a confirmed fraudulent message. Do NOT engage!",
+        "desi_note_safe": "💬 **Note:** _This appears to be legitimate content._",
+        "desi_note_suspicious": "💬 **Note:** _Some suspicious elements detected. Be careful._",
+        "desi_note_scam": "💬 **Warning:** _This is confirmed fraud! Block immediately!_",
+        "danger_warning": "⛔ DANGER: Do NOT share any OTP, PIN, or bank details!",
+        # Actions
+        "recommended_actions": "⚡ Recommended Actions",
+        "legal_action": "📝 Legal Action - Draft Official Complaint",
+        "download_complaint": "👮 Download Cyber Complaint PDF",
+        "red_flags_title": "🚩 Red Flags Detected",
+        "why_label": "❓ **Why?**",
+        "detected_type": "🏷️ Detected Type:",
+        "immediate_action": "🚫 **Immediate Action Required:**",
+        "caution": "⚠️ **Caution:**",
+        "all_clear": "✅ **All Clear:**",
+        # Recommended steps
+        "steps_scam": """**Recommended Steps:**
+1. 🚫 Block this number/sender immediately
+2. 🗑️ Delete the message/app
+3. 📞 Report to Cyber Cell: **1930** (National Helpline)
+4. ⚠️ Warn your family and friends""",
+        "steps_suspicious": """**Recommended Steps:**
+1. 🔍 Verify the sender through official channels
+2. 🚫 Do NOT share OTP or personal details
+3. 📱 Check official app/website directly""",
+        "lang_footer": "🌐 Multilingual support available!"
+    },
+    "Hindi": {
+        # Header
+        "tagline": "आपका वित्तीय बॉडीगार्ड",
+        "subtitle": "स्क्रीनशॉट अपलोड करें, हम बताएंगे असली है या धोखा! 💪",
+        # Upload section
+        "upload_header": "📸 स्क्रीनशॉट अपलोड करें",
+        "upload_flow": "📸 अपलोड → 🧠 AI विश्लेषण → 🛡️ सुरक्षा सलाह",
+        "upload_label": "WhatsApp/SMS का स्क्रीनशॉट यहाँ डालें",
+        "image_details": "📋 **छवि विवरण**",
+        "file_label": "फाइल:",
+        "size_label": "आकार:",
+        "dimensions_label": "आयाम:",
+        # Analysis
+        "analyze_btn": "🔍 जांच करो!",
+        "status_activated": "🤖 सतर्क एजेंट सक्रिय...",
+        "status_received": "📷 स्क्रीनशॉट प्राप्त...",
+        "status_ocr": "🔍 टेक्स्ट निकाला जा रहा है...",
+        "status_analyzing": "🧠 विश्लेषण हो रहा है",
+        "status_checking": "🔎 स्कैम डेटाबेस चेक हो रहा है...",
+        # Results
+        "agent_decision": "🤖 एजेंट का फैसला",
+        "citizen_tab": "🛡️ नागरिक दृश्य",
+        "dev_tab": "🛠️ डेवलपर दृश्य",
+        "risk_meter": "📊 धोखा मीटर",
+        "what_to_do": "💡 अब क्या करना है?",
+        # Verdicts
+        "safe_title": "✅ सुरक्षित",
+        "safe_subtitle": "यह सामग्री वैध प्रतीत होती है।",
+        "suspicious_title": "⚠️ संदिग्ध",
+        "suspicious_subtitle": "इसमें कुछ खतरे के संकेत हैं। सावधानी से आगे बढ़ें।",
+        "scam_title": "🚨 धोखाधड़ी पकड़ी गई! 🚨",
+        "scam_subtitle": "यह एक पुष्ट फ्रॉड संदेश है। संपर्क न करें!",
+        "desi_note_safe": "💬 **नोट:** _यह सुरक्षित लगता है, चिंता मत करो भाई!_",
+        "desi_note_suspicious": "💬 **नोट:** _थोड़ा संदेह है... सावधान रहो भाई!_",
+        "desi_note_scam": "💬 **चेतावनी:** _यहाँ से भागो! यह 100% फ्रॉड है!_",
+        "danger_warning": "⛔ खतरा: OTP, PIN या बैंक डिटेल्स शेयर मत करो!",
+        # Actions
+        "recommended_actions": "⚡ सुझाए गए कदम",
+        "legal_action": "📝 कानूनी कार्रवाई - शिकायत दर्ज करें",
+        "download_complaint": "👮 साइबर शिकायत PDF डाउनलोड करें",
+        "red_flags_title": "🚩 खतरे के संकेत",
+        "why_label": "❓ **क्यों?**",
+        "detected_type": "🏷️ पता चला प्रकार:",
+        "immediate_action": "🚫 **तुरंत कार्रवाई करें:**",
+        "caution": "⚠️ **सावधान:**",
+        "all_clear": "✅ **सब ठीक:**",
+        # Recommended steps
+        "steps_scam": """**सुझाए गए कदम:**
+1. 🚫 इस नंबर/भेजने वाले को तुरंत ब्लॉक करें
+2. 🗑️ संदेश/ऐप हटाएं
+3. 📞 साइबर सेल: **1930** (राष्ट्रीय हेल्पलाइन)
+4. ⚠️ परिवार और दोस्तों को सचेत करें""",
+        "steps_suspicious": """**सुझाए गए कदम:**
+1. 🔍 आधिकारिक चैनलों से भेजने वाले की पुष्टि करें
+2. 🚫 OTP या व्यक्तिगत विवरण साझा न करें
+3. 📱 आधिकारिक ऐप/वेबसाइट सीधे देखें""",
+        "lang_footer": "🌐 हिंदी में सुरक्षा सलाह सक्रिय!"
+    },
+    "Marathi": {
+        # Header
+        "tagline": "तुमचा आर्थिक बॉडीगार्ड",
+        "subtitle": "स्क्रीनशॉट अपलोड करा, आम्ही सांगू खरं की फसवणूक! 💪",
+        # Upload section
+        "upload_header": "📸 स्क्रीनशॉट अपलोड करा",
+        "upload_flow": "📸 अपलोड → 🧠 AI विश्लेषण → 🛡️ सुरक्षा सल्ला",
+        "upload_label": "WhatsApp/SMS चा स्क्रीनशॉट इथे टाका",
+        "image_details": "📋 **प्रतिमा तपशील**",
+        "file_label": "फाइल:",
+        "size_label": "आकार:",
+        "dimensions_label": "परिमाण:",
+        # Analysis
+        "analyze_btn": "🔍 तपासा!",
+        "status_activated": "🤖 सतर्क एजंट सक्रिय...",
+        "status_received": "📷 स्क्रीनशॉट मिळाला...",
+        "status_ocr": "🔍 मजकूर काढला जात आहे...",
+        "status_analyzing": "🧠 विश्लेषण होत आहे",
+        "status_checking": "🔎 स्कॅम डेटाबेस तपासत आहे...",
+        # Results
+        "agent_decision": "🤖 एजंटचा निर्णय",
+        "citizen_tab": "🛡️ नागरिक दृश्य",
+        "dev_tab": "🛠️ डेव्हलपर दृश्य",
+        "risk_meter": "📊 धोका मीटर",
+        "what_to_do": "💡 आता काय करायचं?",
+        # Verdicts
+        "safe_title": "✅ सुरक्षित",
+        "safe_subtitle": "हे सामग्री वैध दिसते.",
+        "suspicious_title": "⚠️ संशयास्पद",
+        "suspicious_subtitle": "यात काही धोक्याचे संकेत आहेत. सावधगिरीने पुढे जा.",
+        "scam_title": "🚨 फसवणूक पकडली! 🚨",
+        "scam_subtitle": "हा एक पुष्टी झालेला फ्रॉड संदेश आहे. संपर्क करू नका!",
+        "desi_note_safe": "💬 **टीप:** _हे सुरक्षित दिसतंय, टेन्शन नको घेऊस!_",
+        "desi_note_suspicious": "💬 **टीप:** _थोडा संशय आहे... सावध राहा भाऊ!_",
+        "desi_note_scam": "💬 **चेतावणी:** _इथून पळ! हे 100% फ्रॉड आहे!_",
+        "danger_warning": "⛔ धोका: OTP, PIN किंवा बँक डिटेल्स शेअर करू नका!",
+        # Actions
+        "recommended_actions": "⚡ शिफारस केलेल्या कृती",
+        "legal_action": "📝 कायदेशीर कारवाई - तक्रार दाखल करा",
+        "download_complaint": "👮 सायबर तक्रार PDF डाउनलोड करा",
+        "red_flags_title": "🚩 धोक्याचे संकेत",
+        "why_label": "❓ **का?**",
+        "detected_type": "🏷️ आढळलेला प्रकार:",
+        "immediate_action": "🚫 **लगेच कारवाई करा:**",
+        "caution": "⚠️ **सावध:**",
+        "all_clear": "✅ **सर्व ठीक:**",
+        # Recommended steps
+        "steps_scam": """**शिफारस केलेले पाऊल:**
+1. 🚫 हा नंबर/पाठवणारा लगेच ब्लॉक करा
+2. 🗑️ संदेश/ॲप हटवा
+3. 📞 सायबर सेल: **1930** (राष्ट्रीय हेल्पलाइन)
+4. ⚠️ कुटुंब आणि मित्रांना सावध करा""",
+        "steps_suspicious": """**शिफारस केलेले पाऊल:**
+1. 🔍 अधिकृत मार्गांनी पाठवणाऱ्याची पडताळणी करा
+2. 🚫 OTP किंवा वैयक्तिक माहिती शेअर करू नका
+3. 📱 थेट अधिकृत ॲप/वेबसाइट तपासा""",
+        "lang_footer": "🌐 मराठीत सुरक्षा सल्ला सक्रिय!",
+        # Empty state & Use cases
+        "empty_state": "👆 विश्लेषण सुरू करण्यासाठी स्क्रीनशॉट अपलोड करा!",
+        "use_cases_header": "🎯 हे ॲप कधी वापरायचे?",
+        "use_case_1_title": "**कर्ज ॲप संदेश**",
+        "use_case_1_desc": "जेव्हा कोणी रँडम मेसेजने कर्ज ऑफर करतो",
+        "use_case_2_title": "**लॉटरी स्कॅम**",
+        "use_case_2_desc": "'तुम्ही 50 लाख जिंकलात!' असे संदेश",
+        "use_case_3_title": "**डिजिटल अरेस्ट**",
+        "use_case_3_desc": "खोटे पोलीस/CBI धमकी कॉल्स",
+        "footer_quote": "\"आपल्या मेहनतीचे पैसे आहेत, असे उधळू नका.\" - Satark.ai",
+        "footer_disclaimer": "⚠️ सूचना: हे साधन फक्त जागरूकतेसाठी आहे. कायदेशीर सल्ल्यासाठी योग्य अधिकाऱ्यांशी संपर्क साधा."
+    }
+}
+
+# Add empty state translations to all languages
+UI_TEXT["Hinglish"].update({
+    "empty_state": "👆 Screenshot upload karo analysis shuru karne ke liye!",
+    "use_cases_header": "🎯 Yeh App Kab Use Karna Hai?",
+    "use_case_1_title": "**Loan App Messages**",
+    "use_case_1_desc": "Jab koi loan offer kare random message se",
+    "use_case_2_title": "**Lottery Scams**",
+    "use_case_2_desc": "'Aapne 50 lakh jeete!' wale messages",
+    "use_case_3_title": "**Digital Arrest**",
+    "use_case_3_desc": "Fake police/CBI threat calls",
+    "footer_quote": "\"Apni mehnat ka paisa hai, aise mat udaao.\" - Satark.ai",
+    "footer_disclaimer": "⚠️ Disclaimer: Yeh tool sirf awareness ke liye hai. Legal advice ke liye proper authorities se contact karo."
+})
+
+UI_TEXT["English"].update({
+    "empty_state": "👆 Upload a screenshot to start analysis!",
+    "use_cases_header": "🎯 When to Use This App?",
+    "use_case_1_title": "**Loan App Messages**",
+    "use_case_1_desc": "When someone offers loans via random messages",
+    "use_case_2_title": "**Lottery Scams**",
+    "use_case_2_desc": "'You won 50 lakhs!' type messages",
+    "use_case_3_title": "**Digital Arrest**",
+    "use_case_3_desc": "Fake police/CBI threat calls",
+    "footer_quote": "\"It's your hard-earned money, don't waste it.\" - Satark.ai",
+    "footer_disclaimer": "⚠️ Disclaimer: This tool is for awareness only. Contact proper authorities for legal advice."
+})
+
+UI_TEXT["Hindi"].update({
+    "empty_state": "👆 विश्लेषण शुरू करने के लिए स्क्रीनशॉट अपलोड करें!",
+    "use_cases_header": "🎯 यह ऐप कब इस्तेमाल करना है?",
+    "use_case_1_title": "**लोन ऐप मैसेज**",
+    "use_case_1_desc": "जब कोई रैंडम मैसेज से लोन ऑफर करे",
+    "use_case_2_title": "**लॉटरी स्कैम**",
+    "use_case_2_desc": "'आपने 50 लाख जीते!' वाले मैसेज",
+    "use_case_3_title": "**डिजिटल अरेस्ट**",
+    "use_case_3_desc": "नकली पुलिस/CBI धमकी कॉल्स",
+    "footer_quote": "\"अपनी मेहनत का पैसा है, ऐसे मत उड़ाओ।\" - Satark.ai",
+    "footer_disclaimer": "⚠️ अस्वीकरण: यह टूल सिर्फ जागरूकता के लिए है। कानूनी सलाह के लिए उचित अधिकारियों से संपर्क करें।"
+})
+
+# Risk meter labels
+RISK_LABELS = {
+    "Hinglish": {
+        "low": "🟢 Low Risk (Safe)",
+        "med": "🟡 Medium Risk (Caution)", 
+        "high": "🔴 High Risk (Danger!)",
+        "prob": "Dhoka Probability"
+    },
+    "English": {
+        "low": "🟢 Low Risk (Safe)",
+        "med": "🟡 Medium Risk (Caution)",
+        "high": "🔴 High Risk (Critical Alert)",
+        "prob": "Scam Probability"
+    },
+    "Hindi": {
+        "low": "🟢 कम जोखिम (सुरक्षित)",
+        "med": "🟡 मध्यम जोखिम (सावधान)",
+        "high": "🔴 उच्च जोखिम (खतरा!)",
+        "prob": "धोखा संभावना"
+    },
+    "Marathi": {
+        "low": "🟢 कमी धोका (सुरक्षित)",
+        "med": "🟡 मध्यम धोका (सावध)",
+        "high": "🔴 जास्त धोका (धोकादायक!)",
+        "prob": "फसवणूक शक्यता"
+    }
+}
@@ -5,13 +5,22 @@ Google Gemini API Integration
 
 import google.generativeai as genai
 from PIL import Image
+import copy
+import hashlib
 import json
 import os
 import re
 import time
 from dotenv import load_dotenv
 from duckduckgo_search import DDGS
+import gemini_pool
 from live_scraper import live_db, check_phone, check_upi
+from entity_extractor import extract_entities
+from reputation import SCAM_SCORE as REPUTATION_SCAM_SCORE, risk_boost
+from singleflight import SingleFlight
+from complaint_pdf import render_complaint
+from metrics import (GEMINI_REQUESTS, GEMINI_SECONDS, PDF_SECONDS, SCAN_COALESCE_WAITERS, SCAN_SECONDS,
+                     SCANS, SEARCH_QUERIES, SEARCH_SECONDS, timed)
 
 
 load_dotenv()
@@ -112,9 +121,8 @@ def analyze_screenshot(image: Image.Image, api_key: str = None, language: str =
     Returns:
         dict with verdict, risk_score, reasoning, and all analysis data
     """
-    # Use provided key or fallback to default from environment
-    key = api_key or DEFAULT_API_KEY
-    if not key:
+    # Use provided key or fallback to the shared key pool from environment
+    if not (api_key or gemini_pool.pool.shared_keys):
         return {
             "verdict": "ERROR",
             "risk_score": 0,
@@ -128,24 +136,17 @@ def analyze_screenshot(image: Image.Image, api_key: str = None, language: str =
             "parse_success": False
         }
     
-    configure_gemini(key)
-    
-    # Start timing
-    start_time = time.time()
+    call = {}
     
     try:
-        # Initialize the model
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        
         # Get language-specific prompt
         prompt = get_prompt_with_language(language)
         
-        # Send image with prompt to Gemini
-        response = model.generate_content([prompt, image])
-        
-        # Calculate latency
-        end_time = time.time()
-        latency_ms = round((end_time - start_time) * 1000, 2)
+        # Send image with prompt to Gemini - queued on the key pool (rate limits, adaptive
+        # concurrency), so time spent waiting is reported apart from model latency
+        response, call = gemini_pool.generate([prompt, image], api_key)
+        latency_ms = call['latency_ms']
+        GEMINI_SECONDS.observe(latency_ms / 1000)
         
         # Get raw response text
         response_text = response.text.strip()
@@ -170,6 +171,8 @@ def analyze_screenshot(image: Image.Image, api_key: str = None, language: str =
         
         # Add metadata
         result["latency_ms"] = latency_ms
+        result["queue_wait_ms"] = call['queue_wait_ms']
+        result["gemini_key"] = call['key_slot']
         result["raw_response"] = raw_response
         result["parse_success"] = True
         result["model"] = "gemini-2.5-flash"
@@ -179,11 +182,11 @@ def analyze_screenshot(image: Image.Image, api_key: str = None, language: str =
         result["action"] = result.get("hinglish_advice", "Stay alert!")
         result["blacklisted_entity"] = result.get("scam_type", "").lower() in ["ponzi scheme", "blacklisted", "known scam"]
         
+        GEMINI_REQUESTS.inc(outcome='ok')
         return result
         
     except json.JSONDecodeError as e:
-        end_time = time.time()
-        latency_ms = round((end_time - start_time) * 1000, 2)
+        GEMINI_REQUESTS.inc(outcome='parse_error')
         
         return {
             "verdict": "SUSPICIOUS",
@@ -193,7 +196,8 @@ def analyze_screenshot(image: Image.Image, api_key: str = None, language: str =
             "red_flags": ["JSON parsing failed"],
             "reasoning": f"Could not parse AI response. Raw output available in debug mode.",
             "hinglish_advice": "Bhai, kuch technical issue hai. But sambhal ke reh!",
-            "latency_ms": latency_ms,
+            "latency_ms": call.get('latency_ms', 0),
+            "queue_wait_ms": call.get('queue_wait_ms', 0),
             "raw_response": response.text if 'response' in locals() else str(e),
             "parse_success": False,
             "model": "gemini-2.5-flash",
@@ -203,8 +207,7 @@ def analyze_screenshot(image: Image.Image, api_key: str = None, language: str =
         }
         
     except Exception as e:
-        end_time = time.time()
-        latency_ms = round((end_time - start_time) * 1000, 2) if 'start_time' in locals() else 0
+        GEMINI_REQUESTS.inc(outcome='queue_timeout' if isinstance(e, gemini_pool.QueueTimeout) else 'api_error')
         
         return {
             "verdict": "ERROR",
@@ -214,7 +217,7 @@ def analyze_screenshot(image: Image.Image, api_key: str = None, language: str =
             "red_flags": [str(e)],
             "reasoning": f"API Error: {str(e)}",
             "hinglish_advice": "API mein dikkat hai, baad mein try kar.",
-            "latency_ms": latency_ms,
+            "latency_ms": 0,
             "raw_response": str(e),
             "parse_success": False,
             "model": "gemini-2.5-flash",
@@ -385,6 +388,7 @@ def search_internet_for_scam(query: str, max_results: int = 3) -> list:
     Returns:
         List of search results with title, link, and snippet
     """
+    start_time = time.perf_counter()
     try:
         ddgs = DDGS()
         results = []
@@ -399,9 +403,13 @@ def search_internet_for_scam(query: str, max_results: int = 3) -> list:
                 "snippet": r.get("body", "")
             })
         
+        SEARCH_QUERIES.inc(result='results' if results else 'empty')
         return results
     except Exception as e:
+        SEARCH_QUERIES.inc(result='error')
         return []
+    finally:
+        SEARCH_SECONDS.observe(time.perf_counter() - start_time)
 
 
 def build_search_queries(initial_analysis: dict) -> list:
@@ -447,18 +455,46 @@ def build_search_queries(initial_analysis: dict) -> list:
     return queries[:2]  # Return top 2 queries
 
 
-def analyze_with_internet_search(image: Image.Image, api_key: str = None, language: str = "Hinglish") -> dict:
+# Identical scans running at the same time (a viral scam uploaded by many users) share one execution
+_scan_flight = SingleFlight(on_complete=lambda key, waiters: SCAN_COALESCE_WAITERS.observe(waiters))
+
+
+def image_digest(image: Image.Image) -> str:
+    """Content hash of the decoded pixels (same screenshot = same digest, whatever the file name)"""
+    digest = hashlib.sha256(f"{image.mode}:{image.size}".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+@timed(SCAN_SECONDS)
+def analyze_with_internet_search(image: Image.Image, api_key: str = None, language: str = "Hinglish",
+                                 search: bool = True) -> dict:
     """
     Enhanced analysis with internet search verification AND live database check.
+    Concurrent scans of the same image and language are coalesced into one.
     
     Args:
         image: PIL Image object of the screenshot
         api_key: Google Gemini API key (optional)
         language: Language for response
+        search: Run the internet search step (False keeps the live database check but skips the slow search)
     
     Returns:
         dict with verdict, risk_score, search_results, live_db_results, and all analysis data
+        (coalesced=True when the result came from another caller's in-flight scan)
     """
+    # A user's own key stays in the key, so their key errors are never handed to others
+    key = (image_digest(image), language, search, api_key)
+
+    result, shared = _scan_flight.do(key, _analyze_with_internet_search, image, api_key, language, search)
+    SCANS.inc(mode='coalesced' if shared else 'executed')
+    # Every caller gets its own copy - callers mutate results (pop raw_response, add scan IDs)
+    result = copy.deepcopy(result)
+    result["coalesced"] = shared
+    return result
+
+
+def _analyze_with_internet_search(image: Image.Image, api_key: str, language: str, search: bool) -> dict:
     # Step 1: Initial AI analysis
     initial_result = analyze_screenshot(image, api_key, language)
     
@@ -467,15 +503,35 @@ def analyze_with_internet_search(image: Image.Image, api_key: str = None, langua
         return initial_result
     
     # Step 2: Check against LIVE DATABASE first (fastest check)
-    entities = initial_result.get("extracted_entities", {})
-    phone_number = entities.get("phone_number")
-    upi_id = entities.get("upi_id")
+    # Canonicalise the model's entities with the extraction engine, so "+91 98765-43210"
+    # and "9876543210" hit the same entry and a UPI ID only mentioned in the reasoning is checked too
+    entities = initial_result.get("extracted_entities", {}) or {}
+    entity_values = {k: str(v) for k, v in entities.items() if v and str(v).lower() not in ["null", "none", ""]}
+    canonical = extract_entities(" ".join(list(entity_values.values()) + [initial_result.get("reasoning", "")]))
+    
+    # Fields the model filled in that don't parse as what they claim to be
+    unverified = []
+    if "phone_number" in entity_values and not extract_entities(entity_values["phone_number"])["phones"]:
+        unverified.append("phone_number")
+    if "upi_id" in entity_values and not extract_entities(entity_values["upi_id"])["upi_ids"]:
+        unverified.append("upi_id")
+    
+    initial_result["entity_check"] = {
+        "phones": canonical["phones"],
+        "upi_ids": canonical["upi_ids"],
+        "urls": canonical["urls"],
+        "domains": canonical["domains"],
+        "amounts": canonical["amounts"],
+        "unverified_fields": unverified
+    }
     
     live_db_hits = []
     live_db_boost = 0
     
-    # Check phone number in live database
-    if phone_number and phone_number.lower() not in ["null", "none", ""]:
+    # Check phone numbers in live database
+    # The boost scales with each entity's time-decayed reputation score, so a number
+    # reported 500 times this week weighs far more than one report from two years ago
+    for phone_number in canonical["phones"]:
         phone_check = check_phone(phone_number)
         if phone_check.get('found'):
             live_db_hits.append({
@@ -483,36 +539,41 @@ def analyze_with_internet_search(image: Image.Image, api_key: str = None, langua
                 'value': phone_number,
                 'reports': phone_check['reports'],
                 'last_seen': phone_check['last_seen'],
-                'scam_types': phone_check['scam_types']
+                'scam_types': phone_check['scam_types'],
+                'reputation': phone_check['reputation']
             })
-            live_db_boost += 40  # Major boost for known scammer
+            live_db_boost += risk_boost(phone_check['reputation'], 40)  # Major boost for known scammer
             initial_result["red_flags"].append(f"🚨 LIVE ALERT: Number reported {phone_check['reports']} times!")
     
-    # Check UPI ID in live database
-    if upi_id and upi_id.lower() not in ["null", "none", ""]:
+    # Check UPI IDs in live database
+    for upi_id in canonical["upi_ids"]:
         upi_check = check_upi(upi_id)
         if upi_check.get('found'):
             live_db_hits.append({
                 'type': 'upi',
                 'value': upi_id,
                 'reports': upi_check['reports'],
-                'scam_types': upi_check['scam_types']
+                'scam_types': upi_check['scam_types'],
+                'reputation': upi_check['reputation']
             })
-            live_db_boost += 35
+            live_db_boost += risk_boost(upi_check['reputation'], 35)
             initial_result["red_flags"].append(f"⚠️ UPI ID in scam database ({upi_check['reports']} reports)")
     
     # Apply live database boost
-    if live_db_boost > 0:
+    initial_result["live_db_match"] = len(live_db_hits) > 0
+    if live_db_hits:
         original_score = initial_result.get("risk_score", 50)
         new_score = min(100, original_score + live_db_boost)
         initial_result["risk_score"] = new_score
-        initial_result["live_db_match"] = True
         
-        # Force upgrade verdict for live database hits
-        if len(live_db_hits) > 0:
+        # Force SCAM only for entities with a strong, recent reputation;
+        # weaker hits upgrade the verdict by score like internet reports do
+        if max(hit['reputation'] for hit in live_db_hits) >= REPUTATION_SCAM_SCORE:
+            initial_result["verdict"] = "SCAM"
+        elif initial_result.get("verdict") == "SAFE" and new_score >= 60:
+            initial_result["verdict"] = "SUSPICIOUS"
+        elif initial_result.get("verdict") == "SUSPICIOUS" and new_score >= 85:
             initial_result["verdict"] = "SCAM"
-    else:
-        initial_result["live_db_match"] = False
     
     initial_result["live_database"] = {
         "checked": True,
@@ -520,6 +581,11 @@ def analyze_with_internet_search(image: Image.Image, api_key: str = None, langua
         "total_hits": len(live_db_hits)
     }
     
+    if not search:
+        initial_result["internet_search"] = {"queries": [], "results": [], "sources_found": 0, "search_latency_ms": 0, "skipped": True}
+        initial_result["internet_verified"] = False
+        return initial_result
+    
     # Step 3: Build search queries from extracted data
     search_queries = build_search_queries(initial_result)
     
@@ -584,162 +650,13 @@ def analyze_with_internet_search(image: Image.Image, api_key: str = None, langua
     return initial_result
 
 
+@timed(PDF_SECONDS)
 def generate_cyber_complaint(scam_details: dict) -> bytes:
     """
     Generate a formal cyber complaint PDF for reporting scams.
-    
-    Args:
-        scam_details: Dictionary containing:
-            - scam_type: Type of scam detected
-            - phone_number: Scammer's phone number (if extracted)
-            - company_name: Fake company name (if any)
-            - amount: Amount mentioned (if any)
-            - extracted_text: OCR text from screenshot
-            - risk_score: AI-assigned risk score
-            - red_flags: List of detected red flags
-            - reasoning: AI's reasoning
-            - user_profile: Dictionary with name, contact, email, address, city, state
+    See complaint_pdf.render_complaint for the fields of scam_details.
     
     Returns:
         PDF as bytes for download
     """
-    from fpdf import FPDF
-    from datetime import datetime
-    import io
-    
-    # Extract details with fallbacks
-    scam_type = scam_details.get("scam_type", "[Unknown Scam Type]")
-    phone_number = scam_details.get("phone_number") or "[Unknown Number]"
-    company_name = scam_details.get("company_name") or "[Unknown Entity]"
-    amount = scam_details.get("amount") or "[Amount Not Specified]"
-    extracted_text = scam_details.get("extracted_text") or "[Screenshot text not available]"
-    risk_score = scam_details.get("risk_score", 0)
-    red_flags = scam_details.get("red_flags", [])
-    reasoning = scam_details.get("reasoning") or "[AI analysis not available]"
-    
-    # Extract user profile (with fallbacks for backward compatibility)
-    user_profile = scam_details.get("user_profile", {})
-    user_name = user_profile.get("name", "[Your Name]")
-    user_contact = user_profile.get("contact", "[Your Contact Number]")
-    user_email = user_profile.get("email", "[Your Email Address]")
-    user_address = user_profile.get("address", "[Your Address]")
-    user_city = user_profile.get("city", "[City Name]")
-    user_state = user_profile.get("state", "[State]")
-    
-    current_date = datetime.now().strftime("%d %B %Y")
-    current_time = datetime.now().strftime("%I:%M %p")
-    
-    # Create PDF
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    
-    # Header
-    pdf.set_font("Helvetica", "B", 16)
-    pdf.cell(0, 10, "OFFICIAL COMPLAINT - CYBER CRIME REPORT", ln=True, align="C")
-    pdf.ln(5)
-    
-    # Reference Number
-    pdf.set_font("Helvetica", "", 10)
-    ref_no = f"SATARK/{datetime.now().strftime('%Y%m%d%H%M%S')}"
-    pdf.cell(0, 5, f"Reference No: {ref_no}", ln=True, align="R")
-    pdf.cell(0, 5, f"Date: {current_date}", ln=True, align="R")
-    pdf.ln(10)
-    
-    # To Section
-    pdf.set_font("Helvetica", "B", 11)
-    pdf.cell(0, 6, "To:", ln=True)
-    pdf.set_font("Helvetica", "", 11)
-    pdf.multi_cell(0, 6, f"The Nodal Officer,\nCyber Crime Cell,\n{user_city}, {user_state}\nNational Cyber Crime Reporting Portal")
-    pdf.ln(5)
-    
-    # Subject
-    pdf.set_font("Helvetica", "B", 11)
-    pdf.cell(0, 6, "Subject: Reporting Financial Fraud Attempt via WhatsApp/SMS", ln=True)
-    pdf.ln(5)
-    
-    # Salutation
-    pdf.set_font("Helvetica", "", 11)
-    pdf.cell(0, 6, "Respected Sir/Madam,", ln=True)
-    pdf.ln(3)
-    
-    # Body Paragraph 1
-    body_para1 = f"I am writing to formally report a suspected financial fraud attempt that I received on {current_date} at approximately {current_time}. The sender, identified as {phone_number}, attempted to defraud me using the pretext of \"{scam_type}\"."
-    pdf.multi_cell(0, 6, body_para1)
-    pdf.ln(3)
-    
-    # Body Paragraph 2
-    if company_name != "[Unknown Entity]":
-        body_para2 = f"The fraudulent message impersonated \"{company_name}\" and mentioned an amount of {amount}. This is a clear attempt to deceive unsuspecting citizens."
-    else:
-        body_para2 = f"The message contained suspicious content mentioning {amount}. This is a clear attempt to deceive unsuspecting citizens."
-    pdf.multi_cell(0, 6, body_para2)
-    pdf.ln(5)
-    
-    # AI Analysis Section
-    pdf.set_font("Helvetica", "B", 11)
-    pdf.cell(0, 6, "AI ANALYSIS REPORT (Satark.ai):", ln=True)
-    pdf.set_font("Helvetica", "", 10)
-    pdf.cell(0, 5, f"- Risk Score: {risk_score}/100 (HIGH RISK)", ln=True)
-    pdf.cell(0, 5, f"- Scam Type: {scam_type}", ln=True)
-    
-    if red_flags:
-        pdf.cell(0, 5, "- Red Flags Detected:", ln=True)
-        for flag in red_flags[:5]:  # Limit to 5 flags
-            # Sanitize text for PDF
-            safe_flag = flag.encode('latin-1', 'replace').decode('latin-1')
-            pdf.cell(0, 5, f"    * {safe_flag}", ln=True)
-    pdf.ln(3)
-    
-    # Reasoning
-    pdf.set_font("Helvetica", "I", 10)
-    safe_reasoning = reasoning.encode('latin-1', 'replace').decode('latin-1')
-    pdf.multi_cell(0, 5, f"AI Reasoning: {safe_reasoning}")
-    pdf.ln(5)
-    
-    # Evidence Section
-    pdf.set_font("Helvetica", "B", 11)
-    pdf.cell(0, 6, "EXHIBIT A - EXTRACTED MESSAGE CONTENT:", ln=True)
-    pdf.set_font("Courier", "", 9)
-    
-    # Sanitize and truncate extracted text
-    safe_text = extracted_text.encode('latin-1', 'replace').decode('latin-1')
-    if len(safe_text) > 800:
-        safe_text = safe_text[:800] + "... [truncated]"
-    
-    # Draw bordered box for evidence
-    pdf.set_draw_color(100, 100, 100)
-    pdf.set_fill_color(245, 245, 245)
-    x = pdf.get_x()
-    y = pdf.get_y()
-    pdf.multi_cell(0, 4, safe_text, border=1, fill=True)
-    pdf.ln(5)
-    
-    # Request Section
-    pdf.set_font("Helvetica", "", 11)
-    pdf.multi_cell(0, 6, "I kindly request you to:\n1. Register an FIR against the perpetrator(s)\n2. Investigate and trace the fraudulent sender\n3. Take necessary action to prevent others from being victimized\n4. Block the reported phone number/UPI ID if applicable")
-    pdf.ln(5)
-    
-    # Declaration
-    pdf.set_font("Helvetica", "I", 10)
-    pdf.multi_cell(0, 5, "I hereby declare that the information provided above is true to the best of my knowledge. I am willing to cooperate with the investigation as required.")
-    pdf.ln(10)
-    
-    # Signature Section
-    pdf.set_font("Helvetica", "", 11)
-    pdf.cell(0, 6, "Yours faithfully,", ln=True)
-    pdf.ln(8)
-    pdf.cell(0, 6, user_name, ln=True)
-    pdf.cell(0, 6, user_contact, ln=True)
-    pdf.cell(0, 6, user_email, ln=True)
-    pdf.cell(0, 6, user_address, ln=True)
-    pdf.ln(10)
-    
-    # Footer
-    pdf.set_font("Helvetica", "I", 8)
-    pdf.set_text_color(128, 128, 128)
-    pdf.cell(0, 4, "This complaint was generated using Satark.ai - AI-Powered Scam Detection", ln=True, align="C")
-    pdf.cell(0, 4, "National Cyber Crime Helpline: 1930 | cybercrime.gov.in", ln=True, align="C")
-    
-    # Output to bytes
-    return bytes(pdf.output())
+    return render_complaint(scam_details)